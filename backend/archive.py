@@ -0,0 +1,173 @@
+"""点名记录归档
+
+把早于截止时间的点名记录从 roll_call_records 移到精简的 roll_call_archive 表（只有班级、学生两个索引，
+没有幂等键），同时按学生累加到 archived_student_stats。在线表只保留近期记录，历史查询、
+点名写入和索引维护都只涉及这部分数据。
+
+归档后的数据仍然可以查询：
+- 统计接口读取的汇总表包含归档记录（归档时不扣减，见 stats.py）
+- /export/roll-call 默认同时导出在线和归档记录
+- 删除班级、分组、学生时一并删除其归档记录
+
+归档按批进行，每批在独立的短事务中完成，批次之间让出写锁，不会长时间阻塞点名写入；
+归档结束后分批执行 incremental_vacuum 把空闲页归还给文件系统。
+
+用法（建议在低峰期由 cron 定期执行）：
+    python archive.py run                      # 归档 ARCHIVE_AFTER_DAYS 天之前的记录
+    python archive.py run --before 2024-09-01  # 归档某个学期结束之前的全部记录
+    python archive.py vacuum --full            # 旧数据库一次性切换为增量 VACUUM（会重写整个文件）
+    python archive.py status
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import bindparam, delete, insert, select, text
+
+from models import RollCallRecord, RollCallArchive
+
+# 默认归档多少天之前的记录
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+# 每批归档的记录数，决定单次写锁的持有时间
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# 批次之间的间隔（秒），让等待中的写请求拿到写锁
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", "0.05"))
+# 每次 incremental_vacuum 回收的页数
+VACUUM_PAGES_PER_STEP = 1000
+
+_ARCHIVE_COLUMNS = ("id", "student_id", "group_id", "class_id", "called_at")
+
+# 把本批记录按学生累加到归档汇总
+_FOLD_STUDENT_STATS = text("""
+    INSERT INTO archived_student_stats (student_id, call_count, last_called_at)
+    SELECT student_id, count(*), max(called_at) FROM roll_call_records
+    WHERE id IN :ids GROUP BY student_id
+    ON CONFLICT (student_id) DO UPDATE SET
+        call_count = call_count + excluded.call_count,
+        last_called_at = max(coalesce(last_called_at, excluded.last_called_at), excluded.last_called_at)
+""").bindparams(bindparam("ids", expanding=True))
+
+
+def archive_batch(conn, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """在一个写事务中归档最早的一批记录，返回归档条数（0 表示已归档完毕）"""
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+    try:
+        ids = conn.scalars(
+            select(RollCallRecord.id)
+            .where(RollCallRecord.called_at < cutoff)
+            .order_by(RollCallRecord.called_at, RollCallRecord.id)
+            .limit(batch_size)
+        ).all()
+        if ids:
+            batch = RollCallRecord.id.in_(ids)
+            conn.execute(insert(RollCallArchive).from_select(
+                _ARCHIVE_COLUMNS,
+                select(*(getattr(RollCallRecord, column) for column in _ARCHIVE_COLUMNS)).where(batch),
+            ))
+            conn.execute(_FOLD_STUDENT_STATS, {"ids": ids})
+            # 标记行只在本事务内存在，删除触发器据此保留汇总表中的计数
+            conn.exec_driver_sql("INSERT INTO archive_in_progress (id) VALUES (1)")
+            conn.execute(delete(RollCallRecord).where(batch))
+            conn.exec_driver_sql("DELETE FROM archive_in_progress")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(ids)
+
+
+def incremental_vacuum(conn, max_steps: Optional[int] = None) -> int:
+    """分批回收空闲页，每批是一个短写事务，返回回收的页数"""
+    reclaimed = 0
+    steps = 0
+    while max_steps is None or steps < max_steps:
+        free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if not free:
+            break
+        conn.exec_driver_sql(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})")
+        conn.commit()
+        after = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if after >= free:
+            break
+        reclaimed += free - after
+        steps += 1
+    return reclaimed
+
+
+def run(engine, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE, pause: float = ARCHIVE_BATCH_PAUSE,
+        log=print) -> int:
+    """归档截止时间之前的全部记录，然后回收空间，返回归档条数"""
+    total = 0
+    with engine.connect() as conn:
+        while True:
+            archived = archive_batch(conn, cutoff, batch_size)
+            if not archived:
+                break
+            total += archived
+            if pause:
+                time.sleep(pause)
+        log(f"已归档 {total} 条 {cutoff:%Y-%m-%d %H:%M} 之前的点名记录")
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+            pages = incremental_vacuum(conn)
+            log(f"已回收 {pages} 个空闲页")
+        else:
+            log("数据库未启用增量 VACUUM，空闲页留给后续写入复用；可执行 python archive.py vacuum --full 切换")
+    return total
+
+
+def vacuum_full(engine):
+    """切换为增量 VACUUM 模式并整理文件；会重写整个数据库并在期间持有写锁，只需执行一次"""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+
+
+def status(engine) -> dict:
+    with engine.connect() as conn:
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+        return {
+            "live_records": conn.exec_driver_sql("SELECT count(*) FROM roll_call_records").scalar(),
+            "archived_records": conn.exec_driver_sql("SELECT count(*) FROM roll_call_archive").scalar(),
+            "oldest_live": conn.exec_driver_sql("SELECT min(called_at) FROM roll_call_records").scalar(),
+            "file_bytes": conn.exec_driver_sql("PRAGMA page_count").scalar() * page_size,
+            "free_bytes": conn.exec_driver_sql("PRAGMA freelist_count").scalar() * page_size,
+            "auto_vacuum": {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}[conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="归档旧记录")
+    cutoff_group = run_parser.add_mutually_exclusive_group()
+    cutoff_group.add_argument("--before", type=datetime.fromisoformat, help="归档该时间（UTC）之前的记录")
+    cutoff_group.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="归档多少天之前的记录")
+    run_parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    vacuum_parser = subparsers.add_parser("vacuum", help="回收空闲页")
+    vacuum_parser.add_argument("--full", action="store_true", help="切换为增量 VACUUM 并整理整个文件")
+    subparsers.add_parser("status", help="查看在线和归档记录数及文件大小")
+    args = parser.parse_args()
+
+    from database import engine
+    from migrate import check_schema
+    check_schema(engine)
+
+    if args.command == "run":
+        cutoff = args.before or datetime.utcnow() - timedelta(days=args.days)
+        run(engine, cutoff, args.batch_size)
+    elif args.command == "vacuum":
+        if args.full:
+            vacuum_full(engine)
+            print("已切换为增量 VACUUM 并整理数据库文件")
+        else:
+            with engine.connect() as conn:
+                print(f"已回收 {incremental_vacuum(conn)} 个空闲页")
+    else:
+        for key, value in status(engine).items():
+            print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
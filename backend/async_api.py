@@ -0,0 +1,97 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.routing import APIRoute
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import get_current_active_user_async
+from database import get_async_db
+from models import User, Class, Student, RollCallRecord
+from projection import Projection, get_projection, view_schema, page_view, render_view
+from tree_cache import lookup_tree_async, store_tree
+from broadcast import hub, publish_roll_calls
+from queries import (
+    CLASS_TREE_EXPAND, ROLL_CALL_RECORD_EXPAND, class_tree_options, roll_call_record_options,
+    history_statement, history_page, record_summary
+)
+from schemas import (
+    Class as ClassSchema, RollCallRecordCreate, RollCallRecord as RollCallRecordSchema, RollCallHistoryPage,
+    RollCallRecordSummary
+)
+
+# 异步模式（DB_ASYNC=true）下接管热点接口的原生异步实现
+router = APIRouter()
+
+@router.get("/classes", response_model=List[ClassSchema])
+async def get_classes(request: Request, projection: Projection = Depends(get_projection), current_user: User = Depends(get_current_active_user_async), db: AsyncSession = Depends(get_async_db)):
+    key, etag, cached = await lookup_tree_async(request, current_user.id)
+    if cached is not None:
+        return cached
+    view = view_schema(ClassSchema, projection, CLASS_TREE_EXPAND)
+    result = await db.execute(select(Class).options(*class_tree_options(projection)).where(Class.owner_id == current_user.id))
+    return store_tree(key, etag, List[view], result.scalars().all())
+
+@router.post("/roll-call", response_model=RollCallRecordSchema)
+async def create_roll_call_record(record_data: RollCallRecordCreate, projection: Projection = Depends(get_projection), current_user: User = Depends(get_current_active_user_async), db: AsyncSession = Depends(get_async_db)):
+    # 验证学生和班级所有权
+    db_student = (await db.execute(
+        select(Student).where(Student.id == record_data.student_id, Student.owner_id == current_user.id)
+    )).scalars().first()
+    if not db_student:
+        raise HTTPException(status_code=404, detail="学生不存在")
+
+    db_class = (await db.execute(
+        select(Class).where(Class.id == record_data.class_id, Class.owner_id == current_user.id)
+    )).scalars().first()
+    if not db_class:
+        raise HTTPException(status_code=404, detail="班级不存在")
+
+    db_record = RollCallRecord(
+        student_id=record_data.student_id,
+        group_id=db_student.group_id,
+        class_id=record_data.class_id,
+        owner_id=current_user.id
+    )
+    db.add(db_record)
+    await db.commit()
+    # 异步会话不能懒加载，响应所需的关联对象一次性预加载
+    result = await db.execute(
+        select(RollCallRecord).options(*roll_call_record_options(projection))
+        .where(RollCallRecord.id == db_record.id)
+        .execution_options(populate_existing=True)
+    )
+    db_record = result.scalars().one()
+    response = render_view(RollCallRecordSchema, view_schema(RollCallRecordSchema, projection, ROLL_CALL_RECORD_EXPAND), db_record)
+    if hub.active:
+        publish_roll_calls([record_summary(db_record)])
+    return response
+
+@router.get("/roll-call/history", response_model=RollCallHistoryPage)
+async def get_roll_call_history(
+    class_id: Optional[int] = Query(None, alias="classId"),
+    group_id: Optional[int] = Query(None, alias="groupId"),
+    student_id: Optional[int] = Query(None, alias="studentId"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    projection: Projection = Depends(get_projection),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    view = page_view(RollCallHistoryPage, RollCallRecordSummary, projection)
+    result = await db.execute(history_statement(
+        current_user.id, class_id, group_id, student_id, start, end, cursor, limit
+    ))
+    return render_view(RollCallHistoryPage, view, history_page(result.all(), limit))
+
+def install(app):
+    """用本模块的异步实现替换应用中同路径、同方法的同步接口"""
+    overridden = {(route.path, method) for route in router.routes for method in route.methods}
+    app.router.routes = [
+        route for route in app.router.routes
+        if not (isinstance(route, APIRoute) and any((route.path, method) in overridden for method in route.methods))
+    ]
+    app.include_router(router)
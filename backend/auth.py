@@ -1,43 +1,208 @@
+import asyncio
+import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from database import get_db, get_async_db
 from models import User
 from schemas import TokenData
+from metrics import METRICS_ENABLED, timed_password_task
+from shared_state import shared_state, store_call, WEB_CONCURRENCY
 
-# 密码加密配置
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 密码加密配置 - bcrypt 成本因子可通过环境变量调整
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# 密码哈希专用线程池（bcrypt 计算时会释放 GIL），以及排队上限；多个 worker 时默认平分 CPU 核数
+PASSWORD_HASH_WORKERS = int(os.getenv(
+    "PASSWORD_HASH_WORKERS", str(max(1, min(4, (os.cpu_count() or 1) // WEB_CONCURRENCY)))
+))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "0.5"))
+
+hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
 
 # JWT配置
 SECRET_KEY = "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# 实时推送票据的有效秒数；票据只能用于一个班级的事件流，且只能使用一次
+STREAM_TICKET_TTL = int(os.getenv("STREAM_TICKET_TTL", "30"))
 
 # HTTP Bearer认证
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# 已认证用户缓存配置
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+
+# 登录限流：窗口内每个客户端 IP、每个用户名的登录尝试次数上限（0 表示不限制），
+# 超出后直接返回 429，不再计算 bcrypt
+LOGIN_RATE_WINDOW = float(os.getenv("LOGIN_RATE_WINDOW", "60"))
+LOGIN_RATE_LIMIT_IP = int(os.getenv("LOGIN_RATE_LIMIT_IP", "30"))
+LOGIN_RATE_LIMIT_USER = int(os.getenv("LOGIN_RATE_LIMIT_USER", "10"))
+
+class UserCache:
+    """按 (用户名, 令牌) 缓存已认证用户的 TTL/LRU 缓存
+
+    缓存的是脱离会话的用户快照，命中时通过 merge(load=False) 挂回当前会话，不产生查询。
+    每个用户在共享计数器中有一个版本号，失效时递增，其他 worker 据此丢弃本地的旧快照。
+    """
+
+    def __init__(self, maxsize: int = AUTH_CACHE_SIZE, ttl: float = AUTH_CACHE_TTL, store=shared_state):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key):
+        """返回 (缓存的用户或 None, 用户当前版本号)；未命中时应以该版本号调用 put"""
+        if not self.enabled:
+            return None, 0
+        return self._lookup(key, self.store.get(f"auth:{key[0]}"))
+
+    async def get_async(self, key):
+        """同 get；共享计数器（SQLite / Redis）在线程池中读取，不阻塞事件循环"""
+        if not self.enabled:
+            return None, 0
+        return self._lookup(key, await store_call(self.store, "get", f"auth:{key[0]}"))
+
+    def _lookup(self, key, generation: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic() or entry[1] != generation:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None, generation
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2], generation
+
+    def put(self, key, user: User, generation: int):
+        if not self.enabled:
+            return
+        snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, generation, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: Optional[str] = None):
+        """清除某个用户（所有 worker）或本进程全部的缓存"""
+        if username is None:
+            with self._lock:
+                self._entries.clear()
+            return
+        self.store.incr(f"auth:{username}")
+        self.invalidate_local(username)
+
+    async def invalidate_async(self, username: str):
+        """同 invalidate(username)，供 async 接口使用"""
+        await store_call(self.store, "incr", f"auth:{username}")
+        self.invalidate_local(username)
+
+    def invalidate_local(self, username: str):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == username]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+user_cache = UserCache()
+
+def submit_password_task(fn, *args, blocking: bool = True):
+    """提交哈希任务到专用线程池，排队已满时返回 503 而不是无限堆积
+
+    blocking=False 用于事件循环中：不等待排队空位，已满时立即返回 503。
+    """
+    if blocking:
+        acquired = _hash_slots.acquire(timeout=PASSWORD_HASH_QUEUE_TIMEOUT)
+    else:
+        acquired = _hash_slots.acquire(blocking=False)
+    if not acquired:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="服务繁忙，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+    if METRICS_ENABLED:
+        fn = timed_password_task(fn)
+    try:
+        future = hash_executor.submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
 
 def verify_password(plain_password, hashed_password):
-    """验证密码"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """验证密码（阻塞当前线程，供脚本和迁移使用）"""
+    return submit_password_task(pwd_context.verify, plain_password, hashed_password).result()
 
 def get_password_hash(password):
-    """获取密码哈希"""
-    return pwd_context.hash(password)
+    """获取密码哈希（阻塞当前线程，供脚本和迁移使用）"""
+    return submit_password_task(pwd_context.hash, password).result()
+
+async def verify_password_async(plain_password, hashed_password):
+    """验证密码（不阻塞事件循环）"""
+    return await asyncio.wrap_future(
+        submit_password_task(pwd_context.verify, plain_password, hashed_password, blocking=False)
+    )
+
+async def get_password_hash_async(password):
+    """获取密码哈希（不阻塞事件循环）"""
+    return await asyncio.wrap_future(submit_password_task(pwd_context.hash, password, blocking=False))
+
+def check_login_rate(username: str, client_ip: Optional[str]):
+    """登录尝试计数，先按 IP 再按用户名；超出限制时返回 429"""
+    for key, limit in ((f"login:ip:{client_ip}", LOGIN_RATE_LIMIT_IP), (f"login:user:{username}", LOGIN_RATE_LIMIT_USER)):
+        if limit <= 0:
+            continue
+        count, retry_after = shared_state.hit(key, LOGIN_RATE_WINDOW)
+        if count > limit:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="登录尝试过于频繁，请稍后重试",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
 
 def get_user(db: Session, username: str):
     """根据用户名获取用户"""
     return db.query(User).filter(User.username == username).first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    """验证用户"""
-    user = get_user(db, username)
+async def authenticate_user(db: Session, username: str, password: str):
+    """验证用户；查询在线程池中执行，不阻塞事件循环"""
+    user = await run_in_threadpool(get_user, db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
@@ -52,25 +217,50 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    """获取当前用户"""
-    credentials_exception = HTTPException(
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(credentials: HTTPAuthorizationCredentials):
+    """解析令牌，返回 (用户名, 令牌)"""
     try:
         token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+        # 带 scope 的是专用票据（如实时推送票据），不能当作访问令牌
+        if username is None or payload.get("scope"):
+            raise credentials_exception()
         token_data = TokenData(username=username)
     except JWTError:
-        raise credentials_exception
-    user = get_user(db, username=token_data.username)
+        raise credentials_exception()
+    return token_data.username, token
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+    """获取当前用户"""
+    cache_key = decode_token(credentials)
+    cached_user, generation = await user_cache.get_async(cache_key)
+    if cached_user is not None:
+        return db.merge(cached_user, load=False)
+    user = await run_in_threadpool(get_user, db, cache_key[0])
+    if user is None:
+        raise credentials_exception()
+    user_cache.put(cache_key, user, generation)
+    return user
+
+async def get_current_user_async(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_async_db)):
+    """获取当前用户（异步会话）"""
+    cache_key = decode_token(credentials)
+    cached_user, generation = await user_cache.get_async(cache_key)
+    if cached_user is not None:
+        return await db.merge(cached_user, load=False)
+    result = await db.execute(select(User).where(User.username == cache_key[0]))
+    user = result.scalars().first()
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+    user_cache.put(cache_key, user, generation)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
@@ -79,6 +269,50 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_current_active_user_async(current_user: User = Depends(get_current_user_async)):
+    """获取当前活跃用户（异步会话）"""
+    return await get_current_active_user(current_user)
+
+def create_stream_ticket(username: str, class_id: int) -> str:
+    """签发订阅某个班级事件流的一次性票据
+
+    EventSource 无法设置请求头，凭证只能放在 URL 中，会出现在代理和访问日志里；
+    因此不传访问令牌，而是传有效期很短、只能订阅该班级一次的票据。
+    """
+    return jwt.encode({
+        "sub": username,
+        "scope": "events",
+        "cls": class_id,
+        "jti": uuid.uuid4().hex,
+        "exp": datetime.utcnow() + timedelta(seconds=STREAM_TICKET_TTL),
+    }, SECRET_KEY, algorithm=ALGORITHM)
+
+async def get_current_active_user_sse(
+    class_id: int,
+    ticket: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
+    """获取当前活跃用户；EventSource 无法设置请求头，也接受 ?ticket= 一次性票据"""
+    if credentials is not None:
+        return await get_current_active_user(await get_current_user(credentials, db))
+    if not ticket:
+        raise credentials_exception()
+    try:
+        payload = jwt.decode(ticket, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception()
+    if payload.get("scope") != "events" or payload.get("cls") != class_id or not payload.get("jti"):
+        raise credentials_exception()
+    # 窗口与有效期相同，窗口内第二次使用即拒绝
+    count, _ = await store_call(shared_state, "hit", f"ticket:{payload['jti']}", STREAM_TICKET_TTL)
+    if count > 1:
+        raise credentials_exception()
+    user = await run_in_threadpool(get_user, db, payload.get("sub", ""))
+    if user is None:
+        raise credentials_exception()
+    return await get_current_active_user(user)
+
 async def get_admin_user(current_user: User = Depends(get_current_active_user)):
     """获取管理员用户"""
     if current_user.user_type != "admin":
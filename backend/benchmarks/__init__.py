@@ -0,0 +1,8 @@
+"""后端压测工具
+
+- dataset.py：通过 models.py 中的模型生成可配置规模的合成数据
+- __main__.py：进程内 / 本地 uvicorn 两种方式并发压测各接口，结果保存为 JSON
+
+用法（在 backend 目录下，需要额外安装 httpx）：
+    python -m benchmarks --teachers 5 --classes 4 --groups 6 --students 40 --history 20000
+"""
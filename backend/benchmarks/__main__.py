@@ -0,0 +1,377 @@
+"""接口压测
+
+在临时数据库中生成合成数据，分别以进程内（ASGI）和本地 uvicorn（真实 HTTP）两种方式，
+用并发客户端依次压测登录、花名册、点名、历史记录和增删改接口，
+统计 p50/p95/p99 延迟、吞吐量和每个请求的平均 SQL 语句数，结果保存为 JSON。
+
+用法（在 backend 目录下，需要额外安装 httpx）：
+    python -m benchmarks --concurrency 20 --requests 300
+    python -m benchmarks --transport inprocess --baseline benchmarks/results/上次结果.json
+
+DB_ASYNC、FAST_JSON_RESPONSES、TREE_CACHE_SIZE、BCRYPT_ROUNDS 等环境变量照常生效，
+可用于对比不同配置；登录接口的耗时主要取决于 BCRYPT_ROUNDS。
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from importlib import metadata
+
+import httpx
+
+from benchmarks.dataset import BENCH_PASSWORD, seed
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+TRANSPORTS = ("inprocess", "uvicorn")
+RECORDED_ENV = ("DB_ASYNC", "FAST_JSON_RESPONSES", "TREE_CACHE_SIZE", "AUTH_CACHE_TTL", "BCRYPT_ROUNDS",
+                "DB_JOURNAL_MODE", "DB_SYNCHRONOUS", "DB_POOL_SIZE", "DB_MAX_OVERFLOW")
+
+
+class QueryCounter:
+    """通过 SQLAlchemy 事件统计执行的 SQL 语句数"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+class BenchContext:
+    def __init__(self, teachers):
+        self.teachers = teachers
+        self.tokens = {}
+        self.created_classes = []
+        self.created_students = []
+        # 随机点名按"本节课开始"排除已点到的学生，预生成的历史记录不会把候选人排空
+        self.session_started_at = datetime.utcnow().isoformat()
+
+    def teacher(self, i: int):
+        return self.teachers[i % len(self.teachers)]
+
+    def headers(self, teacher):
+        return {"Authorization": f"Bearer {self.tokens[teacher.username]}"}
+
+
+# 各压测场景：根据请求序号 i 构造一次请求；返回 None 表示没有可操作的数据，该场景提前结束
+async def op_login(client, ctx, i):
+    return await client.post("/auth/login", json={"username": ctx.teacher(i).username, "password": BENCH_PASSWORD})
+
+async def op_classes(client, ctx, i):
+    return await client.get("/classes", headers=ctx.headers(ctx.teacher(i)))
+
+async def op_groups(client, ctx, i):
+    teacher = ctx.teacher(i)
+    class_id = teacher.class_ids[i % len(teacher.class_ids)]
+    return await client.get(f"/classes/{class_id}/groups", headers=ctx.headers(teacher))
+
+async def op_students(client, ctx, i):
+    teacher = ctx.teacher(i)
+    _, group_id, _ = teacher.students[i % len(teacher.students)]
+    return await client.get(f"/groups/{group_id}/students", headers=ctx.headers(teacher))
+
+async def op_roll_call(client, ctx, i):
+    teacher = ctx.teacher(i)
+    student_id, _, class_id = teacher.students[(i * 7919) % len(teacher.students)]
+    return await client.post("/roll-call", json={"studentId": student_id, "classId": class_id},
+                             headers=ctx.headers(teacher))
+
+async def op_roll_call_draw(client, ctx, i):
+    teacher = ctx.teacher(i)
+    class_id = teacher.class_ids[i % len(teacher.class_ids)]
+    return await client.post("/roll-call/draw", json={"classId": class_id, "since": ctx.session_started_at},
+                             headers=ctx.headers(teacher))
+
+async def op_history(client, ctx, i):
+    return await client.get("/roll-call/history", params={"limit": 50}, headers=ctx.headers(ctx.teacher(i)))
+
+async def op_history_by_class(client, ctx, i):
+    teacher = ctx.teacher(i)
+    class_id = teacher.class_ids[i % len(teacher.class_ids)]
+    return await client.get("/roll-call/history", params={"classId": class_id, "limit": 50},
+                            headers=ctx.headers(teacher))
+
+async def op_class_create(client, ctx, i):
+    teacher = ctx.teacher(i)
+    response = await client.post("/classes", json={"name": f"新班级{i}"}, headers=ctx.headers(teacher))
+    if response.status_code == 200:
+        ctx.created_classes.append((teacher, response.json()["id"]))
+    return response
+
+async def op_class_update(client, ctx, i):
+    teacher = ctx.teacher(i)
+    class_id = teacher.class_ids[i % len(teacher.class_ids)]
+    return await client.put(f"/classes/{class_id}", json={"name": f"压测班级{i}"}, headers=ctx.headers(teacher))
+
+async def op_student_create(client, ctx, i):
+    teacher = ctx.teacher(i)
+    _, group_id, _ = teacher.students[i % len(teacher.students)]
+    response = await client.post("/students", json={"studentId": f"new{i:06d}", "name": f"新学生{i}", "groupId": group_id},
+                                 headers=ctx.headers(teacher))
+    if response.status_code == 200:
+        ctx.created_students.append((teacher, response.json()["id"]))
+    return response
+
+async def op_student_update(client, ctx, i):
+    teacher = ctx.teacher(i)
+    student_id, _, _ = teacher.students[i % len(teacher.students)]
+    return await client.put(f"/students/{student_id}", json={"weight": 1.0 + i % 3}, headers=ctx.headers(teacher))
+
+async def op_student_delete(client, ctx, i):
+    if not ctx.created_students:
+        return None
+    teacher, student_id = ctx.created_students.pop()
+    return await client.delete(f"/students/{student_id}", headers=ctx.headers(teacher))
+
+async def op_class_delete(client, ctx, i):
+    if not ctx.created_classes:
+        return None
+    teacher, class_id = ctx.created_classes.pop()
+    return await client.delete(f"/classes/{class_id}", headers=ctx.headers(teacher))
+
+
+SCENARIOS = {
+    "login": ("POST", "/auth/login", op_login),
+    "classes": ("GET", "/classes", op_classes),
+    "groups": ("GET", "/classes/{id}/groups", op_groups),
+    "students": ("GET", "/groups/{id}/students", op_students),
+    "roll_call": ("POST", "/roll-call", op_roll_call),
+    "roll_call_draw": ("POST", "/roll-call/draw", op_roll_call_draw),
+    "history": ("GET", "/roll-call/history", op_history),
+    "history_by_class": ("GET", "/roll-call/history?classId=", op_history_by_class),
+    "class_create": ("POST", "/classes", op_class_create),
+    "class_update": ("PUT", "/classes/{id}", op_class_update),
+    "student_create": ("POST", "/students", op_student_create),
+    "student_update": ("PUT", "/students/{id}", op_student_update),
+    "student_delete": ("DELETE", "/students/{id}", op_student_delete),
+    "class_delete": ("DELETE", "/classes/{id}", op_class_delete),
+}
+
+
+def percentile(sorted_values, p: float) -> float:
+    """最近秩法百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+async def run_scenario(client, ctx, name: str, args, counter: QueryCounter) -> dict:
+    method, path, op = SCENARIOS[name]
+    indexes = itertools.count()
+    latencies, statuses = [], {}
+
+    async def worker():
+        while True:
+            i = next(indexes)
+            if i >= args.requests:
+                return
+            started = time.perf_counter()
+            response = await op(client, ctx, i)
+            if response is None:
+                return
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    queries_before = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    queries = counter.count - queries_before
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "scenario": name,
+        "method": method,
+        "path": path,
+        "requests": count,
+        "errors": sum(n for code, n in statuses.items() if code >= 400),
+        "statuses": {str(code): n for code, n in sorted(statuses.items())},
+        "rps": count / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies) / count * 1000 if count else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "queries_per_request": queries / count if count else 0.0,
+    }
+
+
+def start_uvicorn(app, port: int):
+    """在后台线程中启动 uvicorn，与压测客户端共享进程，以便统计 SQL 语句数"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if server.started:
+            return server, thread
+        time.sleep(0.05)
+    raise RuntimeError("uvicorn 启动超时")
+
+
+async def run_transport(transport: str, app, ctx, args, counter) -> list:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    server = None
+    if transport == "inprocess":
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120)
+    else:
+        server, thread = start_uvicorn(app, args.port)
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=120)
+    results = []
+    try:
+        for name in args.scenarios:
+            result = await run_scenario(client, ctx, name, args, counter)
+            result["transport"] = transport
+            results.append(result)
+            print("{transport:>9} {scenario:<17} {requests:>5} 次, {errors} 错误, {rps:8.1f} req/s, "
+                  "p50 {p50_ms:7.1f} / p95 {p95_ms:7.1f} / p99 {p99_ms:7.1f} ms, "
+                  "{queries_per_request:5.1f} 条 SQL/请求".format(**result))
+    finally:
+        await client.aclose()
+        if server is not None:
+            server.should_exit = True
+            thread.join()
+    return results
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(results: list, baseline_path: str):
+    """与之前保存的结果对比 p95 延迟和吞吐量"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["transport"], r["scenario"]): r for r in baseline["results"]}
+    print(f"\n与 {baseline_path}（{baseline['meta'].get('commit')}）对比：")
+    for result in results:
+        old = previous.get((result["transport"], result["scenario"]))
+        if not old or not old["p95_ms"] or not old["rps"]:
+            continue
+        p95_change = (result["p95_ms"] / old["p95_ms"] - 1) * 100
+        rps_change = (result["rps"] / old["rps"] - 1) * 100
+        print(f"{result['transport']:>9} {result['scenario']:<17} p95 {p95_change:+6.1f}%, 吞吐量 {rps_change:+6.1f}%, "
+              f"SQL/请求 {old['queries_per_request']:.1f} -> {result['queries_per_request']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teachers", type=int, default=5)
+    parser.add_argument("--classes", type=int, default=4, help="每位教师的班级数")
+    parser.add_argument("--groups", type=int, default=6, help="每个班级的分组数")
+    parser.add_argument("--students", type=int, default=40, help="每个分组的学生数")
+    parser.add_argument("--history", type=int, default=20000, help="预先生成的点名记录总数")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=300, help="每个场景的请求数")
+    parser.add_argument("--transport", choices=TRANSPORTS, nargs="+", default=list(TRANSPORTS))
+    parser.add_argument("--scenarios", choices=list(SCENARIOS), nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--port", type=int, default=8111)
+    parser.add_argument("--db", help="数据库文件路径，默认使用临时文件")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 benchmarks/results/<时间>-<提交>.json")
+    parser.add_argument("--baseline", help="与之前保存的结果 JSON 对比")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.db:
+        os.environ["DB_FILE"] = os.path.abspath(args.db)
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        os.environ["DB_FILE"] = os.path.join(tmp.name, "bench.db")
+
+    # 压测脚本从同一地址反复登录，关闭登录限流
+    os.environ.setdefault("LOGIN_RATE_LIMIT_IP", "0")
+    os.environ.setdefault("LOGIN_RATE_LIMIT_USER", "0")
+
+    # 数据库、认证等模块在导入时读取环境变量，须在设置 DB_FILE 之后导入
+    import main as app_module
+    import migrate
+    from auth import get_password_hash
+    from database import SessionLocal, engine, async_engine
+    from sqlalchemy import event
+
+    migrate.upgrade(engine, log=lambda message: None)
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        teachers = seed(db, args.teachers, args.classes, args.groups, args.students, args.history,
+                        get_password_hash(BENCH_PASSWORD))
+    finally:
+        db.close()
+    seed_seconds = time.perf_counter() - started
+    students = args.teachers * args.classes * args.groups * args.students
+    print(f"已生成 {args.teachers} 位教师、{students} 名学生、{args.history} 条点名记录，用时 {seed_seconds:.1f} s")
+
+    ctx = BenchContext(teachers)
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    if async_engine is not None:
+        event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+
+    async def run_all():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app_module.app), base_url="http://bench") as client:
+            for teacher in teachers:
+                response = await client.post("/auth/login", json={"username": teacher.username, "password": BENCH_PASSWORD})
+                ctx.tokens[teacher.username] = response.json()["accessToken"]
+        results = []
+        for transport in args.transport:
+            results.extend(await run_transport(transport, app_module.app, ctx, args, counter))
+        return results
+
+    try:
+        results = asyncio.run(run_all())
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    commit, dirty = git_revision()
+    meta = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": {name: metadata.version(name) for name in ("fastapi", "starlette", "sqlalchemy", "pydantic")},
+        "env": {name: os.environ[name] for name in RECORDED_ENV if name in os.environ},
+        "dataset": {
+            "teachers": args.teachers, "classes": args.classes, "groups": args.groups,
+            "students": args.students, "history": args.history, "seed_seconds": round(seed_seconds, 2),
+        },
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{commit or 'unknown'}{'-dirty' if dirty else ''}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
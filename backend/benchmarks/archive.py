@@ -0,0 +1,167 @@
+"""点名记录归档计时
+
+在临时数据库中生成跨越多年的点名历史，归档一年以前的记录，输出：
+- 归档前后的数据库文件大小（归档后执行 incremental_vacuum）
+- 归档前后班级点名历史首页、按学生筛选的历史查询耗时
+- 分批归档时每批的写锁持有时间，以及归档期间并发点名写入的最大等待时间；
+  与大批次归档对比
+- 统计汇总和导出总行数在归档前后是否一致
+
+用法（在 backend 目录下）：
+    python -m benchmarks.archive --history 300000 --years 3
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select, text
+
+
+def file_size(engine) -> int:
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(engine.url.database)
+
+
+def median_ms(engine, statement, runs: int) -> float:
+    samples = []
+    with engine.connect() as conn:
+        for _ in range(runs):
+            started = time.perf_counter()
+            conn.execute(statement).fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def totals(engine, owner_id: int):
+    from queries import export_select
+    with engine.connect() as conn:
+        exported = conn.execute(select(func.count()).select_from(export_select(owner_id).subquery())).scalar()
+        summary = conn.execute(text("SELECT sum(call_count) FROM student_call_stats")).scalar()
+        daily = conn.execute(text("SELECT sum(call_count) FROM daily_call_stats")).scalar()
+    return exported, summary, daily
+
+
+class Writer(threading.Thread):
+    """模拟点名写入：每 10 ms 插入一条记录，记录每次提交的耗时"""
+
+    def __init__(self, engine, student):
+        super().__init__(daemon=True)
+        self.engine = engine
+        self.student = student
+        self.latencies = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        student_id, group_id, class_id = self.student
+        with self.engine.connect() as conn:
+            while not self.stopped.is_set():
+                started = time.perf_counter()
+                conn.execute(text(
+                    "INSERT INTO roll_call_records (student_id, group_id, class_id, called_at) VALUES (:s, :g, :c, :t)"
+                ), {"s": student_id, "g": group_id, "c": class_id, "t": datetime.utcnow()})
+                conn.commit()
+                self.latencies.append((time.perf_counter() - started) * 1000)
+                time.sleep(0.01)
+
+
+def timed_archive(engine, cutoff, batch_size: int, student):
+    """执行归档并返回 (总耗时 s, 各批耗时 ms, 并发写入耗时 ms)"""
+    import archive
+    writer = Writer(engine, student)
+    writer.start()
+    batches = []
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        while True:
+            batch_started = time.perf_counter()
+            if not archive.archive_batch(conn, cutoff, batch_size):
+                break
+            batches.append((time.perf_counter() - batch_started) * 1000)
+            time.sleep(archive.ARCHIVE_BATCH_PAUSE)
+    elapsed = time.perf_counter() - started
+    writer.stopped.set()
+    writer.join()
+    return elapsed, batches, writer.latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.archive", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classes", type=int, default=4)
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--history", type=int, default=300000)
+    parser.add_argument("--years", type=int, default=3, help="点名历史跨越的年数，归档一年以前的记录")
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--large-batch", type=int, default=30000, help="对比用的大批次（受 SQLite 参数个数上限约束）")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DB_FILE"] = os.path.join(tmp.name, "archive.db")
+
+    import archive
+    import migrate
+    from database import SessionLocal, engine
+    from models import User
+    from queries import history_statement
+    from benchmarks.dataset import seed
+
+    migrate.upgrade(engine, log=lambda message: None)
+    with SessionLocal() as db:
+        teacher = seed(db, 1, args.classes, args.groups, args.students, args.history, "x", days=args.years * 365)[0]
+        owner_id = db.scalar(select(User.id).where(User.username == teacher.username))
+    print(f"{args.classes} 个班级共 {len(teacher.students)} 名学生，{args.years} 年内 {args.history} 条点名记录")
+
+    class_id = teacher.class_ids[0]
+    student_id = teacher.students[0][0]
+    queries = {
+        "班级历史首页": history_statement(owner_id, class_id=class_id),
+        "学生历史首页": history_statement(owner_id, student_id=student_id),
+        "近 30 天班级历史": history_statement(owner_id, class_id=class_id,
+                                        start=datetime.utcnow() - timedelta(days=30), limit=1000),
+    }
+    cutoff = datetime.utcnow() - timedelta(days=365)
+
+    # 复制一份用于大批次归档对比
+    size_before = file_size(engine)
+    large_path = os.path.join(tmp.name, "large.db")
+    shutil.copy(engine.url.database, large_path)
+
+    before = {name: median_ms(engine, statement, args.runs) for name, statement in queries.items()}
+    totals_before = totals(engine, owner_id)
+
+    elapsed, batches, writes = timed_archive(engine, cutoff, archive.ARCHIVE_BATCH_SIZE, teacher.students[1])
+    with engine.connect() as conn:
+        archived = conn.exec_driver_sql("SELECT count(*) FROM roll_call_archive").scalar()
+        reclaimed = archive.incremental_vacuum(conn)
+    size_after = file_size(engine)
+    after = {name: median_ms(engine, statement, args.runs) for name, statement in queries.items()}
+    exported, summary, daily = totals(engine, owner_id)
+    # 归档期间写入的新记录同时计入导出和汇总
+    extra = len(writes)
+
+    print(f"\n分批归档（每批 {archive.ARCHIVE_BATCH_SIZE} 条）: 归档 {archived} 条，共 {elapsed:.1f} s，{len(batches)} 批，"
+          f"每批写锁 中位数 {statistics.median(batches):.1f} ms / 最大 {max(batches):.1f} ms")
+    print(f"  并发点名写入 {len(writes)} 次，耗时 中位数 {statistics.median(writes):.1f} ms / 最大 {max(writes):.1f} ms")
+    print(f"  数据库文件 {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB（incremental_vacuum 回收 {reclaimed} 页）")
+    for name in queries:
+        print(f"  {name}: {before[name]:.2f} ms -> {after[name]:.2f} ms")
+    print(f"  导出行数与统计汇总一致: "
+          f"{(exported, summary, daily) == tuple(value + extra for value in totals_before)}")
+
+    large = create_engine(f"sqlite:///{large_path}", connect_args={"timeout": 60})
+    elapsed, batches, writes = timed_archive(large, cutoff, args.large_batch, teacher.students[1])
+    print(f"\n大批次归档（每批 {args.large_batch} 条）: 共 {elapsed:.1f} s，{len(batches)} 批，"
+          f"每批写锁 最大 {max(batches):.0f} ms；并发点名写入 {len(writes)} 次，最大等待 {max(writes):.0f} ms")
+    large.dispose()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
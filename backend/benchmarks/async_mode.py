@@ -0,0 +1,129 @@
+"""同步 / 异步数据库模式并发压测
+
+分别以 DB_ASYNC=false 和 DB_ASYNC=true 启动本地 uvicorn，
+用并发客户端请求 /classes、/roll-call/history 和 POST /roll-call，比较吞吐量和延迟。
+
+用法（在 backend 目录下，需要额外安装 httpx）：
+    python benchmarks/async_mode.py --concurrency 100 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(async_mode: bool, port: int, db_file: str):
+    env = dict(
+        os.environ,
+        DB_FILE=db_file,
+        DB_ASYNC="true" if async_mode else "false",
+        BCRYPT_ROUNDS="4",
+        ADMIN_USER="admin",
+        ADMIN_PASSWORD="123456",
+    )
+    subprocess.run([sys.executable, "migrate.py"], cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient):
+    for _ in range(100):
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("服务启动超时")
+
+
+async def seed(client: httpx.AsyncClient, groups: int, students: int):
+    class_data = (await client.post("/classes", json={"name": "压测班级"})).json()
+    student_ids = []
+    for g in range(groups):
+        group = (await client.post("/groups", json={"name": f"第{g + 1}组", "classId": class_data["id"]})).json()
+        for i in range(students):
+            student = (await client.post("/students", json={
+                "studentId": f"{g:02d}{i:03d}", "name": f"学生{g}-{i}", "groupId": group["id"]
+            })).json()
+            student_ids.append(student["id"])
+    return class_data["id"], student_ids
+
+
+async def run_mode(async_mode: bool, args):
+    port = args.port + (1 if async_mode else 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(async_mode, port, os.path.join(tmp, "bench.db"))
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                await wait_ready(client)
+                login = await client.post("/auth/login", json={"username": "admin", "password": "123456"})
+                client.headers["Authorization"] = f"Bearer {login.json()['accessToken']}"
+                class_id, student_ids = await seed(client, args.groups, args.students)
+
+                requests = [
+                    ("GET", "/classes", None),
+                    ("GET", "/roll-call/history", None),
+                    ("POST", "/roll-call", {"studentId": student_ids[0], "classId": class_id}),
+                ]
+                latencies, errors = [], 0
+                deadline = time.perf_counter() + args.duration
+
+                async def worker(n: int):
+                    nonlocal errors
+                    i = n
+                    while time.perf_counter() < deadline:
+                        method, url, body = requests[i % len(requests)]
+                        i += 1
+                        started = time.perf_counter()
+                        response = await client.request(method, url, json=body)
+                        latencies.append(time.perf_counter() - started)
+                        if response.status_code != 200:
+                            errors += 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+                elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    return {
+        "mode": "async" if async_mode else "sync",
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--groups", type=int, default=5)
+    parser.add_argument("--students", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+
+    for async_mode in (False, True):
+        result = asyncio.run(run_mode(async_mode, args))
+        print("{mode:>5}: {requests} 次请求, {errors} 个错误, {rps:.1f} req/s, "
+              "p50 {p50_ms:.1f} ms, p95 {p95_ms:.1f} ms".format(**result))
+
+
+if __name__ == "__main__":
+    main()
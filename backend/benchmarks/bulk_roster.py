@@ -0,0 +1,121 @@
+"""学生批量编辑计时：逐个 PUT /students/{id} vs 一次 POST /students/bulk
+
+在临时数据库中生成一个班级的花名册并建立公平轮换状态，分别测量：
+- 逐个请求修改每名学生的权重（每次一个事务、一次提交）
+- 一次批量请求修改同样数量学生的权重，以及批量换组
+输出总耗时和事务提交次数，并确认两种方式修改后的权重和轮换状态一致。
+
+用法（在 backend 目录下，需要额外安装 httpx）：
+    python -m benchmarks.bulk_roster --groups 8 --students 40
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import warnings
+
+from sqlalchemy import event, text
+
+
+def counting_commits(engine):
+    counter = {"commits": 0}
+
+    @event.listens_for(engine, "commit")
+    def on_commit(conn):
+        counter["commits"] += 1
+
+    return counter
+
+
+def snapshot(engine, class_id: int):
+    """(学生, 分组, 权重) 和各轮换中的成员，用于比较两种方式的结果"""
+    with engine.connect() as conn:
+        students = conn.execute(text(
+            "SELECT s.id, s.group_id, s.weight FROM students s JOIN groups g ON g.id = s.group_id "
+            "WHERE g.class_id = :c ORDER BY s.id"
+        ), {"c": class_id}).all()
+        entries = conn.execute(text(
+            "SELECT r.selection, e.student_id FROM rotation_entries e JOIN rotations r ON r.id = e.rotation_id "
+            "WHERE r.class_id = :c ORDER BY 1, 2"
+        ), {"c": class_id}).all()
+    return students, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bulk_roster", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--students", type=int, default=40)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DB_FILE"] = os.path.join(tmp.name, "bulk.db")
+
+    from fastapi.testclient import TestClient
+
+    import main as app_module
+    import migrate
+    from auth import create_access_token
+    from database import SessionLocal, engine
+    from benchmarks.dataset import seed
+
+    migrate.upgrade(engine, log=lambda message: None)
+    with SessionLocal() as db:
+        teacher = seed(db, 1, 1, args.groups, args.students, 0, "x")[0]
+    class_id = teacher.class_ids[0]
+    group_ids = teacher.group_ids[class_id]
+    student_ids = [student for student, _, _ in teacher.students]
+
+    client = TestClient(app_module.app)
+    client.headers["Authorization"] = f"Bearer {create_access_token({'sub': teacher.username})}"
+    client.post("/roll-call/draw", json={"classId": class_id, "mode": "rotation"})
+    client.post("/roll-call/draw", json={"classId": class_id, "mode": "rotation", "groupIds": group_ids[:2]})
+
+    rng = random.Random(1)
+    weights = {student_id: rng.choice([0, 0.5, 1, 2, 3]) for student_id in student_ids}
+    commits = counting_commits(engine)
+    print(f"{len(student_ids)} 名学生，{len(group_ids)} 个分组，两个轮换状态")
+
+    started = time.perf_counter()
+    for student_id, weight in weights.items():
+        assert client.put(f"/students/{student_id}", json={"weight": weight}).status_code == 200
+    single_s, single_commits = time.perf_counter() - started, commits["commits"]
+    single_state = snapshot(engine, class_id)
+
+    # 恢复初始权重后用批量接口再做一次
+    client.post("/students/bulk", json={"operations": [
+        {"op": "weight", "id": student_id, "weight": 1.0} for student_id in student_ids
+    ]})
+    commits["commits"] = 0
+    started = time.perf_counter()
+    response = client.post("/students/bulk", json={"operations": [
+        {"op": "weight", "id": student_id, "weight": weight} for student_id, weight in weights.items()
+    ]})
+    assert response.status_code == 200, response.text
+    bulk_s, bulk_commits = time.perf_counter() - started, commits["commits"]
+    bulk_state = snapshot(engine, class_id)
+
+    print(f"\n修改 {len(weights)} 名学生的权重")
+    print(f"  逐个 PUT: {single_s * 1000:.0f} ms，{len(weights)} 次请求，{single_commits} 次提交")
+    print(f"  批量接口: {bulk_s * 1000:.1f} ms，1 次请求，{bulk_commits} 次提交，加速 {single_s / bulk_s:.0f}x")
+    print(f"  权重和轮换成员一致: {single_state == bulk_state}")
+
+    # 把前两组的学生整体换到最后一组
+    moving = [student for student, group, _ in teacher.students if group in group_ids[:2]]
+    started = time.perf_counter()
+    response = client.post("/students/bulk", json={"operations": [
+        {"op": "move", "id": student_id, "groupId": group_ids[-1]} for student_id in moving
+    ]})
+    assert response.status_code == 200, response.text
+    with engine.connect() as conn:
+        remaining = conn.scalar(text("SELECT count(*) FROM students WHERE group_id IN (:a, :b)"),
+                                {"a": group_ids[0], "b": group_ids[1]})
+    print(f"\n批量换组 {len(moving)} 名学生: {(time.perf_counter() - started) * 1000:.1f} ms，原分组剩余 {remaining} 人")
+    client.close()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
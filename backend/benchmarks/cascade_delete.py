@@ -0,0 +1,107 @@
+"""级联删除计时：ORM 逐行 cascade vs cascade.py 批量 DELETE
+
+在临时数据库中为两位教师各生成若干个同样规模的大班级，依次用三种方式各删除一个班级：
+- db.delete(班级)：原实现，不删除点名记录，留下孤立记录
+- db.delete(班级) 并逐条 db.delete 点名记录：ORM 下保持一致的做法
+- delete_classes：批量 DELETE
+再用批量方式删除一位教师名下的全部班级；输出耗时、孤立点名记录数，
+并核对统计汇总表与完整历史重新计算的结果一致。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.cascade_delete --groups 20 --students 50 --history 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import select, text
+
+
+def count_orphans(db):
+    return db.execute(text("""
+        SELECT count(*) FROM roll_call_records r
+        WHERE NOT EXISTS (SELECT 1 FROM students s WHERE s.id = r.student_id)
+           OR NOT EXISTS (SELECT 1 FROM classes c WHERE c.id = r.class_id)
+    """)).scalar()
+
+
+def stats_consistent(db) -> bool:
+    """汇总表与从点名记录直接聚合的结果一致（只比较学生维度）"""
+    mismatched = db.execute(text("""
+        SELECT count(*) FROM (
+            SELECT student_id, count(*) AS n FROM roll_call_records GROUP BY student_id
+        ) AS expected
+        FULL OUTER JOIN student_call_stats s USING (student_id)
+        WHERE expected.n IS NOT s.call_count
+    """)).scalar()
+    return mismatched == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.cascade_delete", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classes", type=int, default=3, help="每位教师的班级数（至少 3）")
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--history", type=int, default=200000)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DB_FILE"] = os.path.join(tmp.name, "cascade.db")
+
+    import migrate
+    from cascade import delete_classes, delete_owned_classes
+    from database import SessionLocal, engine
+    from models import Class, User, RollCallRecord
+    from benchmarks.dataset import seed
+
+    migrate.upgrade(engine, log=lambda message: None)
+    db = SessionLocal()
+    try:
+        teachers = seed(db, 2, args.classes, args.groups, args.students, args.history, "x")
+        per_class = args.groups * args.students
+        print(f"2 位教师 × {args.classes} 个班级，每班 {per_class} 名学生，共 {args.history} 条点名记录")
+
+        orm_class, orm_records_class, bulk_class = teachers[0].class_ids[:3]
+
+        started = time.perf_counter()
+        db.delete(db.get(Class, orm_class))
+        db.commit()
+        orphans = count_orphans(db)
+        print(f"ORM cascade（原实现）:        {(time.perf_counter() - started) * 1000:8.1f} ms，遗留孤立点名记录 {orphans} 条")
+
+        started = time.perf_counter()
+        for record in db.query(RollCallRecord).filter(RollCallRecord.class_id == orm_records_class):
+            db.delete(record)
+        db.delete(db.get(Class, orm_records_class))
+        db.commit()
+        orm_seconds = time.perf_counter() - started
+        print(f"ORM cascade + 逐条删除记录:   {orm_seconds * 1000:8.1f} ms，新增孤立点名记录 {count_orphans(db) - orphans} 条")
+
+        started = time.perf_counter()
+        delete_classes(db, select(Class.id).where(Class.id == bulk_class))
+        db.commit()
+        bulk_seconds = time.perf_counter() - started
+        print(f"批量 DELETE:                  {bulk_seconds * 1000:8.1f} ms，新增孤立点名记录 {count_orphans(db) - orphans} 条，"
+              f"比 ORM 一致删除快 {orm_seconds / bulk_seconds:.1f}x")
+
+        owner_id = db.scalar(select(User.id).where(User.username == teachers[1].username))
+        started = time.perf_counter()
+        delete_owned_classes(db, owner_id)
+        db.delete(db.get(User, owner_id))
+        db.commit()
+        print(f"批量 DELETE 删除教师（{args.classes} 个班级）: {(time.perf_counter() - started) * 1000:.1f} ms，"
+              f"新增孤立点名记录 {count_orphans(db) - orphans} 条")
+
+        # 清理 ORM 删除遗留的孤立记录后，汇总表应与历史完全一致
+        db.execute(text("DELETE FROM roll_call_records WHERE class_id = :id"), {"id": orm_class})
+        db.commit()
+        print(f"统计汇总表一致: {stats_consistent(db)}")
+    finally:
+        db.close()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
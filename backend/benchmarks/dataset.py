@@ -0,0 +1,77 @@
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from models import User, Class, Group, Student, RollCallRecord
+
+BENCH_PASSWORD = "bench123456"
+HISTORY_BATCH_SIZE = 5000
+
+
+@dataclass
+class Teacher:
+    """压测用教师账号及其花名册的主键，供压测场景构造请求"""
+    username: str
+    class_ids: List[int] = field(default_factory=list)
+    group_ids: Dict[int, List[int]] = field(default_factory=dict)  # 班级 -> 分组
+    students: List[tuple] = field(default_factory=list)  # (学生, 分组, 班级)
+
+
+def seed(db: Session, teachers: int, classes: int, groups: int, students: int, history: int,
+         hashed_password: str, days: int = 120, rng_seed: int = 42) -> List[Teacher]:
+    """生成 教师 × 班级 × 分组 × 学生 的花名册，以及在最近 days 天内随机分布的 history 条点名记录"""
+    rng = random.Random(rng_seed)
+    result = []
+    for t in range(teachers):
+        user = User(
+            username=f"bench_teacher_{t}",
+            email=f"bench_teacher_{t}@example.com",
+            hashed_password=hashed_password,
+            user_type="teacher",
+        )
+        db.add(user)
+        db.flush()
+        teacher = Teacher(username=user.username)
+        for c in range(classes):
+            cls = Class(name=f"压测班级{t}-{c}", owner_id=user.id)
+            for g in range(groups):
+                group = Group(name=f"第{g + 1}组")
+                group.students = [
+                    Student(
+                        student_id=f"{t:02d}{c:02d}{g:02d}{s:03d}",
+                        name=f"学生{t}-{c}-{g}-{s}",
+                        weight=rng.choice((1.0, 1.0, 1.0, 0.5, 2.0)),
+                    )
+                    for s in range(students)
+                ]
+                cls.groups.append(group)
+            db.add(cls)
+            db.flush()
+            teacher.class_ids.append(cls.id)
+            teacher.group_ids[cls.id] = [group.id for group in cls.groups]
+            teacher.students.extend(
+                (student.id, group.id, cls.id) for group in cls.groups for student in group.students
+            )
+        result.append(teacher)
+    db.commit()
+
+    # 点名记录量大，按批批量插入，统计汇总表由触发器同步维护
+    everyone = [student for teacher in result for student in teacher.students]
+    now = datetime.utcnow()
+    span = days * 24 * 3600
+    for offset in range(0, history, HISTORY_BATCH_SIZE):
+        rows = []
+        for _ in range(min(HISTORY_BATCH_SIZE, history - offset)):
+            student_id, group_id, class_id = rng.choice(everyone)
+            rows.append({
+                "student_id": student_id,
+                "group_id": group_id,
+                "class_id": class_id,
+                "called_at": now - timedelta(seconds=rng.randrange(span)),
+            })
+        db.execute(RollCallRecord.__table__.insert(), rows)
+        db.commit()
+    return result
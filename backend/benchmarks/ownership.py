@@ -0,0 +1,149 @@
+"""所有权校验与点名历史筛选计时：班级 join 链 vs 冗余 owner_id 列
+
+在临时数据库中生成多位教师的花名册和点名历史，分别测量：
+- 迁移前：经 分组 -> 班级 join 判断所属教师，且没有 classes.owner_id、groups.class_id、
+  (owner_id, called_at, id) 索引（从副本中删除这几个索引模拟）
+- 迁移后：直接按 groups / students / roll_call_records 上的 owner_id 判断
+
+用法（在 backend 目录下）：
+    python -m benchmarks.ownership --teachers 40 --history 400000
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select
+
+NEW_INDEXES = ("ix_classes_owner_id", "ix_groups_class_id", "ix_roll_call_records_owner_called_at")
+
+
+def legacy_history(owner_id: int, start=None, limit: int = 50):
+    """迁移前的点名历史查询：经班级表按教师筛选"""
+    from models import Class, Group, Student, RollCallRecord
+    stmt = (
+        select(
+            RollCallRecord.id, RollCallRecord.student_id, RollCallRecord.group_id,
+            RollCallRecord.class_id, RollCallRecord.called_at,
+            Student.name, Student.student_id, Group.name, Class.name
+        )
+        .join(Class, RollCallRecord.class_id == Class.id)
+        .join(Group, RollCallRecord.group_id == Group.id)
+        .join(Student, RollCallRecord.student_id == Student.id)
+        .where(Class.owner_id == owner_id)
+    )
+    if start is not None:
+        stmt = stmt.where(RollCallRecord.called_at >= start)
+    return stmt.order_by(RollCallRecord.called_at.desc(), RollCallRecord.id.desc()).limit(limit + 1)
+
+
+def scenarios(teacher, owner_id: int, rng):
+    """返回 {场景: (迁移前语句列表, 迁移后语句列表)}，每个场景随机取若干参数"""
+    from models import Class, Group, Student
+    from queries import history_statement
+    students = [student for student, _, _ in teacher.students]
+    groups = [group for ids in teacher.group_ids.values() for group in ids]
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    picks = [rng.choice(students) for _ in range(20)]
+    group_picks = [rng.choice(groups) for _ in range(20)]
+    batch = rng.sample(students, min(200, len(students)))
+    return {
+        "学生所有权校验": (
+            [select(Student).join(Group).join(Class).where(Student.id == s, Class.owner_id == owner_id) for s in picks],
+            [select(Student).where(Student.id == s, Student.owner_id == owner_id) for s in picks],
+        ),
+        "分组所有权校验": (
+            [select(Group).join(Class).where(Group.id == g, Class.owner_id == owner_id) for g in group_picks],
+            [select(Group).where(Group.id == g, Group.owner_id == owner_id) for g in group_picks],
+        ),
+        "批量点名校验 200 名学生": (
+            [select(Student.id, Student.group_id).join(Group).join(Class)
+             .where(Student.id.in_(batch), Class.owner_id == owner_id)],
+            [select(Student.id, Student.group_id).where(Student.id.in_(batch), Student.owner_id == owner_id)],
+        ),
+        "教师的班级列表": (
+            [select(Class).where(Class.owner_id == owner_id)],
+            [select(Class).where(Class.owner_id == owner_id)],
+        ),
+        "班级的分组列表": (
+            [select(Group).where(Group.class_id == class_id) for class_id in teacher.class_ids],
+            [select(Group).where(Group.class_id == class_id) for class_id in teacher.class_ids],
+        ),
+        "点名历史首页（不筛选）": (
+            [legacy_history(owner_id)],
+            [history_statement(owner_id)],
+        ),
+        "近 7 天点名历史": (
+            [legacy_history(owner_id, start=week_ago, limit=200)],
+            [history_statement(owner_id, start=week_ago, limit=200)],
+        ),
+    }
+
+
+def per_query_ms(engine, statements, runs: int) -> float:
+    """每条语句执行 runs 次，返回单次执行耗时的中位数"""
+    samples = []
+    with engine.connect() as conn:
+        for statement in statements:
+            conn.execute(statement).fetchall()
+            for _ in range(runs):
+                started = time.perf_counter()
+                conn.execute(statement).fetchall()
+                samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.ownership", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teachers", type=int, default=40)
+    parser.add_argument("--classes", type=int, default=3)
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--history", type=int, default=400000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DB_FILE"] = os.path.join(tmp.name, "after.db")
+
+    import migrate
+    from database import SessionLocal, engine
+    from models import User
+    from benchmarks.dataset import seed
+
+    migrate.upgrade(engine, log=lambda message: None)
+    with SessionLocal() as db:
+        teachers = seed(db, args.teachers, args.classes, args.groups, args.students, args.history, "x")
+        teacher = teachers[len(teachers) // 2]
+        owner_id = db.scalar(select(User.id).where(User.username == teacher.username))
+    total_students = args.teachers * args.classes * args.groups * args.students
+    print(f"{args.teachers} 位教师，共 {total_students} 名学生、{args.history} 条点名记录")
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    before_path = os.path.join(tmp.name, "before.db")
+    shutil.copy(engine.url.database, before_path)
+    before = create_engine(f"sqlite:///{before_path}")
+    with before.begin() as conn:
+        for name in NEW_INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX {name}")
+        conn.exec_driver_sql("ANALYZE")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    print(f"\n{'场景':<24}{'迁移前':>10}{'迁移后':>10}{'加速':>8}")
+    for name, (legacy, current) in scenarios(teacher, owner_id, random.Random(7)).items():
+        old_ms = per_query_ms(before, legacy, args.runs)
+        new_ms = per_query_ms(engine, current, args.runs)
+        print(f"{name:<24}{old_ms:>8.3f}ms{new_ms:>8.3f}ms{old_ms / new_ms:>7.1f}x")
+    before.dispose()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
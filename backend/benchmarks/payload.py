@@ -0,0 +1,82 @@
+"""响应体积压测：字段投影（fields= / expand=）与 gzip / brotli 压缩
+
+在内存中构造大花名册（不访问数据库），分别以完整模型和裁剪后的模型返回 /classes 和点名记录，
+对每种投影比较不压缩、gzip、brotli 三种编码的响应字节数和单次请求耗时（含序列化和压缩）。
+
+用法（在 backend 目录下，需要额外安装 httpx；不安装 brotli 时跳过 br）：
+    python benchmarks/payload.py --classes 20 --groups 8 --students 40
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import compression
+from compression import CompressionMiddleware
+from projection import Projection, get_projection, view_schema, render_view
+from queries import CLASS_TREE_EXPAND, ROLL_CALL_RECORD_EXPAND
+from schemas import Class as ClassSchema, RollCallRecord as RollCallRecordSchema
+from benchmarks.serialization import build_roster
+
+CASES = [
+    ("/classes", "完整花名册树"),
+    ("/classes?fields=id,name,studentId", "fields=id,name,studentId"),
+    ("/classes?fields=id,name&expand=", "fields=id,name&expand="),
+    ("/records", "点名记录（默认含完整班级树）"),
+    ("/records?expand=student,groupObj", "expand=student,groupObj"),
+]
+
+
+def timed(client: TestClient, url: str, encoding: str, rounds: int):
+    headers = {"Accept-Encoding": encoding}
+    client.get(url, headers=headers)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        with client.stream("GET", url, headers=headers) as response:
+            body = b"".join(response.iter_raw())
+    return (time.perf_counter() - started) / rounds * 1000, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    classes, records = build_roster(args.classes, args.groups, args.students)
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/classes")
+    def get_classes(projection: Projection = Depends(get_projection)):
+        schema = List[ClassSchema]
+        view = view_schema(ClassSchema, projection, CLASS_TREE_EXPAND)
+        return render_view(schema, schema if view is ClassSchema else List[view], classes)
+
+    @app.get("/records")
+    def get_record(projection: Projection = Depends(get_projection)):
+        view = view_schema(RollCallRecordSchema, projection, ROLL_CALL_RECORD_EXPAND)
+        return render_view(RollCallRecordSchema, view, records[0])
+
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+    client = TestClient(app)
+    print(f"{args.classes} 个班级 × {args.groups} 个分组 × {args.students} 名学生")
+    print(f"\n{'请求':<36}" + "".join(f"{encoding:>22}" for encoding in encodings))
+    for url, name in CASES:
+        cells = []
+        for encoding in encodings:
+            ms, size = timed(client, url, encoding, args.rounds)
+            cells.append(f"{size:>10} B {ms:>7.2f} ms")
+        print(f"{name:<36}" + "".join(f"{cell:>22}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
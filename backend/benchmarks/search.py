@@ -0,0 +1,122 @@
+"""学生搜索计时：按教师扫描 vs FTS5 trigram 全文索引 vs 迁移前的 LIKE 扫描
+
+在临时数据库中生成多位教师的花名册（默认共 10 万名学生，姓名随机组合常见姓氏和名字），
+并把前一半教师的班级转给第一位教师，得到一位普通教师和一位学生数很多的教师。对两人分别测量各类输入：
+- 扫描：按 owner_id 索引扫描该教师的学生
+- 全文：student_search 全文索引（至少 3 个字符）
+- 迁移前：不使用全文索引和 owner_id 索引，经班级表 join 后对姓名、学号做 LIKE '%...%'
+带 * 的一列是 search.search_students 实际选择的方式。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.search --teachers 50 --students 50
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import select, text, update
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢"
+GIVEN = "伟芳娜秀英敏静丽强磊军洋勇艳杰娟涛明超秀兰霞平刚桂英华玉萍红娥玲芬燕彩春菊兰凤洁梅琳素云莲真环雪荣爱妹霞香月莺媛"
+
+LEGACY = text("""
+    SELECT s.id, s.student_id, s.name, s.weight, s.group_id, g.name AS group_name,
+           g.class_id, c.name AS class_name
+    FROM students s NOT INDEXED
+    JOIN groups g ON g.id = s.group_id
+    JOIN classes c ON c.id = g.class_id
+    WHERE c.owner_id = :owner_id
+      AND (s.name LIKE :contains ESCAPE '\\' OR s.student_id LIKE :contains ESCAPE '\\')
+    ORDER BY s.name, s.id
+    LIMIT :limit
+""")
+
+
+def random_name(rng) -> str:
+    return rng.choice(SURNAMES) + "".join(rng.choice(GIVEN) for _ in range(rng.choice((1, 2, 2))))
+
+
+def timed(conn, statement, params, runs: int):
+    """返回 (中位数 ms, p95 ms, 结果行数)"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rows = conn.execute(statement, params).all()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1], len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.search", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teachers", type=int, default=50)
+    parser.add_argument("--classes", type=int, default=4)
+    parser.add_argument("--groups", type=int, default=10)
+    parser.add_argument("--students", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["DB_FILE"] = os.path.join(tmp.name, "search.db")
+
+    import migrate
+    import search
+    from database import SessionLocal, engine
+    from models import Class, Student, User
+    from benchmarks.dataset import seed
+
+    migrate.upgrade(engine, log=lambda message: None)
+    rng = random.Random(3)
+    with SessionLocal() as db:
+        teachers = seed(db, args.teachers, args.classes, args.groups, args.students, 0, "x")
+        owners = [db.scalar(select(User.id).where(User.username == item.username)) for item in teachers]
+        # 改名经触发器同步到全文索引；转移班级经触发器同步学生的 owner_id
+        everyone = [student for item in teachers for student, _, _ in item.students]
+        db.execute(update(Student), [{"id": student_id, "name": random_name(rng)} for student_id in everyone])
+        db.execute(update(Class).where(Class.owner_id.in_(owners[1:len(owners) // 2])).values(owner_id=owners[0]))
+        db.commit()
+        subjects = [owners[len(owners) * 3 // 4], owners[0]]
+        rosters = {
+            owner_id: db.execute(select(Student.name, Student.student_id).where(Student.owner_id == owner_id)).all()
+            for owner_id in subjects
+        }
+    print(f"{args.teachers} 位教师共 {len(everyone)} 名学生，全文索引阈值 {search.SEARCH_SCAN_MAX_STUDENTS} 名学生")
+
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        for owner_id, roster in rosters.items():
+            sample_name = max((name for name, _ in roster), key=len)
+            sample_number = roster[len(roster) // 2][1]
+            inputs = {
+                "姓氏（1 字）": sample_name[:1],
+                "姓名前两字": sample_name[:2],
+                "完整姓名（3 字）": sample_name,
+                "名字（后两字）": sample_name[1:],
+                "学号前缀（4 位）": sample_number[:4],
+                "学号片段（4 位）": sample_number[-4:],
+                "完整学号": sample_number,
+                "无结果": "不存在的人",
+            }
+            print(f"\n教师 {owner_id}（{len(roster)} 名学生）")
+            print(f"{'输入':<16}{'扫描':>10}{'全文':>10}{'迁移前':>10}{'结果':>6}")
+            for name, query in inputs.items():
+                scan, _ = search.search_statement(owner_id, query, limit=20)
+                indexed, params = search.search_statement(owner_id, query, limit=20, roster_size=len(everyone))
+                chosen, _ = search.search_statement(owner_id, query, limit=20, roster_size=len(roster))
+                scan_ms, _, count = timed(conn, scan, params, args.runs)
+                cells = f"{scan_ms:>7.2f}ms" + ("*" if chosen is scan else " ")
+                if indexed is scan:
+                    cells += f"{'-':>10}"
+                else:
+                    indexed_ms, _, _ = timed(conn, indexed, params, args.runs)
+                    cells += f"{indexed_ms:>7.2f}ms" + ("*" if chosen is indexed else " ")
+                legacy_ms, _, _ = timed(conn, LEGACY, params, max(5, args.runs // 5))
+                print(f"{name:<16}{cells}{legacy_ms:>8.2f}ms{min(count, 20):>6}  {query}")
+    tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
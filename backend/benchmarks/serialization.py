@@ -0,0 +1,97 @@
+"""响应序列化压测：FastAPI 默认 response_model 流程 vs fast_json 预构建 TypeAdapter
+
+在内存中构造大花名册（不访问数据库），通过同一个 FastAPI 应用的两个接口分别返回，
+比较耗时并确认两种方式的响应字节完全一致。
+
+用法（在 backend 目录下，需要额外安装 httpx）：
+    python benchmarks/serialization.py --classes 20 --groups 8 --students 40
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fast_json import render
+from models import Class, Group, Student, RollCallRecord
+from schemas import Class as ClassSchema, RollCallRecord as RollCallRecordSchema
+
+
+def build_roster(classes: int, groups: int, students: int):
+    now = datetime.utcnow()
+    result, records = [], []
+    student_id = group_id = 0
+    for c in range(1, classes + 1):
+        cls = Class(id=c, name=f"班级{c}", owner_id=1, created_at=now)
+        for _ in range(groups):
+            group_id += 1
+            group = Group(id=group_id, name=f"第{group_id}组", class_id=c, created_at=now)
+            for _ in range(students):
+                student_id += 1
+                group.students.append(Student(
+                    id=student_id, student_id=f"{student_id:06d}", name=f"学生{student_id}",
+                    weight=1.0, group_id=group_id, created_at=now
+                ))
+            cls.groups.append(group)
+        result.append(cls)
+        first_group = cls.groups[0]
+        for i, student in enumerate(first_group.students[:10]):
+            records.append(RollCallRecord(
+                id=len(records) + 1, student_id=student.id, class_id=c, group_id=first_group.id,
+                called_at=now, student=student, class_obj=cls, group_obj=first_group
+            ))
+    return result, records
+
+
+def timed(client: TestClient, url: str, rounds: int):
+    client.get(url)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        response = client.get(url)
+    return (time.perf_counter() - started) / rounds * 1000, response.content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    classes, records = build_roster(args.classes, args.groups, args.students)
+    app = FastAPI()
+
+    @app.get("/default/classes", response_model=List[ClassSchema])
+    def default_classes():
+        return classes
+
+    @app.get("/fast/classes", response_model=List[ClassSchema])
+    def fast_classes():
+        return render(List[ClassSchema], classes)
+
+    @app.get("/default/records", response_model=List[RollCallRecordSchema])
+    def default_records():
+        return records
+
+    @app.get("/fast/records", response_model=List[RollCallRecordSchema])
+    def fast_records():
+        return render(List[RollCallRecordSchema], records)
+
+    client = TestClient(app)
+    print(f"{args.classes} 个班级 × {args.groups} 个分组 × {args.students} 名学生，{len(records)} 条点名记录")
+    for name in ("classes", "records"):
+        default_ms, default_body = timed(client, f"/default/{name}", args.rounds)
+        fast_ms, fast_body = timed(client, f"/fast/{name}", args.rounds)
+        print(f"/{name}: 默认 {default_ms:.1f} ms, 快速 {fast_ms:.1f} ms, "
+              f"加速 {default_ms / fast_ms:.1f}x, {len(fast_body)} 字节, 字节一致: {default_body == fast_body}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""worker 冷启动耗时
+
+反复启动本地 uvicorn，测量从进程启动到 GET / 返回 200 的时间：
+- 首次启动：空数据库（存在 migrate.py 时先执行迁移，迁移耗时单独列出）
+- 重启：数据库已初始化，模拟滚动重启
+
+用法（在 backend 目录下，需要额外安装 httpx）：
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def migrate(env) -> float:
+    """执行迁移命令并返回耗时（秒）；旧版本没有迁移命令时返回 0"""
+    if not os.path.exists(os.path.join(BACKEND_DIR, "migrate.py")):
+        return 0.0
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "migrate.py"], cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def boot(env, port: int) -> float:
+    """启动 uvicorn，返回首个请求成功的耗时（秒）"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError("服务启动失败")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summary(samples) -> str:
+    ms = [sample * 1000 for sample in samples]
+    return f"中位数 {statistics.median(ms):.0f} ms，最小 {min(ms):.0f} ms，最大 {max(ms):.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    first_boots, migrations, restarts = [], [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for run in range(args.runs):
+            env = dict(os.environ, DB_FILE=os.path.join(tmp, f"startup-{run}.db"))
+            migrations.append(migrate(env))
+            first_boots.append(boot(env, args.port))
+            restarts.append(boot(env, args.port))
+
+    if any(migrations):
+        print(f"迁移命令: {summary(migrations)}")
+    print(f"首次启动: {summary(first_boots)}")
+    print(f"重启:     {summary(restarts)}")
+
+
+if __name__ == "__main__":
+    main()
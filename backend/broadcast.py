@@ -0,0 +1,185 @@
+"""点名事件广播
+
+每个班级一个频道，新保存的点名记录以精简事件推送给该班级的所有订阅者（投影、手机等），
+订阅端通过 SSE 接收，不必轮询历史接口。
+
+- 每个连接使用有界队列，消费过慢时丢弃最旧的事件，并发送 lagged 事件提示客户端重新拉取历史
+- 后端可替换：默认 memory:// 只在本进程内分发；多个 uvicorn worker 时使用 redis://，
+  各进程通过 Redis pub/sub 共享事件（需要安装 redis 包）
+"""
+import asyncio
+import os
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from fastapi.responses import StreamingResponse
+
+from fast_json import dump_json
+from schemas import RollCallRecordSummary
+
+BROADCAST_URL = os.getenv("BROADCAST_URL", "memory://")
+BROADCAST_QUEUE_SIZE = int(os.getenv("BROADCAST_QUEUE_SIZE", "64"))
+BROADCAST_PING_SECONDS = float(os.getenv("BROADCAST_PING_SECONDS", "15"))
+REDIS_CHANNEL_PREFIX = "rolling:"
+
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize)
+        self.lagged = False
+
+    def offer(self, message: str):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.lagged = True
+        self.queue.put_nowait(message)
+
+
+class MemoryBackend:
+    """进程内后端，发布即分发给本进程的订阅者"""
+    shared = False
+
+    async def start(self, deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, message: str):
+        self._deliver(channel, message)
+
+
+class RedisBackend:
+    """Redis pub/sub 后端，所有 worker 订阅同一前缀，收到后只分发给本进程的订阅者"""
+    shared = True
+
+    def __init__(self, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("BROADCAST_URL 使用 Redis 时需要安装 redis 包")
+        self._redis = redis.from_url(url)
+        self._reader = None
+
+    async def start(self, deliver):
+        self._deliver = deliver
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.psubscribe(f"{REDIS_CHANNEL_PREFIX}*")
+        self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        async for message in self._pubsub.listen():
+            channel = message["channel"].decode()[len(REDIS_CHANNEL_PREFIX):]
+            self._deliver(channel, message["data"].decode())
+
+    async def stop(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        await self._pubsub.aclose()
+        await self._redis.aclose()
+
+    async def publish(self, channel: str, message: str):
+        await self._redis.publish(f"{REDIS_CHANNEL_PREFIX}{channel}", message)
+
+
+def create_backend(url: str):
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    raise RuntimeError(f"不支持的 BROADCAST_URL: {url}")
+
+
+class BroadcastHub:
+    def __init__(self, backend, queue_size: int = BROADCAST_QUEUE_SIZE):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._loop = None
+        self._pending = set()
+
+    async def start(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            await self.backend.start(self._deliver)
+
+    async def stop(self):
+        if self._loop is not None:
+            await self.backend.stop()
+            self._loop = None
+
+    @property
+    def active(self) -> bool:
+        """是否可能有订阅者；进程内后端且无人订阅时，发布方可以跳过构造事件"""
+        return self._loop is not None and (self.backend.shared or bool(self._subscribers))
+
+    def _deliver(self, channel: str, message: str):
+        for subscription in self._subscribers.get(channel, ()):
+            subscription.offer(message)
+
+    def _publish_on_loop(self, channel: str, message: str):
+        task = self._loop.create_task(self.backend.publish(channel, message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def publish(self, channel: str, message: str):
+        """发布事件；线程安全，同步接口在线程池中也可直接调用，不等待发送完成"""
+        if not self.active:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._publish_on_loop, channel, message)
+        except RuntimeError:
+            # 事件循环已关闭（例如测试客户端退出），丢弃即可
+            pass
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        await self.start()
+        subscription = Subscription(self.queue_size)
+        self._subscribers[channel].add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+
+hub = BroadcastHub(create_backend(BROADCAST_URL))
+
+
+def class_channel(class_id: int) -> str:
+    return f"class:{class_id}"
+
+
+def publish_roll_calls(summaries):
+    """推送已提交的点名记录（RollCallRecordSummary）到各自班级的频道"""
+    for summary in summaries:
+        hub.publish(class_channel(summary.class_id), dump_json(RollCallRecordSummary, summary).decode())
+
+
+async def _event_stream(channel: str, event: str):
+    async with hub.subscribe(channel) as subscription:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), BROADCAST_PING_SECONDS)
+            except asyncio.TimeoutError:
+                # 心跳，防止代理断开空闲连接
+                yield ": ping\n\n"
+                continue
+            if subscription.lagged:
+                subscription.lagged = False
+                yield "event: lagged\ndata: {}\n\n"
+            yield f"event: {event}\ndata: {message}\n\n"
+
+
+def sse_response(channel: str, event: str) -> StreamingResponse:
+    """订阅频道并以 Server-Sent Events 推送；客户端断开时 Starlette 会取消生成器并退订"""
+    return StreamingResponse(
+        _event_stream(channel, event),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,136 @@
+"""学生批量编辑（换组、改权重、改名、删除）
+
+一次请求的全部操作在同一个事务中完成：
+- 一条查询校验所有涉及的学生、一条查询校验目标分组，任何一项不属于当前教师时整体拒绝
+- 按顺序合并各操作得到每名学生的最终状态，只写入实际变化的字段
+- 换组和改权重按目标值分组执行 UPDATE ... WHERE id IN (...)，改名用一次 executemany，
+  删除复用 cascade 的批量级联删除
+- 最后同步受影响班级的公平轮换状态
+
+调用方负责提交事务，并对返回的班级调用 roster_changed。
+"""
+from typing import Dict, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+import rotation
+from cascade import delete_students
+from models import Group, Student
+
+
+def _load(db, owner_id: int, operations):
+    student_ids = {operation.id for operation in operations}
+    rows = db.execute(
+        select(Student.id, Student.group_id, Student.weight, Student.student_id, Student.name, Group.class_id)
+        .join(Group, Student.group_id == Group.id)
+        .where(Student.id.in_(student_ids), Student.owner_id == owner_id)
+    ).all()
+    missing = student_ids - {row.id for row in rows}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"学生不存在: {', '.join(map(str, sorted(missing)))}")
+
+    group_ids = {operation.group_id for operation in operations if operation.op == "move" and operation.group_id}
+    group_classes = dict(db.execute(
+        select(Group.id, Group.class_id).where(Group.id.in_(group_ids), Group.owner_id == owner_id)
+    ).all()) if group_ids else {}
+    missing = group_ids - set(group_classes)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"分组不存在: {', '.join(map(str, sorted(missing)))}")
+    return {row.id: row for row in rows}, group_classes
+
+
+def _fold(operations) -> Tuple[Dict[int, dict], Set[int]]:
+    """按顺序合并操作，返回 ({学生: 最终字段值}, 待删除学生)"""
+    changes, deleted = {}, set()
+    for index, operation in enumerate(operations, start=1):
+        if operation.op == "delete":
+            deleted.add(operation.id)
+            continue
+        change = changes.setdefault(operation.id, {})
+        if operation.op == "move":
+            if not operation.group_id:
+                raise HTTPException(status_code=400, detail=f"第 {index} 项操作缺少 groupId")
+            change["group_id"] = operation.group_id
+        elif operation.op == "weight":
+            if operation.weight is None:
+                raise HTTPException(status_code=400, detail=f"第 {index} 项操作缺少 weight")
+            change["weight"] = operation.weight
+        else:
+            if not operation.student_id and not operation.name:
+                raise HTTPException(status_code=400, detail=f"第 {index} 项操作缺少 studentId 或 name")
+            if operation.student_id:
+                change["student_id"] = operation.student_id
+            if operation.name:
+                change["name"] = operation.name
+    conflicts = deleted & set(changes)
+    if conflicts:
+        raise HTTPException(
+            status_code=400, detail=f"学生不能在同一批中既删除又修改: {', '.join(map(str, sorted(conflicts)))}"
+        )
+    return changes, deleted
+
+
+def _update_by_value(db, field: str, values: Dict[int, object]):
+    """同一目标值的学生合并为一条 UPDATE"""
+    by_value = {}
+    for student_id, value in values.items():
+        by_value.setdefault(value, []).append(student_id)
+    for value, student_ids in by_value.items():
+        db.execute(
+            update(Student).where(Student.id.in_(student_ids)).values({field: value})
+            .execution_options(synchronize_session=False)
+        )
+
+
+def apply(db, owner_id: int, operations) -> Tuple[dict, Set[int]]:
+    """执行批量操作，返回 (变化摘要, 受影响的班级)"""
+    changes, deleted = _fold(operations)
+    current, group_classes = _load(db, owner_id, operations)
+
+    # 只保留实际变化的字段
+    diff = {}
+    for student_id, change in changes.items():
+        row = current[student_id]
+        changed = {field: value for field, value in change.items() if getattr(row, field) != value}
+        if changed:
+            diff[student_id] = changed
+
+    moves = {student_id: change["group_id"] for student_id, change in diff.items() if "group_id" in change}
+    weights = {student_id: change["weight"] for student_id, change in diff.items() if "weight" in change}
+    renames = [
+        {"id": student_id, **{field: change[field] for field in ("student_id", "name") if field in change}}
+        for student_id, change in diff.items() if "student_id" in change or "name" in change
+    ]
+    _update_by_value(db, "group_id", moves)
+    _update_by_value(db, "weight", weights)
+    # 键集合不同的行由 SQLAlchemy 分成几次 executemany
+    if renames:
+        db.execute(update(Student), renames)
+    if deleted:
+        delete_students(db, list(deleted))
+
+    # 轮换：先按最终分组重新取位置，再对换组涉及的班级补齐和剔除
+    reweights = {}
+    for student_id, weight in weights.items():
+        group_id = moves.get(student_id, current[student_id].group_id)
+        class_id = group_classes.get(group_id, current[student_id].class_id)
+        reweights.setdefault(class_id, []).append((student_id, group_id, weight))
+    for class_id, class_changes in reweights.items():
+        rotation.reweight_students(db, class_id, class_changes)
+    moved_classes = {current[student_id].class_id for student_id in moves} | {group_classes[g] for g in moves.values()}
+    for class_id in moved_classes:
+        rotation.sync_class(db, class_id)
+
+    final = {student_id: {**row._asdict(), **diff.get(student_id, {})} for student_id, row in current.items()}
+    result = {
+        "moved": [{"id": student_id, "group_id": group_id} for student_id, group_id in moves.items()],
+        "weights": [{"id": student_id, "weight": weight} for student_id, weight in weights.items()],
+        "renamed": [
+            {"id": row["id"], "student_id": final[row["id"]]["student_id"], "name": final[row["id"]]["name"]}
+            for row in renames
+        ],
+        "deleted": sorted(deleted),
+    }
+    class_ids = {current[student_id].class_id for student_id in list(diff) + list(deleted)} | moved_classes
+    return result, class_ids
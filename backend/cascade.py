@@ -0,0 +1,70 @@
+"""花名册的批量级联删除
+
+删除班级、分组、学生或教师时，用几条基于子查询的 DELETE 语句自下而上删除点名记录（含归档）、
+统计汇总行、学生、分组和班级，不把子对象加载到会话中逐行删除。
+
+参数均为返回主键的 select 语句，整个删除在数据库内完成，写锁持有时间与数据量近似线性且很短。
+调用方负责提交事务。
+"""
+from sqlalchemy import delete, or_, select
+
+from models import (
+    Class, Group, Student, RollCallRecord, RollCallArchive, StudentCallStat, ArchivedStudentStat, DailyCallStat,
+    Rotation, RotationEntry,
+)
+
+
+def _execute(db, statement):
+    # 会话中的对象在提交后失效，无需同步
+    db.execute(statement.execution_options(synchronize_session=False))
+
+
+def _delete_rows(db, student_ids, group_ids=None, class_ids=None):
+    record_conditions = [RollCallRecord.student_id.in_(student_ids)]
+    archive_conditions = [RollCallArchive.student_id.in_(student_ids)]
+    daily_conditions = []
+    if group_ids is not None:
+        record_conditions.append(RollCallRecord.group_id.in_(group_ids))
+        archive_conditions.append(RollCallArchive.group_id.in_(group_ids))
+        daily_conditions.append(DailyCallStat.group_id.in_(group_ids))
+    if class_ids is not None:
+        record_conditions.append(RollCallRecord.class_id.in_(class_ids))
+        archive_conditions.append(RollCallArchive.class_id.in_(class_ids))
+        daily_conditions.append(DailyCallStat.class_id.in_(class_ids))
+
+    # 先整体删除将被清空的汇总行，随后删除点名记录时触发器找不到对应行，逐行维护的开销可以忽略；
+    # 其余（例如其他学生在被删班级中的记录）仍由触发器正确扣减
+    _execute(db, delete(StudentCallStat).where(StudentCallStat.student_id.in_(student_ids)))
+    _execute(db, delete(ArchivedStudentStat).where(ArchivedStudentStat.student_id.in_(student_ids)))
+    if daily_conditions:
+        _execute(db, delete(DailyCallStat).where(or_(*daily_conditions)))
+    _execute(db, delete(RollCallRecord).where(or_(*record_conditions)))
+    _execute(db, delete(RollCallArchive).where(or_(*archive_conditions)))
+    _execute(db, delete(RotationEntry).where(RotationEntry.student_id.in_(student_ids)))
+    _execute(db, delete(Student).where(Student.id.in_(student_ids)))
+    if group_ids is not None:
+        _execute(db, delete(Group).where(Group.id.in_(group_ids)))
+    if class_ids is not None:
+        _execute(db, delete(Rotation).where(Rotation.class_id.in_(class_ids)))
+        _execute(db, delete(Class).where(Class.id.in_(class_ids)))
+
+
+def delete_students(db, student_ids):
+    """删除学生及其点名记录"""
+    _delete_rows(db, student_ids)
+
+
+def delete_groups(db, group_ids):
+    """删除分组及其学生、点名记录"""
+    _delete_rows(db, select(Student.id).where(Student.group_id.in_(group_ids)), group_ids)
+
+
+def delete_classes(db, class_ids):
+    """删除班级及其分组、学生、点名记录"""
+    group_ids = select(Group.id).where(Group.class_id.in_(class_ids))
+    _delete_rows(db, select(Student.id).where(Student.group_id.in_(group_ids)), group_ids, class_ids)
+
+
+def delete_owned_classes(db, owner_id: int):
+    """删除教师名下的全部班级（删除用户前调用）"""
+    delete_classes(db, select(Class.id).where(Class.owner_id == owner_id))
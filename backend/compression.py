@@ -0,0 +1,171 @@
+"""响应压缩中间件（gzip / brotli）
+
+按请求的 Accept-Encoding 协商编码，优先 brotli（需要安装 brotli 包），否则 gzip：
+- 完整响应体小于 COMPRESSION_MIN_SIZE 时不压缩，小响应压缩收益低于 CPU 开销
+- 流式响应（CSV / NDJSON 导出）逐块压缩并立即刷新，不缓冲整个响应
+- SSE、已编码的响应和非文本类型原样透传
+压缩后的响应带 Vary: Accept-Encoding，强 ETag 改为弱 ETag，条件请求仍然有效。
+"""
+import os
+import zlib
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# 动态内容用较低的 brotli 质量，压缩率已优于 gzip，耗时相近
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html")
+
+
+def choose_encoding(accept_encoding: str):
+    """从 Accept-Encoding 中选出支持的编码（忽略 q=0），不支持时返回 None"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def chunk(self, data: bytes) -> bytes:
+        """压缩一块并刷新，客户端可以立即解出已收到的内容"""
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def _compressible(headers) -> bool:
+    content_type = encoding = b""
+    for name, value in headers:
+        if name == b"content-type":
+            content_type = value
+        elif name == b"content-encoding":
+            encoding = value
+    if encoding:
+        return False
+    media_type = content_type.split(b";")[0].strip().decode("latin-1").lower()
+    return media_type in COMPRESSIBLE_TYPES
+
+
+def _with_vary(headers):
+    """把 Accept-Encoding 合并进已有的 Vary（如 CORS 的 Vary: Origin），去重后合为一个头"""
+    result = []
+    values = []
+    for name, value in headers:
+        if name == b"vary":
+            values.extend(item.strip() for item in value.split(b",") if item.strip())
+        else:
+            result.append((name, value))
+    values.append(b"Accept-Encoding")
+    merged = []
+    for value in values:
+        if value.lower() not in (item.lower() for item in merged):
+            merged.append(value)
+    result.append((b"vary", b"*" if b"*" in merged else b", ".join(merged)))
+    return result
+
+
+def _compressed_headers(headers, encoding: str, length=None):
+    result = []
+    for name, value in _with_vary(headers):
+        if name == b"content-length":
+            continue
+        if name == b"etag" and not value.startswith(b"W/"):
+            value = b"W/" + value
+        result.append((name, value))
+    result.append((b"content-encoding", encoding.encode()))
+    if length is not None:
+        result.append((b"content-length", str(length).encode()))
+    return result
+
+
+class CompressionMiddleware:
+    """纯 ASGI 中间件；只在第一块响应体到达时决定是否压缩"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                status = message["status"]
+                passthrough = status < 200 or status in (204, 304) or not _compressible(message.get("headers", []))
+                if passthrough:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                if not more_body:
+                    # 完整响应：小于阈值时原样返回，只补充 Vary
+                    if len(body) < self.minimum_size:
+                        await send({**start, "headers": _with_vary(start.get("headers", []))})
+                        await send(message)
+                        return
+                    compressed = _Compressor(encoding).finish(body)
+                    await send({**start, "headers": _compressed_headers(start.get("headers", []), encoding, len(compressed))})
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                # 流式响应：长度未知，逐块压缩
+                compressor = _Compressor(encoding)
+                await send({**start, "headers": _compressed_headers(start.get("headers", []), encoding)})
+            if more_body:
+                await send({"type": "http.response.body", "body": compressor.chunk(body), "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.finish(body)})
+
+        await self.app(scope, receive, send_wrapper)
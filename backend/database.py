@@ -1,7 +1,8 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url
 from sqlalchemy.orm import sessionmaker
-from models import Base
+from sqlalchemy.pool import QueuePool
+from metrics import METRICS_ENABLED, InstrumentedQueuePool, InstrumentedAsyncQueuePool, instrument_engine
 
 # SQLite 数据库配置 - 从环境变量读取
 DB_FILE = os.getenv("DB_FILE", "data/rollcall.db")
@@ -16,16 +17,84 @@ os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
 # 构造数据库 URL
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_FILE}"
 
+# SQLite 性能配置 - 从环境变量读取
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+DB_BUSY_TIMEOUT = int(os.getenv("DB_BUSY_TIMEOUT", "5000"))  # 毫秒
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "-20000"))  # 负数表示 KiB
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_TEMP_STORE = os.getenv("DB_TEMP_STORE", "MEMORY")
+
+# 连接池配置：SQLite 连接开销很小，总连接数需大于 Starlette 线程池的 40 个线程，
+# 否则同步接口的 get_db 清理也在排队等线程时，会话占着连接导致连接池耗尽
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT / 1000},
+    poolclass=InstrumentedQueuePool if METRICS_ENABLED else QueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
 )
 
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """为每个新连接应用 SQLite pragma"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={DB_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT}")
+        cursor.execute(f"PRAGMA cache_size={DB_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA temp_store={DB_TEMP_STORE}")
+    finally:
+        cursor.close()
+
+event.listen(engine, "connect", set_sqlite_pragmas)
+if METRICS_ENABLED:
+    instrument_engine(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# 创建数据库表
-def create_tables():
-    Base.metadata.create_all(bind=engine)
+# 异步模式（可选）：热点接口改用 AsyncSession，通过 aiosqlite 访问同一个数据库文件
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+# 由同步 URL 只替换驱动得到；异步接口与其他接口必须读写同一个库
+ASYNC_DATABASE_URL = make_url(SQLALCHEMY_DATABASE_URL).set(drivername="sqlite+aiosqlite")
+
+
+def _check_async_url(url: str):
+    """兼容旧配置：仍设置了 ASYNC_DATABASE_URL 时必须指向 DB_FILE"""
+    configured = make_url(url)
+    if configured.get_backend_name() != "sqlite" or not configured.database or (
+        os.path.abspath(configured.database) != os.path.abspath(DB_FILE)
+    ):
+        raise RuntimeError(f"ASYNC_DATABASE_URL 与 DB_FILE（{DB_FILE}）不是同一个数据库，请删除 ASYNC_DATABASE_URL")
+
+
+if os.getenv("ASYNC_DATABASE_URL"):
+    _check_async_url(os.environ["ASYNC_DATABASE_URL"])
+
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine_options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    if METRICS_ENABLED:
+        async_engine_options["poolclass"] = InstrumentedAsyncQueuePool
+    async_engine_options["connect_args"] = {"timeout": DB_BUSY_TIMEOUT / 1000}
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **async_engine_options)
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+    if METRICS_ENABLED:
+        instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # 获取数据库会话
 def get_db():
@@ -33,4 +102,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# 获取异步数据库会话
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Iterator
+
+from fastapi.responses import StreamingResponse
+from pydantic.alias_generators import to_camel
+
+from database import SessionLocal
+
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def iter_export_rows(statement, fmt: str) -> Iterator[str]:
+    """用独立会话按批流式读取查询结果并逐批编码，内存占用与数据总量无关"""
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            # 带 BOM，便于 Excel 正确识别中文
+            buffer.write("\ufeff")
+            writer.writerow(columns)
+            for partition in result.partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            keys = [to_camel(column) for column in columns]
+            for partition in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=_json_default) + "\n"
+                    for row in partition
+                )
+    finally:
+        db.close()
+
+
+def export_response(statement, fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        iter_export_rows(statement, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
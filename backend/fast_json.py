@@ -0,0 +1,28 @@
+import os
+from functools import lru_cache
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# 快速 JSON 响应：用预先构建的 TypeAdapter 校验一次并直接序列化为字节，
+# 跳过 FastAPI 默认的 response_model 校验 + jsonable_encoder + json.dumps 流程，输出（camelCase）逐字节一致
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "true").lower() in ("1", "true", "yes")
+
+
+# 字段投影（projection.py）会按请求生成裁剪后的模型，缓存需要有上限
+@lru_cache(maxsize=1024)
+def get_adapter(schema) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def dump_json(schema, data) -> bytes:
+    """按响应模式把 ORM 对象或字典序列化为 JSON 字节"""
+    adapter = get_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True), by_alias=True)
+
+
+def render(schema, data, headers=None):
+    """快速模式下直接返回序列化好的响应，否则交给 FastAPI 按 response_model 处理"""
+    if not FAST_JSON_RESPONSES:
+        return data
+    return Response(dump_json(schema, data), media_type="application/json", headers=headers)
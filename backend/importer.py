@@ -0,0 +1,132 @@
+import csv
+import io
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from models import Student
+from schemas import StudentBase
+
+# 表头别名 -> 字段名，兼容 camelCase、snake_case 与中文表头
+HEADER_ALIASES = {
+    "studentid": "student_id", "student_id": "student_id", "学号": "student_id",
+    "name": "name", "姓名": "name",
+    "weight": "weight", "权重": "weight",
+    "group": "group", "groupname": "group", "group_name": "group", "分组": "group",
+}
+
+IMPORT_CHUNK_SIZE = 500
+
+
+def _normalize_header(header) -> str:
+    key = str(header or "").strip()
+    return HEADER_ALIASES.get(key.lower(), HEADER_ALIASES.get(key, key))
+
+
+def iter_upload_rows(upload: UploadFile) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """逐行解析上传的 CSV / XLSX 文件，返回 (行号, 字段字典)，不把整个文件读入内存"""
+    filename = (upload.filename or "").lower()
+    if filename.endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise HTTPException(status_code=400, detail="服务器未安装 openpyxl，请上传 CSV 文件")
+        sheet = load_workbook(upload.file, read_only=True, data_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        headers = [_normalize_header(h) for h in next(rows, ())]
+        for row_number, values in enumerate(rows, start=2):
+            if not any(v not in (None, "") for v in values):
+                continue
+            yield row_number, {h: "" if v is None else str(v).strip() for h, v in zip(headers, values)}
+        return
+
+    stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(stream)
+        headers = [_normalize_header(h) for h in next(reader, [])]
+        for values in reader:
+            if not any(v.strip() for v in values):
+                continue
+            yield reader.line_num, {h: v.strip() for h, v in zip(headers, values)}
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="文件编码必须为 UTF-8")
+    except csv.Error as e:
+        raise HTTPException(status_code=400, detail=f"CSV 格式错误（第 {reader.line_num} 行）：{e}")
+    finally:
+        stream.detach()
+
+
+class StudentImporter:
+    """按块批量写入学生，(group_id, student_id) 已存在时更新，使重复导入幂等"""
+
+    def __init__(self, db: Session, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.updated = 0
+        self.errors: List[dict] = []
+        self._pending: Dict[Tuple[int, str], dict] = {}
+
+    def add(self, row_number: int, row: Dict[str, str], group_id: int):
+        values = self.parse(row_number, row)
+        if values is not None:
+            self.stage(values, group_id)
+
+    def parse(self, row_number: int, row: Dict[str, str]) -> Optional[dict]:
+        """校验一行，返回文件中实际提供的字段；无效时记录错误并返回 None"""
+        data = {"student_id": row.get("student_id", ""), "name": row.get("name", "")}
+        if row.get("weight"):
+            data["weight"] = row["weight"]
+        try:
+            student = StudentBase.model_validate(data)
+        except ValidationError as e:
+            self.add_error(row_number, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            return None
+        if not student.student_id or not student.name:
+            self.add_error(row_number, "学号和姓名不能为空")
+            return None
+        # 没有权重列（或为空）时不写入权重：新学生使用默认值，已有学生保留原权重
+        return student.model_dump(exclude_unset=True)
+
+    def stage(self, values: dict, group_id: int):
+        """加入待写入的学生；同一文件中重复的学号以最后一行为准"""
+        self._pending[(group_id, values["student_id"])] = {**values, "group_id": group_id}
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def add_error(self, row_number: int, message: str):
+        self.errors.append({"row": row_number, "message": message})
+
+    def flush(self):
+        if not self._pending:
+            return
+        by_group: Dict[int, List[str]] = {}
+        for group_id, student_id in self._pending:
+            by_group.setdefault(group_id, []).append(student_id)
+        existing = {}
+        for group_id, student_ids in by_group.items():
+            rows = self.db.query(Student.id, Student.student_id).filter(
+                Student.group_id == group_id, Student.student_id.in_(student_ids)
+            )
+            existing.update({(group_id, row.student_id): row.id for row in rows})
+
+        inserts, updates = [], []
+        for key, values in self._pending.items():
+            if key in existing:
+                updates.append({"id": existing[key], **{k: v for k, v in values.items() if k in ("name", "weight")}})
+            else:
+                inserts.append(values)
+        if inserts:
+            self.db.execute(insert(Student), inserts)
+        if updates:
+            self.db.execute(update(Student), updates)
+        self.created += len(inserts)
+        self.updated += len(updates)
+        self._pending.clear()
+
+    def result(self):
+        self.flush()
+        return {"created": self.created, "updated": self.updated, "errors": self.errors}
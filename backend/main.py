@@ -1,24 +1,52 @@
-import os
-from fastapi import FastAPI, Depends, HTTPException, status
+import logging
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import timedelta
-from typing import List
+from datetime import date, datetime, timedelta
+from typing import List, Optional
 
-from database import get_db, create_tables
-from models import User, Class, Group, Student, RollCallRecord
+from database import engine, get_db, DB_ASYNC
+from migrate import check_schema
+from models import User, Class, Group, Student, RollCallRecord, StudentCallStat, DailyCallStat
 from schemas import (
     UserCreate, UserUpdate, UserProfile, User as UserSchema,
-    LoginRequest, Token, Message, ChangePasswordRequest, ResetPasswordRequest,
+    LoginRequest, Token, StreamTicket, Message, ChangePasswordRequest, ResetPasswordRequest,
     ClassCreate, ClassUpdate, Class as ClassSchema,
     GroupCreate, GroupUpdate, Group as GroupSchema,
-    StudentCreate, StudentUpdate, Student as StudentSchema,
-    RollCallRecordCreate, RollCallRecord as RollCallRecordSchema
+    StudentCreate, StudentUpdate, Student as StudentSchema, StudentImportResult,
+    StudentBulkRequest, StudentBulkResult, StudentSearchPage,
+    RollCallRecordCreate, RollCallDrawRequest, RollCallRecord as RollCallRecordSchema,
+    RollCallBatchRequest, RollCallBatchResponse,
+    RollCallHistoryPage, RollCallRecordSummary, RotationStatus, ClassStat, GroupStat, StudentStat, DailyStat
 )
 from auth import (
-    authenticate_user, create_access_token, get_password_hash, verify_password,
-    get_current_active_user, get_admin_user, ACCESS_TOKEN_EXPIRE_MINUTES
+    authenticate_user, check_login_rate, create_access_token, create_stream_ticket, STREAM_TICKET_TTL,
+    get_password_hash_async, verify_password_async,
+    get_current_active_user, get_current_active_user_sse, get_admin_user, user_cache, ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from sampler import sampler_cache
+from importer import StudentImporter, iter_upload_rows
+from queries import (
+    CLASS_TREE_EXPAND, GROUP_TREE_EXPAND, ROLL_CALL_RECORD_EXPAND, class_tree_options, group_tree_options, to_naive_utc, history_select, export_select, history_statement, history_page,
+    called_since_statement, record_summary
+)
+from exporter import export_response
+from tree_cache import roster_versions, lookup_tree, store_tree
+from fast_json import render
+from projection import Projection, get_projection, view_schema, page_view, render_view
+from broadcast import hub, class_channel, publish_roll_calls, sse_response
+from cascade import delete_classes, delete_groups, delete_students, delete_owned_classes
+import bulk_roster
+import metrics
+import rotation
+import search
+from compression import COMPRESSION_ENABLED, CompressionMiddleware
+from shared_state import shared_state, WEB_CONCURRENCY
+
+logger = logging.getLogger("uvicorn.error")
 
 app = FastAPI(title="智能点名系统 API")
 
@@ -30,48 +58,81 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 初始化数据库和管理员用户
-def initialize_database():
-    """初始化数据库表和管理员用户"""
-    # 创建数据库表
-    create_tables()
-    
-    # 从环境变量获取管理员账户信息
-    admin_username = os.getenv("ADMIN_USER", "admin")
-    admin_password = os.getenv("ADMIN_PASSWORD", "123456")
-    
-    # 创建默认管理员用户（如果不存在）
-    db = next(get_db())
-    try:
-        admin_user = db.query(User).filter(User.username == admin_username).first()
-        if not admin_user:
-            admin_user = User(
-                username=admin_username,
-                email=f"{admin_username}@example.com",
-                hashed_password=get_password_hash(admin_password),
-                user_type="admin"
-            )
-            db.add(admin_user)
-            db.commit()
-            print(f"管理员用户 '{admin_username}' 创建成功")
-        else:
-            print(f"管理员用户 '{admin_username}' 已存在")
-    finally:
-        db.close()
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 
-# 启动时初始化数据库
+def roster_changed(owner_id: int, class_id: Optional[int] = None):
+    """花名册变更后使树形接口的 ETag 和班级的抽样器缓存失效"""
+    roster_versions.bump(owner_id)
+    if class_id is not None:
+        sampler_cache.invalidate(class_id)
+
+def get_owned_class(db: Session, class_id: int, current_user: User) -> Class:
+    """当前教师的班级，不存在或属于其他教师时返回 404"""
+    db_class = db.query(Class).filter(Class.id == class_id, Class.owner_id == current_user.id).first()
+    if not db_class:
+        raise HTTPException(status_code=404, detail="班级不存在")
+    return db_class
+
+# 启动时只检查结构版本，建表、迁移和创建管理员由 migrate.py 完成
 @app.on_event("startup")
 def startup_event():
-    initialize_database()
+    check_schema(engine)
+    if WEB_CONCURRENCY > 1:
+        if not shared_state.shared:
+            logger.warning("WEB_CONCURRENCY=%d 但 SHARED_STATE_URL 为进程内存储，各 worker 的缓存和限流计数互不相通", WEB_CONCURRENCY)
+        if not hub.backend.shared:
+            logger.warning("WEB_CONCURRENCY=%d 但 BROADCAST_URL 为进程内后端，点名事件只推送给同一 worker 的订阅者", WEB_CONCURRENCY)
+
+@app.on_event("startup")
+async def start_broadcast():
+    await hub.start()
+
+@app.on_event("shutdown")
+async def stop_broadcast():
+    await hub.stop()
 
 @app.get("/")
 def read_root():
     return {"msg": "智能点名系统 FastAPI 后端已启动"}
 
+if metrics.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def get_metrics():
+        return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# 认证、用户管理接口中的 async 函数（需要等待密码哈希）通过以下函数在线程池中访问数据库，
+# 等待写锁时不会阻塞事件循环
+def get_user_or_404(db: Session, user_id: int) -> User:
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="用户不存在")
+    return user
+
+def ensure_user_available(db: Session, username: Optional[str] = None, email: Optional[str] = None, exclude_id: Optional[int] = None):
+    """用户名或邮箱已被其他用户使用时返回 400"""
+    if username is not None and db.query(User.id).filter(User.username == username).first():
+        raise HTTPException(status_code=400, detail="用户名已存在")
+    if email is not None:
+        query = db.query(User.id).filter(User.email == email)
+        if exclude_id is not None:
+            query = query.filter(User.id != exclude_id)
+        if query.first():
+            raise HTTPException(status_code=400, detail="邮箱已存在")
+
+def commit_and_refresh(db: Session, instance):
+    db.commit()
+    db.refresh(instance)
+
 # 认证相关API
 @app.post("/auth/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
-    user = authenticate_user(db, login_data.username, login_data.password)
+async def login(login_data: LoginRequest, request: Request, db: Session = Depends(get_db)):
+    # 共享状态可能是 Redis，计数放到线程池中执行
+    await run_in_threadpool(check_login_rate, login_data.username, request.client.host if request.client else None)
+    user = await authenticate_user(db, login_data.username, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -93,19 +154,17 @@ def get_current_user_info(current_user: User = Depends(get_current_active_user))
     return current_user
 
 @app.put("/auth/profile", response_model=UserSchema)
-def update_profile(profile_data: UserProfile, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+async def update_profile(profile_data: UserProfile, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
     if profile_data.email:
         # 检查邮箱是否已存在
-        existing_user = db.query(User).filter(User.email == profile_data.email, User.id != current_user.id).first()
-        if existing_user:
-            raise HTTPException(status_code=400, detail="邮箱已存在")
+        await run_in_threadpool(ensure_user_available, db, email=profile_data.email, exclude_id=current_user.id)
         current_user.email = profile_data.email
     
     if profile_data.password:
-        current_user.hashed_password = get_password_hash(profile_data.password)
+        current_user.hashed_password = await get_password_hash_async(profile_data.password)
     
-    db.commit()
-    db.refresh(current_user)
+    await run_in_threadpool(commit_and_refresh, db, current_user)
+    await user_cache.invalidate_async(current_user.username)
     return current_user
 
 @app.put("/auth/change-password", response_model=Message)
@@ -116,18 +175,20 @@ async def change_password(
 ):
     """修改当前用户密码"""
     # 验证旧密码
-    if not verify_password(request.old_password, current_user.hashed_password):
+    if not await verify_password_async(request.old_password, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="旧密码不正确")
     
     # 更新密码
-    hashed_password = get_password_hash(request.new_password)
+    hashed_password = await get_password_hash_async(request.new_password)
+    username = current_user.username  # 提交后属性过期，不在事件循环中重新加载
     current_user.hashed_password = hashed_password
-    db.commit()
+    await run_in_threadpool(db.commit)
+    await user_cache.invalidate_async(username)
     
     return {"message": "密码修改成功"}
 
 @app.put("/users/{user_id}/reset-password", response_model=Message)
-def reset_user_password(
+async def reset_user_password(
     user_id: int,
     request: ResetPasswordRequest,
     current_user: User = Depends(get_admin_user),
@@ -135,35 +196,33 @@ def reset_user_password(
 ):
     """管理员重置用户密码"""
     # 查找目标用户
-    target_user = db.query(User).filter(User.id == user_id).first()
-    if not target_user:
-        raise HTTPException(status_code=404, detail="用户不存在")
+    target_user = await run_in_threadpool(get_user_or_404, db, user_id)
     
     # 更新密码
-    hashed_password = get_password_hash(request.new_password)
+    hashed_password = await get_password_hash_async(request.new_password)
+    username = target_user.username
     target_user.hashed_password = hashed_password
-    db.commit()
+    await run_in_threadpool(db.commit)
+    await user_cache.invalidate_async(username)
     
     return {"message": "密码重置成功"}
 
+@app.get("/auth/cache-stats")
+def get_auth_cache_stats(admin_user: User = Depends(get_admin_user)):
+    """已认证用户缓存的命中/未命中计数"""
+    return user_cache.stats()
+
 # 用户管理API（仅管理员）
 @app.get("/users", response_model=List[UserSchema])
 def get_users(admin_user: User = Depends(get_admin_user), db: Session = Depends(get_db)):
     return db.query(User).all()
 
 @app.post("/users", response_model=UserSchema)
-def create_user(user_data: UserCreate, admin_user: User = Depends(get_admin_user), db: Session = Depends(get_db)):
-    # 检查用户名是否已存在
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="用户名已存在")
-    
-    # 检查邮箱是否已存在
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
-    if existing_email:
-        raise HTTPException(status_code=400, detail="邮箱已存在")
+async def create_user(user_data: UserCreate, admin_user: User = Depends(get_admin_user), db: Session = Depends(get_db)):
+    # 检查用户名、邮箱是否已存在
+    await run_in_threadpool(ensure_user_available, db, username=user_data.username, email=user_data.email)
     
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -171,31 +230,26 @@ def create_user(user_data: UserCreate, admin_user: User = Depends(get_admin_user
         user_type=user_data.user_type
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await run_in_threadpool(commit_and_refresh, db, db_user)
     return db_user
 
 @app.put("/users/{user_id}", response_model=UserSchema)
-def update_user(user_id: int, user_data: UserUpdate, admin_user: User = Depends(get_admin_user), db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.id == user_id).first()
-    if not db_user:
-        raise HTTPException(status_code=404, detail="用户不存在")
+async def update_user(user_id: int, user_data: UserUpdate, admin_user: User = Depends(get_admin_user), db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(get_user_or_404, db, user_id)
     
     if user_data.email:
         # 检查邮箱是否已存在
-        existing_email = db.query(User).filter(User.email == user_data.email, User.id != user_id).first()
-        if existing_email:
-            raise HTTPException(status_code=400, detail="邮箱已存在")
+        await run_in_threadpool(ensure_user_available, db, email=user_data.email, exclude_id=user_id)
         db_user.email = user_data.email
     
     if user_data.user_type:
         db_user.user_type = user_data.user_type
     
     if user_data.password:
-        db_user.hashed_password = get_password_hash(user_data.password)
+        db_user.hashed_password = await get_password_hash_async(user_data.password)
     
-    db.commit()
-    db.refresh(db_user)
+    await run_in_threadpool(commit_and_refresh, db, db_user)
+    await user_cache.invalidate_async(db_user.username)
     return db_user
 
 @app.delete("/users/{user_id}", response_model=Message)
@@ -207,14 +261,26 @@ def delete_user(user_id: int, admin_user: User = Depends(get_admin_user), db: Se
     if db_user.id == admin_user.id:
         raise HTTPException(status_code=400, detail="不能删除自己")
     
+    class_ids = db.scalars(select(Class.id).where(Class.owner_id == db_user.id)).all()
+    username = db_user.username
+    delete_owned_classes(db, db_user.id)
     db.delete(db_user)
     db.commit()
+    user_cache.invalidate(username)
+    for class_id in class_ids:
+        sampler_cache.invalidate(class_id)
     return {"message": "用户删除成功"}
 
 # 班级管理API
 @app.get("/classes", response_model=List[ClassSchema])
-def get_classes(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    return db.query(Class).filter(Class.owner_id == current_user.id).all()
+def get_classes(request: Request, projection: Projection = Depends(get_projection), current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """班级 -> 分组 -> 学生 树；可用 fields= / expand= 只取部分字段和层级"""
+    key, etag, cached = lookup_tree(request, current_user.id)
+    if cached is not None:
+        return cached
+    view = view_schema(ClassSchema, projection, CLASS_TREE_EXPAND)
+    classes = db.query(Class).options(*class_tree_options(projection)).filter(Class.owner_id == current_user.id).all()
+    return store_tree(key, etag, List[view], classes)
 
 @app.post("/classes", response_model=ClassSchema)
 def create_class(class_data: ClassCreate, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
@@ -224,8 +290,9 @@ def create_class(class_data: ClassCreate, current_user: User = Depends(get_curre
     )
     db.add(db_class)
     db.commit()
+    roster_changed(current_user.id)
     db.refresh(db_class)
-    return db_class
+    return render(ClassSchema, db_class)
 
 @app.put("/classes/{class_id}", response_model=ClassSchema)
 def update_class(class_id: int, class_data: ClassUpdate, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
@@ -237,8 +304,9 @@ def update_class(class_id: int, class_data: ClassUpdate, current_user: User = De
         db_class.name = class_data.name
     
     db.commit()
+    roster_changed(current_user.id)
     db.refresh(db_class)
-    return db_class
+    return render(ClassSchema, db_class)
 
 @app.delete("/classes/{class_id}", response_model=Message)
 def delete_class(class_id: int, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
@@ -246,19 +314,26 @@ def delete_class(class_id: int, current_user: User = Depends(get_current_active_
     if not db_class:
         raise HTTPException(status_code=404, detail="班级不存在")
     
-    db.delete(db_class)
+    delete_classes(db, select(Class.id).where(Class.id == class_id))
     db.commit()
+    roster_changed(current_user.id, class_id)
     return {"message": "班级删除成功"}
 
 # 分组管理API
 @app.get("/classes/{class_id}/groups", response_model=List[GroupSchema])
-def get_groups(class_id: int, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def get_groups(class_id: int, request: Request, projection: Projection = Depends(get_projection), current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    key, etag, cached = lookup_tree(request, current_user.id)
+    if cached is not None:
+        return cached
+    view = view_schema(GroupSchema, projection, GROUP_TREE_EXPAND)
+    
     # 验证班级所有权
     db_class = db.query(Class).filter(Class.id == class_id, Class.owner_id == current_user.id).first()
     if not db_class:
         raise HTTPException(status_code=404, detail="班级不存在")
     
-    return db.query(Group).filter(Group.class_id == class_id).all()
+    groups = db.query(Group).options(*group_tree_options(projection)).filter(Group.class_id == class_id).all()
+    return store_tree(key, etag, List[view], groups)
 
 @app.post("/groups", response_model=GroupSchema)
 def create_group(group_data: GroupCreate, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
@@ -269,16 +344,18 @@ def create_group(group_data: GroupCreate, current_user: User = Depends(get_curre
     
     db_group = Group(
         name=group_data.name,
-        class_id=group_data.class_id
+        class_id=group_data.class_id,
+        owner_id=current_user.id
     )
     db.add(db_group)
     db.commit()
+    roster_changed(current_user.id)
     db.refresh(db_group)
-    return db_group
+    return render(GroupSchema, db_group)
 
 @app.put("/groups/{group_id}", response_model=GroupSchema)
 def update_group(group_id: int, group_data: GroupUpdate, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    db_group = db.query(Group).join(Class).filter(Group.id == group_id, Class.owner_id == current_user.id).first()
+    db_group = db.query(Group).filter(Group.id == group_id, Group.owner_id == current_user.id).first()
     if not db_group:
         raise HTTPException(status_code=404, detail="分组不存在")
     
@@ -286,33 +363,55 @@ def update_group(group_id: int, group_data: GroupUpdate, current_user: User = De
         db_group.name = group_data.name
     
     db.commit()
+    roster_changed(current_user.id)
     db.refresh(db_group)
-    return db_group
+    return render(GroupSchema, db_group)
 
 @app.delete("/groups/{group_id}", response_model=Message)
 def delete_group(group_id: int, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    db_group = db.query(Group).join(Class).filter(Group.id == group_id, Class.owner_id == current_user.id).first()
+    db_group = db.query(Group).filter(Group.id == group_id, Group.owner_id == current_user.id).first()
     if not db_group:
         raise HTTPException(status_code=404, detail="分组不存在")
     
-    db.delete(db_group)
+    class_id = db_group.class_id
+    delete_groups(db, select(Group.id).where(Group.id == group_id))
     db.commit()
+    roster_changed(current_user.id, class_id)
     return {"message": "分组删除成功"}
 
 # 学生管理API
 @app.get("/groups/{group_id}/students", response_model=List[StudentSchema])
-def get_students(group_id: int, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def get_students(group_id: int, request: Request, projection: Projection = Depends(get_projection), current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    key, etag, cached = lookup_tree(request, current_user.id)
+    if cached is not None:
+        return cached
+    view = view_schema(StudentSchema, projection)
+    
     # 验证分组所有权
-    db_group = db.query(Group).join(Class).filter(Group.id == group_id, Class.owner_id == current_user.id).first()
+    db_group = db.query(Group).filter(Group.id == group_id, Group.owner_id == current_user.id).first()
     if not db_group:
         raise HTTPException(status_code=404, detail="分组不存在")
     
-    return db.query(Student).filter(Student.group_id == group_id).all()
+    students = db.query(Student).filter(Student.group_id == group_id).all()
+    return store_tree(key, etag, List[view], students)
+
+@app.get("/students/search", response_model=StudentSearchPage)
+def search_students(
+    q: str = Query(..., min_length=1, max_length=64, description="姓名或学号的任意部分"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """在当前教师的全部班级中按姓名或学号搜索学生，按匹配程度排序"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="搜索内容不能为空")
+    return render(StudentSearchPage, search.search_students(db, current_user.id, q, limit, offset))
 
 @app.post("/students", response_model=StudentSchema)
 def create_student(student_data: StudentCreate, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
     # 验证分组所有权
-    db_group = db.query(Group).join(Class).filter(Group.id == student_data.group_id, Class.owner_id == current_user.id).first()
+    db_group = db.query(Group).filter(Group.id == student_data.group_id, Group.owner_id == current_user.id).first()
     if not db_group:
         raise HTTPException(status_code=404, detail="分组不存在")
     
@@ -320,16 +419,66 @@ def create_student(student_data: StudentCreate, current_user: User = Depends(get
         student_id=student_data.student_id,
         name=student_data.name,
         weight=student_data.weight,
-        group_id=student_data.group_id
+        group_id=student_data.group_id,
+        owner_id=current_user.id
     )
     db.add(db_student)
+    db.flush()
+    rotation.add_student(db, db_group.class_id, db_student.id, db_group.id, db_student.weight)
     db.commit()
+    roster_changed(current_user.id, db_group.class_id)
     db.refresh(db_student)
-    return db_student
+    return render(StudentSchema, db_student)
+
+@app.post("/groups/{group_id}/students/import", response_model=StudentImportResult)
+def import_group_students(group_id: int, file: UploadFile = File(...), current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """从 CSV/XLSX 批量导入学生到分组（列：学号、姓名、权重），已存在的学号会被更新，权重为空时保留原值"""
+    db_group = db.query(Group).filter(Group.id == group_id, Group.owner_id == current_user.id).first()
+    if not db_group:
+        raise HTTPException(status_code=404, detail="分组不存在")
+    
+    importer = StudentImporter(db)
+    for row_number, row in iter_upload_rows(file):
+        importer.add(row_number, row, group_id)
+    result = importer.result()
+    rotation.sync_class(db, db_group.class_id)
+    db.commit()
+    roster_changed(current_user.id, db_group.class_id)
+    return result
+
+@app.post("/classes/{class_id}/students/import", response_model=StudentImportResult)
+def import_class_students(class_id: int, file: UploadFile = File(...), current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """从 CSV/XLSX 批量导入学生到班级（列：分组、学号、姓名、权重），按名称匹配或创建分组"""
+    db_class = db.query(Class).filter(Class.id == class_id, Class.owner_id == current_user.id).first()
+    if not db_class:
+        raise HTTPException(status_code=404, detail="班级不存在")
+    
+    group_ids = {name: id for id, name in db.query(Group.id, Group.name).filter(Group.class_id == class_id)}
+    importer = StudentImporter(db)
+    for row_number, row in iter_upload_rows(file):
+        group_name = row.get("group", "")
+        if not group_name:
+            importer.add_error(row_number, "分组不能为空")
+            continue
+        # 先校验学生字段，无效的行不会创建分组
+        values = importer.parse(row_number, row)
+        if values is None:
+            continue
+        if group_name not in group_ids:
+            db_group = Group(name=group_name, class_id=class_id, owner_id=current_user.id)
+            db.add(db_group)
+            db.flush()
+            group_ids[group_name] = db_group.id
+        importer.stage(values, group_ids[group_name])
+    result = importer.result()
+    rotation.sync_class(db, class_id)
+    db.commit()
+    roster_changed(current_user.id, class_id)
+    return result
 
 @app.put("/students/{student_id}", response_model=StudentSchema)
 def update_student(student_id: int, student_data: StudentUpdate, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    db_student = db.query(Student).join(Group).join(Class).filter(Student.id == student_id, Class.owner_id == current_user.id).first()
+    db_student = db.query(Student).filter(Student.id == student_id, Student.owner_id == current_user.id).first()
     if not db_student:
         raise HTTPException(status_code=404, detail="学生不存在")
     
@@ -337,28 +486,41 @@ def update_student(student_id: int, student_data: StudentUpdate, current_user: U
         db_student.student_id = student_data.student_id
     if student_data.name:
         db_student.name = student_data.name
-    if student_data.weight is not None:
+    if student_data.weight is not None and student_data.weight != db_student.weight:
         db_student.weight = student_data.weight
+        rotation.reweight_student(db, db_student.group.class_id, db_student.id, db_student.group_id, db_student.weight)
     
     db.commit()
+    roster_changed(current_user.id, db_student.group.class_id)
     db.refresh(db_student)
-    return db_student
+    return render(StudentSchema, db_student)
 
 @app.delete("/students/{student_id}", response_model=Message)
 def delete_student(student_id: int, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    db_student = db.query(Student).join(Group).join(Class).filter(Student.id == student_id, Class.owner_id == current_user.id).first()
+    db_student = db.query(Student).filter(Student.id == student_id, Student.owner_id == current_user.id).first()
     if not db_student:
         raise HTTPException(status_code=404, detail="学生不存在")
     
-    db.delete(db_student)
+    class_id = db_student.group.class_id
+    delete_students(db, select(Student.id).where(Student.id == student_id))
     db.commit()
+    roster_changed(current_user.id, class_id)
     return {"message": "学生删除成功"}
 
+@app.post("/students/bulk", response_model=StudentBulkResult)
+def bulk_update_students(bulk: StudentBulkRequest, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """批量换组、改权重、改名、删除学生，全部操作在一个事务中完成，返回实际发生的变化"""
+    result, class_ids = bulk_roster.apply(db, current_user.id, bulk.operations)
+    db.commit()
+    for class_id in class_ids:
+        roster_changed(current_user.id, class_id)
+    return render(StudentBulkResult, result)
+
 # 点名相关API
 @app.post("/roll-call", response_model=RollCallRecordSchema)
-def create_roll_call_record(record_data: RollCallRecordCreate, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def create_roll_call_record(record_data: RollCallRecordCreate, projection: Projection = Depends(get_projection), current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
     # 验证学生和班级所有权
-    db_student = db.query(Student).join(Group).join(Class).filter(Student.id == record_data.student_id, Class.owner_id == current_user.id).first()
+    db_student = db.query(Student).filter(Student.id == record_data.student_id, Student.owner_id == current_user.id).first()
     if not db_student:
         raise HTTPException(status_code=404, detail="学生不存在")
     
@@ -369,13 +531,294 @@ def create_roll_call_record(record_data: RollCallRecordCreate, current_user: Use
     db_record = RollCallRecord(
         student_id=record_data.student_id,
         group_id=db_student.group_id,
-        class_id=record_data.class_id
+        class_id=record_data.class_id,
+        owner_id=current_user.id
+    )
+    db.add(db_record)
+    db.commit()
+    db.refresh(db_record)
+    response = render_view(RollCallRecordSchema, view_schema(RollCallRecordSchema, projection, ROLL_CALL_RECORD_EXPAND), db_record)
+    if hub.active:
+        publish_roll_calls([record_summary(db_record)])
+    return response
+
+@app.post("/roll-call/batch", response_model=RollCallBatchResponse)
+def create_roll_call_records(batch: RollCallBatchRequest, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """批量保存点名记录（离线同步、一次点多人），相同幂等键的记录只会保存一次"""
+    records = batch.records
+    # 集合查询一次性验证学生和班级所有权
+    student_ids = {r.student_id for r in records}
+    class_ids = {r.class_id for r in records}
+    student_groups = dict(
+        db.query(Student.id, Student.group_id)
+        .filter(Student.id.in_(student_ids), Student.owner_id == current_user.id)
+    )
+    owned_class_ids = {
+        row.id for row in db.query(Class.id).filter(Class.id.in_(class_ids), Class.owner_id == current_user.id)
+    }
+    keys = {(r.class_id, r.idempotency_key) for r in records if r.idempotency_key and r.class_id in owned_class_ids}
+    existing_keys = {}
+    if keys:
+        existing_keys = {
+            (row.class_id, row.idempotency_key): row.id
+            for row in db.query(RollCallRecord.id, RollCallRecord.class_id, RollCallRecord.idempotency_key)
+            .filter(tuple_(RollCallRecord.class_id, RollCallRecord.idempotency_key).in_(keys))
+        }
+    
+    results, rows, seen_keys = [], [], {}
+    for index, r in enumerate(records):
+        key = (r.class_id, r.idempotency_key)
+        if r.student_id not in student_groups:
+            results.append({"index": index, "status": "invalid", "detail": "学生不存在"})
+        elif r.class_id not in owned_class_ids:
+            results.append({"index": index, "status": "invalid", "detail": "班级不存在"})
+        elif r.idempotency_key and key in existing_keys:
+            results.append({"index": index, "status": "duplicate", "id": existing_keys[key]})
+        elif r.idempotency_key and key in seen_keys:
+            # 同一批次内重复的记录，在插入后指向首条记录的 ID
+            results.append({"index": index, "status": "duplicate", "first": seen_keys[key]})
+        else:
+            result = {"index": index, "status": "created"}
+            if r.idempotency_key:
+                seen_keys[key] = result
+            results.append(result)
+            rows.append({
+                "student_id": r.student_id,
+                "group_id": student_groups[r.student_id],
+                "class_id": r.class_id,
+                "called_at": to_naive_utc(r.called_at) or datetime.utcnow(),
+                "idempotency_key": r.idempotency_key,
+                "owner_id": current_user.id,
+            })
+    
+    if rows:
+        try:
+            ids = db.scalars(insert(RollCallRecord).returning(RollCallRecord.id, sort_by_parameter_order=True), rows).all()
+            db.commit()
+        except IntegrityError:
+            # 并发提交了相同幂等键，客户端重试即可得到 duplicate 结果
+            db.rollback()
+            raise HTTPException(status_code=409, detail="记录冲突，请重试")
+        created = iter(ids)
+        for result in results:
+            if result["status"] == "created":
+                result["id"] = next(created)
+        for result in results:
+            if "first" in result:
+                result["id"] = result.pop("first")["id"]
+        if hub.active:
+            summaries = db.execute(
+                history_select(current_user.id).where(RollCallRecord.id.in_(ids)).order_by(RollCallRecord.called_at)
+            )
+            publish_roll_calls(RollCallRecordSummary.model_validate(row._asdict()) for row in summaries)
+    return {"created": len(rows), "results": results}
+
+@app.post("/roll-call/draw", response_model=RollCallRecordSchema)
+def draw_roll_call(draw_data: RollCallDrawRequest, projection: Projection = Depends(get_projection), current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """按学生权重随机点名，并在同一事务中保存点名记录；rotation 模式按服务端保存的轮换顺序点名
+
+    不允许重复时：指定 since 则排除该时间之后已被点到的学生；未指定 since 时按公平轮换点名
+    （本轮每人一次，全部点到后自动开始新一轮），不扫描点名历史。
+    响应默认包含完整的班级树，客户端可用 expand=student,groupObj 等只取需要的部分
+    """
+    db_class = db.query(Class).filter(Class.id == draw_data.class_id, Class.owner_id == current_user.id).first()
+    if not db_class:
+        raise HTTPException(status_code=404, detail="班级不存在")
+    
+    if draw_data.mode == "rotation" or (not draw_data.allow_repeat and draw_data.since is None):
+        key = rotation.selection_key(db, draw_data.class_id, draw_data.group_ids)
+        picked = rotation.draw(db, rotation.get_rotation(db, draw_data.class_id, key))
+        if not picked:
+            raise HTTPException(status_code=400, detail="没有可点名的学生")
+        student_id, group_id = picked
+    else:
+        excluded = set()
+        if not draw_data.allow_repeat:
+            excluded = set(db.scalars(called_since_statement(draw_data.class_id, draw_data.since)))
+        
+        sampler = sampler_cache.get(db, draw_data.class_id, draw_data.group_ids)
+        picked = sampler.draw(excluded)
+        if not picked:
+            raise HTTPException(status_code=400, detail="没有可点名的学生")
+        student_id, group_id, _ = picked
+    
+    db_record = RollCallRecord(
+        student_id=student_id,
+        group_id=group_id,
+        class_id=draw_data.class_id,
+        owner_id=current_user.id
     )
     db.add(db_record)
     db.commit()
     db.refresh(db_record)
-    return db_record
+    response = render_view(RollCallRecordSchema, view_schema(RollCallRecordSchema, projection, ROLL_CALL_RECORD_EXPAND), db_record)
+    if hub.active:
+        publish_roll_calls([record_summary(db_record)])
+    return response
+
+@app.get("/roll-call/history", response_model=RollCallHistoryPage)
+def get_roll_call_history(
+    class_id: Optional[int] = Query(None, alias="classId"),
+    group_id: Optional[int] = Query(None, alias="groupId"),
+    student_id: Optional[int] = Query(None, alias="studentId"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    projection: Projection = Depends(get_projection),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """按 (called_at, id) 倒序游标分页查询点名历史；fields= 可只返回条目的部分字段"""
+    view = page_view(RollCallHistoryPage, RollCallRecordSummary, projection)
+    rows = db.execute(history_statement(
+        current_user.id, class_id, group_id, student_id, start, end, cursor, limit
+    )).all()
+    return render_view(RollCallHistoryPage, view, history_page(rows, limit))
+
+@app.post("/classes/{class_id}/events/ticket", response_model=StreamTicket)
+def create_class_events_ticket(class_id: int, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """签发订阅该班级事件流的一次性票据，用于 GET /classes/{id}/events?ticket="""
+    get_owned_class(db, class_id, current_user)
+    return {"ticket": create_stream_ticket(current_user.username, class_id), "expires_in": STREAM_TICKET_TTL}
+
+@app.get("/classes/{class_id}/events")
+def subscribe_class_events(class_id: int, current_user: User = Depends(get_current_active_user_sse), db: Session = Depends(get_db)):
+    """以 Server-Sent Events 实时推送该班级新保存的点名记录（roll-call 事件，内容同历史记录条目）"""
+    get_owned_class(db, class_id, current_user)
+    # 长连接期间不占用数据库连接
+    db.close()
+    return sse_response(class_channel(class_id), "roll-call")
+
+@app.get("/classes/{class_id}/rotation", response_model=RotationStatus)
+def get_class_rotation(
+    class_id: int,
+    group_ids: Optional[List[int]] = Query(None, alias="groupIds"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """查看轮换点名的状态和本轮尚未点到的学生"""
+    get_owned_class(db, class_id, current_user)
+    state = rotation.get_rotation(db, class_id, rotation.selection_key(db, class_id, group_ids))
+    db.commit()
+    return rotation.status(db, state)
+
+@app.post("/classes/{class_id}/rotation/reset", response_model=RotationStatus)
+def reset_class_rotation(
+    class_id: int,
+    group_ids: Optional[List[int]] = Query(None, alias="groupIds"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """重新洗牌开始新一轮轮换点名"""
+    get_owned_class(db, class_id, current_user)
+    state = rotation.get_rotation(db, class_id, rotation.selection_key(db, class_id, group_ids))
+    rotation.reset(db, state)
+    db.commit()
+    return rotation.status(db, state)
+
+# 统计API（读取由触发器增量维护的汇总表）
+@app.get("/stats/classes", response_model=List[ClassStat])
+def get_class_stats(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """各班级点名总次数"""
+    rows = (
+        db.query(Class.id.label("class_id"), Class.name, func.coalesce(func.sum(DailyCallStat.call_count), 0).label("call_count"))
+        .outerjoin(DailyCallStat, DailyCallStat.class_id == Class.id)
+        .filter(Class.owner_id == current_user.id)
+        .group_by(Class.id)
+        .order_by(Class.id)
+    )
+    return [row._asdict() for row in rows]
+
+@app.get("/stats/classes/{class_id}/groups", response_model=List[GroupStat])
+def get_group_stats(class_id: int, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """班级内各分组点名总次数"""
+    get_owned_class(db, class_id, current_user)
+    rows = (
+        db.query(Group.id.label("group_id"), Group.name, func.coalesce(func.sum(DailyCallStat.call_count), 0).label("call_count"))
+        .outerjoin(DailyCallStat, (DailyCallStat.group_id == Group.id) & (DailyCallStat.class_id == class_id))
+        .filter(Group.class_id == class_id)
+        .group_by(Group.id)
+        .order_by(Group.id)
+    )
+    return [row._asdict() for row in rows]
+
+@app.get("/stats/classes/{class_id}/students", response_model=List[StudentStat])
+def get_student_stats(
+    class_id: int,
+    group_id: Optional[int] = Query(None, alias="groupId"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """班级内每名学生的点名次数和最近点名时间"""
+    get_owned_class(db, class_id, current_user)
+    query = (
+        db.query(
+            Student.id, Student.student_id, Student.name, Student.group_id,
+            func.coalesce(StudentCallStat.call_count, 0).label("call_count"), StudentCallStat.last_called_at
+        )
+        .join(Group, Student.group_id == Group.id)
+        .outerjoin(StudentCallStat, StudentCallStat.student_id == Student.id)
+        .filter(Group.class_id == class_id)
+    )
+    if group_id is not None:
+        query = query.filter(Student.group_id == group_id)
+    return [row._asdict() for row in query.order_by(Student.group_id, Student.id)]
+
+@app.get("/stats/classes/{class_id}/daily", response_model=List[DailyStat])
+def get_daily_stats(
+    class_id: int,
+    group_id: Optional[int] = Query(None, alias="groupId"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """班级每日点名次数（按 STATS_UTC_OFFSET_HOURS 时区划分日期，包含 start 和 end）"""
+    get_owned_class(db, class_id, current_user)
+    query = db.query(DailyCallStat.day, func.sum(DailyCallStat.call_count).label("call_count")).filter(DailyCallStat.class_id == class_id)
+    if group_id is not None:
+        query = query.filter(DailyCallStat.group_id == group_id)
+    if start is not None:
+        query = query.filter(DailyCallStat.day >= start)
+    if end is not None:
+        query = query.filter(DailyCallStat.day <= end)
+    return [row._asdict() for row in query.group_by(DailyCallStat.day).order_by(DailyCallStat.day)]
+
+# 导出API（CSV / NDJSON 流式输出）
+EXPORT_FORMAT = Query("csv", alias="format", pattern="^(csv|ndjson)$")
+
+@app.get("/export/roll-call")
+def export_roll_call_history(
+    fmt: str = EXPORT_FORMAT,
+    class_id: Optional[int] = Query(None, alias="classId"),
+    group_id: Optional[int] = Query(None, alias="groupId"),
+    student_id: Optional[int] = Query(None, alias="studentId"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_archived: bool = Query(True, alias="includeArchived"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """按时间顺序导出点名记录，筛选条件与点名历史一致，默认包含已归档的记录"""
+    statement = export_select(current_user.id, class_id, group_id, student_id, start, end, include_archived)
+    return export_response(statement, fmt, "roll-call")
+
+@app.get("/export/classes/{class_id}/roster")
+def export_class_roster(class_id: int, fmt: str = EXPORT_FORMAT, current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+    """导出班级花名册（分组 + 学生）"""
+    get_owned_class(db, class_id, current_user)
+    statement = (
+        select(
+            Group.id.label("group_id"), Group.name.label("group_name"),
+            Student.id, Student.student_id, Student.name, Student.weight
+        )
+        .join(Student, Student.group_id == Group.id)
+        .where(Group.class_id == class_id)
+        .order_by(Group.id, Student.id)
+    )
+    return export_response(statement, fmt, f"class-{class_id}-roster")
 
-@app.get("/roll-call/history", response_model=List[RollCallRecordSchema])
-def get_roll_call_history(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    return db.query(RollCallRecord).join(Class).join(Group).filter(Class.owner_id == current_user.id).all()
\ No newline at end of file
+# 异步模式下由原生异步实现接管热点接口
+if DB_ASYNC:
+    import async_api
+    async_api.install(app)
@@ -0,0 +1,264 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Prometheus 文本格式的运行指标（可选）：按路由统计请求、SQL、连接池等待和密码哈希耗时
+# 关闭时不注册中间件和 SQLAlchemy 事件，也不替换连接池，没有额外开销
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))  # 慢查询日志阈值（毫秒），0 表示不记录
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+slow_query_logger = logging.getLogger("slow_query")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            items = sorted((labels, self._snapshot(value)) for labels, value in self._values.items())
+        for labels, value in items:
+            yield from self._render_sample(labels, value)
+
+    def _snapshot(self, value):
+        return value
+
+    def _render_sample(self, labels, value):
+        yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # 各桶计数（非累计）、总和、次数
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _snapshot(self, state):
+        return [list(state[0]), state[1], state[2]]
+
+    def _render_sample(self, labels, state):
+        counts, total, count = state
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            le_label = f'le="{le}"'
+            yield f"{self.name}_bucket{_format_labels(self.label_names, labels, le_label)} {cumulative}"
+        yield f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}"
+        yield f"{self.name}_count{_format_labels(self.label_names, labels)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "按路由和状态码统计的请求数", ("method", "route", "status")))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "请求处理耗时", ("method", "route")))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "正在处理的请求数"))
+db_statements_per_request = registry.register(Histogram(
+    "db_statements_per_request", "每个请求执行的 SQL 语句数", ("method", "route"), COUNT_BUCKETS))
+db_time_per_request_seconds = registry.register(Histogram(
+    "db_time_per_request_seconds", "每个请求执行 SQL 的总耗时", ("method", "route")))
+db_statement_duration_seconds = registry.register(Histogram(
+    "db_statement_duration_seconds", "单条 SQL 语句耗时"))
+db_slow_statements_total = registry.register(Counter(
+    "db_slow_statements_total", "超过 SLOW_QUERY_MS 的 SQL 语句数", ("route",)))
+db_pool_checkout_wait_seconds = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "从连接池取得连接的等待时间"))
+password_hash_duration_seconds = registry.register(Histogram(
+    "password_hash_duration_seconds", "bcrypt 哈希 / 校验的计算耗时", ("operation",),
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)))
+
+
+class RequestStats:
+    __slots__ = ("scope", "statements", "sql_seconds")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # 使用路由模板（如 /classes/{class_id}）作为标签，避免标签数量随 ID 膨胀；路由匹配后才有值
+        return getattr(self.scope.get("route"), "path", "unmatched")
+
+
+# 当前请求的统计对象；同步接口在线程池中执行时会复制上下文，仍指向同一个对象
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("metrics_request", default=None)
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件，不缓冲响应体，流式导出接口不受影响"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_stats = RequestStats(scope)
+        token = _current_request.set(request_stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            _current_request.reset(token)
+            route = request_stats.route
+            http_requests_total.inc(method, route, str(status_code))
+            http_request_duration_seconds.observe(elapsed, method, route)
+            db_statements_per_request.observe(request_stats.statements, method, route)
+            db_time_per_request_seconds.observe(request_stats.sql_seconds, method, route)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+    db_statement_duration_seconds.observe(elapsed)
+    request_stats = _current_request.get()
+    if request_stats is not None:
+        request_stats.statements += 1
+        request_stats.sql_seconds += elapsed
+    if SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS:
+        route = request_stats.route if request_stats is not None else "-"
+        db_slow_statements_total.inc(route)
+        slow_query_logger.warning("慢查询 %.1f ms: %s", elapsed * 1000, " ".join(statement.split())[:1000])
+
+
+def _handle_error(exception_context):
+    # 语句执行失败时 after_cursor_execute 不会触发，弹出对应的开始时间
+    starts = exception_context.connection.info.get("metrics_query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine):
+    """为同步引擎（或异步引擎的 sync_engine）注册 SQL 计时事件"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class _CheckoutTimer:
+    # 连接池没有"开始等待"事件，通过覆盖 _do_get 统计取连接（含排队和新建连接）的耗时
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - started)
+
+
+class InstrumentedQueuePool(_CheckoutTimer, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimer, AsyncAdaptedQueuePool):
+    pass
+
+
+def timed_password_task(fn):
+    """包装在哈希线程池中执行的 bcrypt 函数，记录计算耗时（不含排队）"""
+    operation = fn.__name__
+
+    def run(*args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            password_hash_duration_seconds.observe(time.perf_counter() - started, operation)
+
+    return run
@@ -0,0 +1,548 @@
+"""数据库结构迁移
+
+结构版本保存在 SQLite 的 PRAGMA user_version 中，MIGRATIONS 按版本号依次执行，每个迁移在
+BEGIN IMMEDIATE 事务中完成并写入新版本号，多个进程同时执行时只有一个会真正迁移。
+已发布的迁移不要再修改，结构变化一律追加新的迁移。迁移中的 SQL（包括触发器）直接写在迁移函数里，
+不调用会随代码变化的函数（如 stats.rebuild_on）；修改 stats.py 中的触发器时同样追加新的迁移。
+
+应用启动时只读取版本号（check_schema），不再建表、补列或哈希密码；部署或升级时先执行：
+    python migrate.py            # 迁移到最新版本并创建默认管理员
+    python migrate.py status     # 查看当前版本和待执行的迁移
+
+旧版本（启动时 create_all 建表）创建的数据库版本号为 0，各迁移均可在其上安全重放。
+"""
+import argparse
+import os
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import stats
+from auth import get_password_hash
+from models import User
+
+
+def _add_column(conn, table: str, column: str, ddl: str):
+    existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')}
+    if column not in existing:
+        conn.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {ddl}')
+
+
+def _initial_schema(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER NOT NULL,
+            username VARCHAR NOT NULL,
+            email VARCHAR NOT NULL,
+            hashed_password VARCHAR NOT NULL,
+            user_type VARCHAR,
+            is_active BOOLEAN,
+            created_at DATETIME,
+            PRIMARY KEY (id)
+        )
+    """)
+    conn.exec_driver_sql("CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)")
+    conn.exec_driver_sql("CREATE UNIQUE INDEX IF NOT EXISTS ix_users_username ON users (username)")
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS classes (
+            id INTEGER NOT NULL,
+            name VARCHAR NOT NULL,
+            owner_id INTEGER NOT NULL,
+            created_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY(owner_id) REFERENCES users (id)
+        )
+    """)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_classes_id ON classes (id)")
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS groups (
+            id INTEGER NOT NULL,
+            name VARCHAR NOT NULL,
+            class_id INTEGER NOT NULL,
+            created_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY(class_id) REFERENCES classes (id)
+        )
+    """)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_groups_id ON groups (id)")
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS students (
+            id INTEGER NOT NULL,
+            student_id VARCHAR NOT NULL,
+            name VARCHAR NOT NULL,
+            weight FLOAT,
+            group_id INTEGER NOT NULL,
+            created_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY(group_id) REFERENCES groups (id)
+        )
+    """)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_students_id ON students (id)")
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS roll_call_records (
+            id INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            group_id INTEGER NOT NULL,
+            class_id INTEGER NOT NULL,
+            called_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY(student_id) REFERENCES students (id),
+            FOREIGN KEY(group_id) REFERENCES groups (id),
+            FOREIGN KEY(class_id) REFERENCES classes (id)
+        )
+    """)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_roll_call_records_id ON roll_call_records (id)")
+
+
+def _history_indexes(conn):
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_students_group_student_id ON students (group_id, student_id)"
+    )
+    _add_column(conn, "roll_call_records", "idempotency_key", "VARCHAR")
+    for name, columns in (
+        ("ix_roll_call_records_called_at_id", "called_at, id"),
+        ("ix_roll_call_records_class_called_at", "class_id, called_at, id"),
+        ("ix_roll_call_records_group_called_at", "group_id, called_at, id"),
+        ("ix_roll_call_records_student_called_at", "student_id, called_at, id"),
+    ):
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON roll_call_records ({columns})")
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_roll_call_records_idempotency_key "
+        "ON roll_call_records (class_id, idempotency_key)"
+    )
+
+
+def _stats_day_expression() -> str:
+    """按天统计的日期表达式，{row} 为行或表名；时区偏移是部署配置，不属于迁移的 SQL"""
+    return f"date({{row}}.called_at, '{stats.STATS_UTC_OFFSET_HOURS:+d} hours')"
+
+
+def _call_stats(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS student_call_stats (
+            student_id INTEGER NOT NULL,
+            call_count INTEGER NOT NULL,
+            last_called_at DATETIME,
+            PRIMARY KEY (student_id)
+        )
+    """)
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS daily_call_stats (
+            class_id INTEGER NOT NULL,
+            group_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            call_count INTEGER NOT NULL,
+            PRIMARY KEY (class_id, group_id, day)
+        )
+    """)
+    # 从已有历史回填汇总表并安装触发器；SQL 为本版本发布时 stats.rebuild_on 的内容，不随 stats.py 变化
+    day = _stats_day_expression()
+    for name in ("trg_roll_call_stats_insert", "trg_roll_call_stats_delete"):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    conn.exec_driver_sql("DELETE FROM student_call_stats")
+    conn.exec_driver_sql("DELETE FROM daily_call_stats")
+    conn.exec_driver_sql("""
+        INSERT INTO student_call_stats (student_id, call_count, last_called_at)
+        SELECT student_id, count(*), max(called_at) FROM roll_call_records GROUP BY student_id
+    """)
+    conn.exec_driver_sql(f"""
+        INSERT INTO daily_call_stats (class_id, group_id, day, call_count)
+        SELECT class_id, group_id, {day.format(row="roll_call_records")}, count(*)
+        FROM roll_call_records GROUP BY class_id, group_id, {day.format(row="roll_call_records")}
+    """)
+    conn.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_roll_call_stats_insert
+        AFTER INSERT ON roll_call_records
+        BEGIN
+            INSERT INTO student_call_stats (student_id, call_count, last_called_at)
+            VALUES (NEW.student_id, 1, NEW.called_at)
+            ON CONFLICT (student_id) DO UPDATE SET
+                call_count = call_count + 1,
+                last_called_at = max(coalesce(last_called_at, excluded.last_called_at), excluded.last_called_at);
+            INSERT INTO daily_call_stats (class_id, group_id, day, call_count)
+            VALUES (NEW.class_id, NEW.group_id, {day.format(row="NEW")}, 1)
+            ON CONFLICT (class_id, group_id, day) DO UPDATE SET call_count = call_count + 1;
+        END
+    """)
+    conn.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_roll_call_stats_delete
+        AFTER DELETE ON roll_call_records
+        BEGIN
+            UPDATE student_call_stats SET
+                call_count = call_count - 1,
+                last_called_at = (
+                    SELECT max(called_at) FROM roll_call_records WHERE student_id = OLD.student_id
+                )
+            WHERE student_id = OLD.student_id;
+            DELETE FROM student_call_stats WHERE student_id = OLD.student_id AND call_count <= 0;
+            UPDATE daily_call_stats SET call_count = call_count - 1
+            WHERE class_id = OLD.class_id AND group_id = OLD.group_id AND day = {day.format(row="OLD")};
+            DELETE FROM daily_call_stats
+            WHERE class_id = OLD.class_id AND group_id = OLD.group_id AND day = {day.format(row="OLD")}
+                AND call_count <= 0;
+        END
+    """)
+
+
+def _rotations(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS rotations (
+            id INTEGER NOT NULL,
+            class_id INTEGER NOT NULL,
+            selection VARCHAR NOT NULL,
+            cycle INTEGER NOT NULL,
+            cursor FLOAT NOT NULL,
+            updated_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY(class_id) REFERENCES classes (id)
+        )
+    """)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_rotations_id ON rotations (id)")
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_rotations_class_selection ON rotations (class_id, selection)"
+    )
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS rotation_entries (
+            rotation_id INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            position FLOAT NOT NULL,
+            PRIMARY KEY (rotation_id, student_id),
+            FOREIGN KEY(rotation_id) REFERENCES rotations (id),
+            FOREIGN KEY(student_id) REFERENCES students (id)
+        )
+    """)
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_rotation_entries_position ON rotation_entries (rotation_id, position)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_rotation_entries_student_id ON rotation_entries (student_id)"
+    )
+
+
+def _archive(conn):
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS roll_call_archive (
+            id INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            group_id INTEGER NOT NULL,
+            class_id INTEGER NOT NULL,
+            called_at DATETIME NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(student_id) REFERENCES students (id),
+            FOREIGN KEY(group_id) REFERENCES groups (id),
+            FOREIGN KEY(class_id) REFERENCES classes (id)
+        )
+    """)
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_roll_call_archive_class_called_at ON roll_call_archive (class_id, called_at, id)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_roll_call_archive_student_called_at "
+        "ON roll_call_archive (student_id, called_at, id)"
+    )
+    conn.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS archived_student_stats (
+            student_id INTEGER NOT NULL,
+            call_count INTEGER NOT NULL,
+            last_called_at DATETIME,
+            PRIMARY KEY (student_id)
+        )
+    """)
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS archive_in_progress (id INTEGER NOT NULL, PRIMARY KEY (id))")
+    # 从已有历史（含归档）回填汇总表并替换版本 3 的触发器；SQL 为本版本发布时 stats.rebuild_on 的内容
+    day = _stats_day_expression()
+    for name in ("trg_roll_call_stats_insert", "trg_roll_call_stats_delete", "trg_roll_call_archive_stats_delete"):
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    conn.exec_driver_sql("DELETE FROM student_call_stats")
+    conn.exec_driver_sql("DELETE FROM daily_call_stats")
+    conn.exec_driver_sql("DELETE FROM archived_student_stats")
+    conn.exec_driver_sql("""
+        INSERT INTO archived_student_stats (student_id, call_count, last_called_at)
+        SELECT student_id, count(*), max(called_at) FROM roll_call_archive GROUP BY student_id
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO student_call_stats (student_id, call_count, last_called_at)
+        SELECT student_id, sum(call_count), max(last_called_at) FROM (
+            SELECT student_id, count(*) AS call_count, max(called_at) AS last_called_at
+            FROM roll_call_records GROUP BY student_id
+            UNION ALL
+            SELECT student_id, call_count, last_called_at FROM archived_student_stats
+        ) GROUP BY student_id
+    """)
+    conn.exec_driver_sql(f"""
+        INSERT INTO daily_call_stats (class_id, group_id, day, call_count)
+        SELECT class_id, group_id, {day.format(row="history")}, count(*) FROM (
+            SELECT class_id, group_id, called_at FROM roll_call_records
+            UNION ALL
+            SELECT class_id, group_id, called_at FROM roll_call_archive
+        ) AS history GROUP BY class_id, group_id, {day.format(row="history")}
+    """)
+    decrement = f"""
+            UPDATE student_call_stats SET
+                call_count = call_count - 1,
+                last_called_at = (
+                    SELECT max(called_at) FROM (
+                        SELECT max(called_at) AS called_at FROM roll_call_records WHERE student_id = OLD.student_id
+                        UNION ALL
+                        SELECT last_called_at FROM archived_student_stats WHERE student_id = OLD.student_id
+                    )
+                )
+            WHERE student_id = OLD.student_id;
+            DELETE FROM student_call_stats WHERE student_id = OLD.student_id AND call_count <= 0;
+            UPDATE daily_call_stats SET call_count = call_count - 1
+            WHERE class_id = OLD.class_id AND group_id = OLD.group_id AND day = {day.format(row="OLD")};
+            DELETE FROM daily_call_stats
+            WHERE class_id = OLD.class_id AND group_id = OLD.group_id AND day = {day.format(row="OLD")}
+                AND call_count <= 0;"""
+    conn.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_roll_call_stats_insert
+        AFTER INSERT ON roll_call_records
+        BEGIN
+            INSERT INTO student_call_stats (student_id, call_count, last_called_at)
+            VALUES (NEW.student_id, 1, NEW.called_at)
+            ON CONFLICT (student_id) DO UPDATE SET
+                call_count = call_count + 1,
+                last_called_at = max(coalesce(last_called_at, excluded.last_called_at), excluded.last_called_at);
+            INSERT INTO daily_call_stats (class_id, group_id, day, call_count)
+            VALUES (NEW.class_id, NEW.group_id, {day.format(row="NEW")}, 1)
+            ON CONFLICT (class_id, group_id, day) DO UPDATE SET call_count = call_count + 1;
+        END
+    """)
+    conn.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_roll_call_stats_delete
+        AFTER DELETE ON roll_call_records
+        WHEN NOT EXISTS (SELECT 1 FROM archive_in_progress)
+        BEGIN
+            {decrement}
+        END
+    """)
+    conn.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_roll_call_archive_stats_delete
+        AFTER DELETE ON roll_call_archive
+        BEGIN
+            UPDATE archived_student_stats SET
+                call_count = call_count - 1,
+                last_called_at = (
+                    SELECT max(called_at) FROM roll_call_archive WHERE student_id = OLD.student_id
+                )
+            WHERE student_id = OLD.student_id;
+            DELETE FROM archived_student_stats WHERE student_id = OLD.student_id AND call_count <= 0;
+            {decrement}
+        END
+    """)
+
+
+def _owner_columns(conn):
+    for table in ("groups", "students", "roll_call_records"):
+        _add_column(conn, table, "owner_id", "INTEGER REFERENCES users (id)")
+    # 回填：分组、点名记录取所属班级的教师，学生取所在分组的教师
+    conn.exec_driver_sql(
+        "UPDATE groups SET owner_id = (SELECT owner_id FROM classes WHERE classes.id = groups.class_id)"
+    )
+    conn.exec_driver_sql(
+        "UPDATE students SET owner_id = (SELECT owner_id FROM groups WHERE groups.id = students.group_id)"
+    )
+    conn.exec_driver_sql("""
+        UPDATE roll_call_records
+        SET owner_id = (SELECT owner_id FROM classes WHERE classes.id = roll_call_records.class_id)
+    """)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_classes_owner_id ON classes (owner_id)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_groups_class_id ON groups (class_id)")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_roll_call_records_owner_called_at ON roll_call_records (owner_id, called_at, id)"
+    )
+    # 插入时未提供 owner_id（批量导入、脚本写入）由触发器补齐；移动分组、学生或班级换教师时同步更新
+    for statement in (
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_groups_owner_insert
+        AFTER INSERT ON groups WHEN NEW.owner_id IS NULL
+        BEGIN
+            UPDATE groups SET owner_id = (SELECT owner_id FROM classes WHERE id = NEW.class_id) WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_students_owner_insert
+        AFTER INSERT ON students WHEN NEW.owner_id IS NULL
+        BEGIN
+            UPDATE students SET owner_id = (SELECT owner_id FROM groups WHERE id = NEW.group_id) WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_roll_call_records_owner_insert
+        AFTER INSERT ON roll_call_records WHEN NEW.owner_id IS NULL
+        BEGIN
+            UPDATE roll_call_records SET owner_id = (SELECT owner_id FROM classes WHERE id = NEW.class_id)
+            WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_students_owner_move
+        AFTER UPDATE OF group_id ON students
+        BEGIN
+            UPDATE students SET owner_id = (SELECT owner_id FROM groups WHERE id = NEW.group_id) WHERE id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_groups_owner_move
+        AFTER UPDATE OF class_id ON groups
+        BEGIN
+            UPDATE groups SET owner_id = (SELECT owner_id FROM classes WHERE id = NEW.class_id) WHERE id = NEW.id;
+            UPDATE students SET owner_id = (SELECT owner_id FROM classes WHERE id = NEW.class_id)
+            WHERE group_id = NEW.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_classes_owner_change
+        AFTER UPDATE OF owner_id ON classes
+        BEGIN
+            UPDATE groups SET owner_id = NEW.owner_id WHERE class_id = NEW.id;
+            UPDATE students SET owner_id = NEW.owner_id
+            WHERE group_id IN (SELECT id FROM groups WHERE class_id = NEW.id);
+            UPDATE roll_call_records SET owner_id = NEW.owner_id WHERE class_id = NEW.id;
+        END
+        """,
+    ):
+        conn.exec_driver_sql(statement)
+
+
+def _student_search(conn):
+    # 搜索时按教师筛选；短查询直接扫描该教师的学生
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_students_owner_id ON students (owner_id)")
+    conn.exec_driver_sql("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS student_search USING fts5(
+            name, student_id, content='students', content_rowid='id', tokenize='trigram'
+        )
+    """)
+    for statement in (
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_students_search_insert
+        AFTER INSERT ON students
+        BEGIN
+            INSERT INTO student_search (rowid, name, student_id) VALUES (NEW.id, NEW.name, NEW.student_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_students_search_delete
+        AFTER DELETE ON students
+        BEGIN
+            INSERT INTO student_search (student_search, rowid, name, student_id)
+            VALUES ('delete', OLD.id, OLD.name, OLD.student_id);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_students_search_update
+        AFTER UPDATE OF name, student_id ON students
+        BEGIN
+            INSERT INTO student_search (student_search, rowid, name, student_id)
+            VALUES ('delete', OLD.id, OLD.name, OLD.student_id);
+            INSERT INTO student_search (rowid, name, student_id) VALUES (NEW.id, NEW.name, NEW.student_id);
+        END
+        """,
+    ):
+        conn.exec_driver_sql(statement)
+    # 为已有学生建立索引
+    conn.exec_driver_sql("INSERT INTO student_search (student_search) VALUES ('rebuild')")
+
+
+# (版本号, 说明, 迁移函数)，版本号从 1 开始连续递增
+MIGRATIONS = [
+    (1, "初始表结构", _initial_schema),
+    (2, "点名历史复合索引、批量导入索引和幂等键", _history_indexes),
+    (3, "点名统计汇总表", _call_stats),
+    (4, "公平轮换点名", _rotations),
+    (5, "点名记录归档表，统计触发器计入归档", _archive),
+    (6, "分组、学生、点名记录冗余所属教师列及索引", _owner_columns),
+    (7, "学生姓名、学号全文索引", _student_search),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def check_schema(engine):
+    """启动时检查结构版本，只读取一次 user_version；版本不一致时拒绝启动"""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version < LATEST_VERSION:
+        raise RuntimeError(f"数据库结构版本为 {version}，需要 {LATEST_VERSION}，请先执行 python migrate.py")
+    if version > LATEST_VERSION:
+        raise RuntimeError(f"数据库结构版本 {version} 高于当前代码支持的 {LATEST_VERSION}，请升级应用")
+
+
+def upgrade(engine, log=print) -> int:
+    """依次执行待执行的迁移，返回执行的迁移数"""
+    applied = 0
+    with engine.connect() as conn:
+        if not conn.exec_driver_sql("SELECT count(*) FROM sqlite_master").scalar():
+            # 新建的空数据库启用增量 VACUUM，归档后可以分批回收空间；
+            # 连接时设置 WAL 已写入文件头，需要 VACUUM 才能生效，空库上是瞬间完成的
+            conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+    for version, description, migration in MIGRATIONS:
+        with engine.connect() as conn:
+            if current_version(conn) >= version:
+                continue
+            # 加写锁后重新读取版本号，并发执行时其他进程已完成的迁移会被跳过
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            migration(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {version}")
+            conn.commit()
+        applied += 1
+        log(f"已迁移到版本 {version}：{description}")
+    return applied
+
+
+def ensure_admin(engine, log=print):
+    """创建默认管理员（不存在时）；密码哈希只在首次创建时计算"""
+    admin_username = os.getenv("ADMIN_USER", "admin")
+    admin_password = os.getenv("ADMIN_PASSWORD", "123456")
+    with Session(engine) as db:
+        if db.query(User.id).filter(User.username == admin_username).first():
+            log(f"管理员用户 '{admin_username}' 已存在")
+            return
+        db.add(User(
+            username=admin_username,
+            email=f"{admin_username}@example.com",
+            hashed_password=get_password_hash(admin_password),
+            user_type="admin"
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            # 同时执行的其他迁移进程已创建
+            db.rollback()
+            log(f"管理员用户 '{admin_username}' 已存在")
+            return
+        log(f"管理员用户 '{admin_username}' 创建成功")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    args = parser.parse_args()
+
+    from database import engine
+
+    if args.command == "status":
+        with engine.connect() as conn:
+            version = current_version(conn)
+        print(f"当前版本 {version}，最新版本 {LATEST_VERSION}")
+        for number, description, _ in MIGRATIONS:
+            if number > version:
+                print(f"  待执行 {number}：{description}")
+        return
+
+    if not upgrade(engine):
+        print(f"数据库已是最新版本 {LATEST_VERSION}")
+    ensure_admin(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Date, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -31,18 +31,27 @@ class Class(Base):
     owner = relationship("User", back_populates="classes")
     groups = relationship("Group", back_populates="class_obj", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_classes_owner_id", "owner_id"),
+    )
+
 class Group(Base):
     __tablename__ = "groups"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     class_id = Column(Integer, ForeignKey("classes.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"))  # 冗余的班级所属教师，插入时未提供则由触发器补齐
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # 关联关系
     class_obj = relationship("Class", back_populates="groups")
     students = relationship("Student", back_populates="group", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_groups_class_id", "class_id"),
+    )
+
 class Student(Base):
     __tablename__ = "students"
     
@@ -51,11 +60,19 @@ class Student(Base):
     name = Column(String, nullable=False)
     weight = Column(Float, default=1.0)
     group_id = Column(Integer, ForeignKey("groups.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"))  # 冗余的班级所属教师，插入时未提供则由触发器补齐
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # 关联关系
     group = relationship("Group", back_populates="students")
 
+    # 批量导入按 (分组, 学号) 判断是否已存在；搜索按教师筛选
+    # 姓名、学号的全文索引 student_search 是 FTS5 虚拟表，由迁移创建（见 search.py）
+    __table_args__ = (
+        Index("ix_students_group_student_id", "group_id", "student_id"),
+        Index("ix_students_owner_id", "owner_id"),
+    )
+
 class RollCallRecord(Base):
     __tablename__ = "roll_call_records"
     
@@ -64,8 +81,92 @@ class RollCallRecord(Base):
     group_id = Column(Integer, ForeignKey("groups.id"), nullable=False)
     class_id = Column(Integer, ForeignKey("classes.id"), nullable=False)
     called_at = Column(DateTime, default=datetime.utcnow)
+    idempotency_key = Column(String, nullable=True)  # 客户端生成，用于批量同步时去重
+    owner_id = Column(Integer, ForeignKey("users.id"))  # 冗余的班级所属教师，插入时未提供则由触发器补齐
     
     # 关联关系
     student = relationship("Student")
     class_obj = relationship("Class")
-    group_obj = relationship("Group")
\ No newline at end of file
+    group_obj = relationship("Group")
+
+    # 历史记录按 (called_at, id) 游标分页，各筛选条件对应的复合索引
+    __table_args__ = (
+        Index("ix_roll_call_records_called_at_id", "called_at", "id"),
+        Index("ix_roll_call_records_owner_called_at", "owner_id", "called_at", "id"),
+        Index("ix_roll_call_records_class_called_at", "class_id", "called_at", "id"),
+        Index("ix_roll_call_records_group_called_at", "group_id", "called_at", "id"),
+        Index("ix_roll_call_records_student_called_at", "student_id", "called_at", "id"),
+        Index("ux_roll_call_records_idempotency_key", "class_id", "idempotency_key", unique=True),
+    )
+
+# 归档的点名记录，见 archive.py：只保留导出所需的列，索引也只有班级和学生两个
+class RollCallArchive(Base):
+    __tablename__ = "roll_call_archive"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # 沿用原记录ID
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    group_id = Column(Integer, ForeignKey("groups.id"), nullable=False)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False)
+    called_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_roll_call_archive_class_called_at", "class_id", "called_at", "id"),
+        Index("ix_roll_call_archive_student_called_at", "student_id", "called_at", "id"),
+    )
+
+# 每个学生已归档记录的汇总，重建统计时与在线记录合并
+class ArchivedStudentStat(Base):
+    __tablename__ = "archived_student_stats"
+    
+    student_id = Column(Integer, primary_key=True)
+    call_count = Column(Integer, nullable=False, default=0)
+    last_called_at = Column(DateTime)
+
+# 归档批次执行期间存在一行，stats.py 中的删除触发器据此不扣减汇总表
+class ArchiveInProgress(Base):
+    __tablename__ = "archive_in_progress"
+    
+    id = Column(Integer, primary_key=True)
+
+# 统计汇总表（含已归档记录），由 stats.py 中的触发器在点名记录增删时增量维护
+class StudentCallStat(Base):
+    __tablename__ = "student_call_stats"
+    
+    student_id = Column(Integer, primary_key=True)
+    call_count = Column(Integer, nullable=False, default=0)
+    last_called_at = Column(DateTime)
+
+class DailyCallStat(Base):
+    __tablename__ = "daily_call_stats"
+    
+    class_id = Column(Integer, primary_key=True)
+    group_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    call_count = Column(Integer, nullable=False, default=0)
+
+# 公平轮换点名的持久状态，见 rotation.py
+class Rotation(Base):
+    __tablename__ = "rotations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False)
+    selection = Column(String, nullable=False, default="")  # 升序逗号分隔的分组ID，空字符串表示整个班级
+    cycle = Column(Integer, nullable=False, default=1)  # 当前第几轮
+    cursor = Column(Float, nullable=False, default=0.0)  # 本轮已点到的最大位置
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ux_rotations_class_selection", "class_id", "selection", unique=True),
+    )
+
+class RotationEntry(Base):
+    __tablename__ = "rotation_entries"
+    
+    rotation_id = Column(Integer, ForeignKey("rotations.id"), primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.id"), primary_key=True)
+    position = Column(Float, nullable=False)  # 位置大于游标的学生本轮尚未点到
+
+    __table_args__ = (
+        Index("ix_rotation_entries_position", "rotation_id", "position"),
+        Index("ix_rotation_entries_student_id", "student_id"),
+    )
@@ -0,0 +1,135 @@
+"""响应字段投影（fields= / expand=）
+
+树形接口和点名记录默认返回完整的嵌套模型，客户端可以只取需要的部分：
+- fields=id,name         各层只保留列出的字段（camelCase，id 始终保留）
+- expand=groups.students 需要展开的关联，点号表示逐层展开；expand= 为空表示不展开任何关联
+
+按投影生成裁剪后的 pydantic 模型并缓存，序列化时只校验、只访问保留的字段，
+未展开的关联不会触发懒加载，同时减少序列化耗时和响应体积。
+"""
+import typing
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, List, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response
+from pydantic import BaseModel, create_model
+
+from fast_json import dump_json, render
+from schemas import BaseSchema
+
+
+@dataclass(frozen=True)
+class Projection:
+    fields: Optional[FrozenSet[str]] = None  # None 表示全部字段
+    expand: Optional[FrozenSet[str]] = None  # None 表示接口默认的展开方式
+
+    @property
+    def is_default(self) -> bool:
+        return self.fields is None and self.expand is None
+
+
+def _split(value: Optional[str]) -> Optional[FrozenSet[str]]:
+    if value is None:
+        return None
+    return frozenset(part.strip() for part in value.split(",") if part.strip())
+
+
+def get_projection(
+    fields: Optional[str] = Query(None, description="只返回的字段，逗号分隔，例如 id,name"),
+    expand: Optional[str] = Query(None, description="展开的关联，逗号分隔，例如 groups.students；为空表示不展开"),
+) -> Projection:
+    """依赖项：解析 fields / expand 查询参数"""
+    return Projection(_split(fields), _split(expand))
+
+
+def _relation(annotation) -> Tuple[Optional[type], bool]:
+    """字段若是嵌套模型（或其列表），返回 (模型, 是否列表)"""
+    if typing.get_origin(annotation) in (list, List):
+        (item,) = typing.get_args(annotation)
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            return item, True
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+def _field_names(schema, seen=None) -> set:
+    """模型及其嵌套模型中所有字段的 camelCase 名称"""
+    seen = seen if seen is not None else set()
+    if schema in seen:
+        return set()
+    seen.add(schema)
+    names = set()
+    for name, info in schema.model_fields.items():
+        names.add(info.alias or name)
+        nested, _ = _relation(info.annotation)
+        if nested is not None:
+            names |= _field_names(nested, seen)
+    return names
+
+
+def _build(schema, fields, expand: FrozenSet[str], prefix: str):
+    definitions = {}
+    for name, info in schema.model_fields.items():
+        alias = info.alias or name
+        nested, many = _relation(info.annotation)
+        if nested is not None:
+            path = f"{prefix}{alias}"
+            if not any(item == path or item.startswith(path + ".") for item in expand):
+                continue
+            view = _build(nested, fields, expand, path + ".")
+            definitions[name] = (List[view], []) if many else (view, ...)
+        elif fields is None or alias in fields or name == "id":
+            definitions[name] = (info.annotation, info)
+    return create_model(f"{schema.__name__}View", __base__=BaseSchema, **definitions)
+
+
+@lru_cache(maxsize=256)
+def _cached_view(schema, fields, expand):
+    return _build(schema, fields, expand, "")
+
+
+def view_schema(schema, projection: Projection, default_expand: Tuple[str, ...] = ()):
+    """按投影裁剪响应模型；默认投影直接返回原模型"""
+    if projection.is_default:
+        return schema
+    expand = projection.expand if projection.expand is not None else frozenset(default_expand)
+    known = _field_names(schema)
+    unknown = sorted((projection.fields or frozenset()) - known)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知字段: {', '.join(unknown)}")
+    for path in expand:
+        nested = schema
+        for part in path.split("."):
+            fields = {info.alias or name: info for name, info in nested.model_fields.items()}
+            nested = _relation(fields[part].annotation)[0] if part in fields else None
+            if nested is None:
+                raise HTTPException(status_code=400, detail=f"无法展开: {path}")
+    return _cached_view(schema, projection.fields, frozenset(expand))
+
+
+def page_view(page, item, projection: Projection):
+    """分页响应：只裁剪 items 中的条目，分页游标等字段保留"""
+    view = view_schema(item, projection)
+    return page if view is item else _cached_page(page, view)
+
+
+@lru_cache(maxsize=256)
+def _cached_page(page, item_view):
+    definitions = {name: (info.annotation, info) for name, info in page.model_fields.items()}
+    definitions["items"] = (List[item_view], ...)
+    return create_model(f"{page.__name__}View", __base__=BaseSchema, **definitions)
+
+
+def expanded(projection: Projection, default_expand: Tuple[str, ...], path: str) -> bool:
+    """投影是否需要某个关联，用于决定查询时预加载哪些关联"""
+    expand = projection.expand if projection.expand is not None else default_expand
+    return any(item == path or item.startswith(path + ".") for item in expand)
+
+
+def render_view(schema, view, data):
+    """原模型交给 render；裁剪后的模型总是直接序列化，避免被 response_model 按完整模型重新校验"""
+    if view is schema:
+        return render(schema, data)
+    return Response(dump_json(view, data), media_type="application/json")
@@ -0,0 +1,167 @@
+import base64
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_, union_all
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import Class, Group, Student, RollCallRecord, RollCallArchive
+from projection import Projection, expanded
+from schemas import RollCallRecordSummary
+
+# 同步与异步接口共用的查询构造
+
+# 预加载策略：以固定数量的查询取出完整的 班级 -> 分组 -> 学生 树，避免序列化时逐个懒加载
+GROUP_TREE_OPTIONS = (selectinload(Group.students),)
+CLASS_TREE_OPTIONS = (selectinload(Class.groups).selectinload(Group.students),)
+ROLL_CALL_RECORD_OPTIONS = (
+    joinedload(RollCallRecord.student),
+    selectinload(RollCallRecord.class_obj).selectinload(Class.groups).selectinload(Group.students),
+    selectinload(RollCallRecord.group_obj).selectinload(Group.students),
+)
+
+# 各接口默认展开的关联（见 projection.py），与上面的完整预加载一致
+CLASS_TREE_EXPAND = ("groups.students",)
+GROUP_TREE_EXPAND = ("students",)
+ROLL_CALL_RECORD_EXPAND = ("student", "classObj.groups.students", "groupObj.students")
+
+def class_tree_options(projection: Projection):
+    """按投影只预加载需要展开的层级"""
+    if expanded(projection, CLASS_TREE_EXPAND, "groups.students"):
+        return CLASS_TREE_OPTIONS
+    if expanded(projection, CLASS_TREE_EXPAND, "groups"):
+        return (selectinload(Class.groups),)
+    return ()
+
+def group_tree_options(projection: Projection):
+    return GROUP_TREE_OPTIONS if expanded(projection, GROUP_TREE_EXPAND, "students") else ()
+
+def roll_call_record_options(projection: Projection):
+    """异步会话不能懒加载：学生、分组、班级本身总是加载（推送摘要需要名称），嵌套树按投影加载"""
+    if projection.is_default:
+        return ROLL_CALL_RECORD_OPTIONS
+    class_obj = selectinload(RollCallRecord.class_obj)
+    if expanded(projection, ROLL_CALL_RECORD_EXPAND, "classObj.groups.students"):
+        class_obj = class_obj.selectinload(Class.groups).selectinload(Group.students)
+    elif expanded(projection, ROLL_CALL_RECORD_EXPAND, "classObj.groups"):
+        class_obj = class_obj.selectinload(Class.groups)
+    group_obj = selectinload(RollCallRecord.group_obj)
+    if expanded(projection, ROLL_CALL_RECORD_EXPAND, "groupObj.students"):
+        group_obj = group_obj.selectinload(Group.students)
+    return (joinedload(RollCallRecord.student), class_obj, group_obj)
+
+def to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """called_at 以 UTC 无时区时间存储，带时区的查询参数需先转换"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def encode_history_cursor(called_at: datetime, record_id: int) -> str:
+    """将 (called_at, id) 编码为不透明的分页游标"""
+    raw = f"{called_at.isoformat()}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_history_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        called_at, record_id = raw.split("|")
+        return datetime.fromisoformat(called_at), int(record_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+
+def history_select(
+    owner_id: int,
+    class_id: Optional[int] = None,
+    group_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    source=RollCallRecord,
+):
+    """点名历史的精简列查询（带筛选，不排序）；source 为 RollCallArchive 时查询归档记录"""
+    stmt = (
+        select(
+            source.id, source.student_id, source.group_id, source.class_id, source.called_at,
+            Student.name.label("student_name"), Student.student_id.label("student_number"),
+            Group.name.label("group_name"), Class.name.label("class_name")
+        )
+        .join(Class, source.class_id == Class.id)
+        .join(Group, source.group_id == Group.id)
+        .join(Student, source.student_id == Student.id)
+    )
+    # 在线记录带冗余的 owner_id，按教师筛选只需 (owner_id, called_at, id) 索引；归档记录经班级判断
+    if source is RollCallRecord:
+        stmt = stmt.where(RollCallRecord.owner_id == owner_id)
+    else:
+        stmt = stmt.where(Class.owner_id == owner_id)
+    if class_id is not None:
+        stmt = stmt.where(source.class_id == class_id)
+    if group_id is not None:
+        stmt = stmt.where(source.group_id == group_id)
+    if student_id is not None:
+        stmt = stmt.where(source.student_id == student_id)
+    if start is not None:
+        stmt = stmt.where(source.called_at >= to_naive_utc(start))
+    if end is not None:
+        stmt = stmt.where(source.called_at < to_naive_utc(end))
+    return stmt
+
+def export_select(
+    owner_id: int,
+    class_id: Optional[int] = None,
+    group_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_archived: bool = True,
+):
+    """按时间顺序导出的点名记录，默认合并在线和归档记录"""
+    filters = (owner_id, class_id, group_id, student_id, start, end)
+    if not include_archived:
+        return history_select(*filters).order_by(RollCallRecord.called_at, RollCallRecord.id)
+    # 归档记录都早于在线记录，但按列排序更稳妥（例如补录的旧记录）
+    records = union_all(history_select(*filters, source=RollCallArchive), history_select(*filters)).subquery()
+    return select(records).order_by(records.c.called_at, records.c.id)
+
+def history_statement(
+    owner_id: int,
+    class_id: Optional[int] = None,
+    group_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+):
+    """按 (called_at, id) 倒序的点名历史查询，多取一行用于判断是否还有下一页"""
+    stmt = history_select(owner_id, class_id, group_id, student_id, start, end)
+    if cursor:
+        stmt = stmt.where(tuple_(RollCallRecord.called_at, RollCallRecord.id) < decode_history_cursor(cursor))
+    return stmt.order_by(RollCallRecord.called_at.desc(), RollCallRecord.id.desc()).limit(limit + 1)
+
+def called_since_statement(class_id: int, since: datetime):
+    """班级中 since 之后已被点到的学生（去重），按 (class_id, called_at) 索引只扫描该时间窗口"""
+    return (
+        select(RollCallRecord.student_id)
+        .where(RollCallRecord.class_id == class_id, RollCallRecord.called_at >= to_naive_utc(since))
+        .distinct()
+    )
+
+def record_summary(record: RollCallRecord) -> RollCallRecordSummary:
+    """由已加载关联对象的点名记录构造精简记录（与历史接口的条目一致）"""
+    return RollCallRecordSummary(
+        id=record.id, student_id=record.student_id, group_id=record.group_id,
+        class_id=record.class_id, called_at=record.called_at,
+        student_name=record.student.name, student_number=record.student.student_id,
+        group_name=record.group_obj.name, class_name=record.class_obj.name,
+    )
+
+def history_page(rows, limit: int):
+    """把 history_statement 的结果转换为分页响应"""
+    items = [RollCallRecordSummary.model_validate(row._asdict()) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_history_cursor(last.called_at, last.id)
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,245 @@
+"""公平轮换点名
+
+每个 (班级, 分组选择) 保存一份持久的轮换状态：班级内每名学生（权重大于 0）在 rotation_entries
+中有一个位置，rotations.cursor 记录本轮已点到的最大位置。点名取位置大于游标的最小者并前移游标，
+一次索引查找；本轮全部点完后整体重新洗牌进入下一轮，均摊每次点名 O(1)。
+
+位置按权重洗牌：position = 游标 + Exp(1) / 权重（Efraimidis-Spirakis 加权随机排列），
+每轮每人恰好点到一次，权重大的学生倾向于更早被点到。由于指数分布无记忆，新增学生或修改权重时
+只需为该学生在当前游标之后重新取一个位置，与对剩余学生整体重新洗牌的分布完全相同，不必重建。
+"""
+import random
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Group, Student, Rotation, RotationEntry
+
+# 并发点名时游标冲突的重试次数
+DRAW_RETRIES = 5
+
+_rng = random.SystemRandom()
+
+
+def _offset(weight: float) -> float:
+    return _rng.expovariate(1.0) / weight
+
+
+def _parse_selection(selection: str) -> Optional[set]:
+    return {int(group_id) for group_id in selection.split(",")} if selection else None
+
+
+def selection_key(db: Session, class_id: int, group_ids: Optional[Iterable[int]]) -> str:
+    """规范化分组选择；未指定或选中了班级全部分组时视为整个班级，之后新增的分组也会加入轮换"""
+    if not group_ids:
+        return ""
+    class_group_ids = set(db.scalars(select(Group.id).where(Group.class_id == class_id)))
+    selected = set(group_ids) & class_group_ids
+    if not selected:
+        raise HTTPException(status_code=400, detail="所选分组不属于该班级")
+    if selected == class_group_ids:
+        return ""
+    return ",".join(str(group_id) for group_id in sorted(selected))
+
+
+def _candidates(db: Session, class_id: int, selection: str):
+    query = (
+        select(Student.id, Student.weight).join(Group)
+        .where(Group.class_id == class_id, Student.weight > 0)
+    )
+    groups = _parse_selection(selection)
+    if groups is not None:
+        query = query.where(Group.id.in_(groups))
+    return db.execute(query).all()
+
+
+def get_rotation(db: Session, class_id: int, selection: str) -> Rotation:
+    """取得轮换状态，不存在时按当前花名册创建第一轮"""
+    rotation = db.scalars(
+        select(Rotation).where(Rotation.class_id == class_id, Rotation.selection == selection)
+    ).first()
+    if rotation is not None:
+        return rotation
+    try:
+        with db.begin_nested():
+            rotation = Rotation(class_id=class_id, selection=selection, cycle=1, cursor=0.0)
+            db.add(rotation)
+            db.flush()
+            entries = [
+                {"rotation_id": rotation.id, "student_id": row.id, "position": _offset(row.weight)}
+                for row in _candidates(db, class_id, selection)
+            ]
+            if entries:
+                db.execute(insert(RotationEntry), entries)
+    except IntegrityError:
+        # 并发请求已创建
+        rotation = db.scalars(
+            select(Rotation).where(Rotation.class_id == class_id, Rotation.selection == selection)
+        ).one()
+    return rotation
+
+
+def _next_entry(db: Session, rotation: Rotation):
+    return db.execute(
+        select(RotationEntry.student_id, RotationEntry.position)
+        .where(RotationEntry.rotation_id == rotation.id, RotationEntry.position > rotation.cursor)
+        .order_by(RotationEntry.position)
+        .limit(1)
+    ).first()
+
+
+def _start_next_cycle(db: Session, rotation: Rotation) -> bool:
+    """本轮已全部点完：以当前游标为起点重新洗牌；只有一个并发请求能成功进入下一轮"""
+    cycle = rotation.cycle
+    advanced = db.execute(
+        update(Rotation).where(Rotation.id == rotation.id, Rotation.cycle == cycle).values(cycle=cycle + 1)
+    ).rowcount
+    if not advanced:
+        return False
+    entries = db.execute(
+        select(RotationEntry.student_id, Student.weight)
+        .join(Student, Student.id == RotationEntry.student_id)
+        .where(RotationEntry.rotation_id == rotation.id)
+    ).all()
+    if entries:
+        db.execute(update(RotationEntry), [
+            {"rotation_id": rotation.id, "student_id": row.student_id, "position": rotation.cursor + _offset(row.weight)}
+            for row in entries
+        ])
+    return True
+
+
+def draw(db: Session, rotation: Rotation) -> Optional[Tuple[int, int]]:
+    """点下一位学生并前移游标，返回 (学生主键, 分组ID)；没有可点名的学生时返回 None"""
+    for _ in range(DRAW_RETRIES):
+        entry = _next_entry(db, rotation)
+        if entry is None:
+            has_entries = db.scalar(
+                select(RotationEntry.student_id).where(RotationEntry.rotation_id == rotation.id).limit(1)
+            )
+            if has_entries is None:
+                return None
+            _start_next_cycle(db, rotation)
+            db.refresh(rotation)
+            continue
+        # 以旧游标为条件更新，并发点名时只有一个请求能点到同一位学生
+        moved = db.execute(
+            update(Rotation)
+            .where(Rotation.id == rotation.id, Rotation.cursor == rotation.cursor)
+            .values(cursor=entry.position)
+        ).rowcount
+        if moved:
+            group_id = db.scalar(select(Student.group_id).where(Student.id == entry.student_id))
+            return entry.student_id, group_id
+        db.refresh(rotation)
+    raise HTTPException(status_code=409, detail="点名冲突，请重试")
+
+
+def reset(db: Session, rotation: Rotation):
+    """放弃本轮剩余的学生，立即重新洗牌开始新一轮"""
+    _start_next_cycle(db, rotation)
+    db.refresh(rotation)
+
+
+def status(db: Session, rotation: Rotation) -> dict:
+    """轮换状态：本轮总人数、已点人数和尚未点到的学生（按分组、学号排序，不暴露后续顺序）"""
+    rows = db.execute(
+        select(RotationEntry.position, Student.id, Student.student_id, Student.name, Student.group_id)
+        .join(Student, Student.id == RotationEntry.student_id)
+        .where(RotationEntry.rotation_id == rotation.id)
+    ).all()
+    remaining = sorted(
+        (row for row in rows if row.position > rotation.cursor),
+        key=lambda row: (row.group_id, row.student_id),
+    )
+    return {
+        "class_id": rotation.class_id,
+        "group_ids": sorted(_parse_selection(rotation.selection)) if rotation.selection else None,
+        "cycle": rotation.cycle,
+        "total": len(rows),
+        "drawn": len(rows) - len(remaining),
+        "remaining": [
+            {"id": row.id, "student_id": row.student_id, "name": row.name, "group_id": row.group_id}
+            for row in remaining
+        ],
+    }
+
+
+def _rotations_for_group(db: Session, class_id: int, group_id: int) -> List[Rotation]:
+    rotations = db.scalars(select(Rotation).where(Rotation.class_id == class_id)).all()
+    return [
+        rotation for rotation in rotations
+        if not rotation.selection or group_id in _parse_selection(rotation.selection)
+    ]
+
+
+def add_student(db: Session, class_id: int, student_id: int, group_id: int, weight: float):
+    """新学生加入各相关轮换本轮的剩余部分"""
+    if not weight or weight <= 0:
+        return
+    entries = [
+        {"rotation_id": rotation.id, "student_id": student_id, "position": rotation.cursor + _offset(weight)}
+        for rotation in _rotations_for_group(db, class_id, group_id)
+    ]
+    if entries:
+        db.execute(insert(RotationEntry), entries)
+
+
+def reweight_student(db: Session, class_id: int, student_id: int, group_id: int, weight: float):
+    """权重变化后，本轮尚未点到的学生按新权重重新取位置；权重为 0 的学生退出轮换"""
+    reweight_students(db, class_id, [(student_id, group_id, weight)])
+
+
+def reweight_students(db: Session, class_id: int, changes: List[Tuple[int, int, float]]):
+    """批量修改权重：changes 为 (学生, 分组, 新权重)，每个轮换只查询一次现有位置"""
+    for rotation in db.scalars(select(Rotation).where(Rotation.class_id == class_id)).all():
+        groups = _parse_selection(rotation.selection) if rotation.selection else None
+        affected = [change for change in changes if groups is None or change[1] in groups]
+        if not affected:
+            continue
+        positions = dict(db.execute(
+            select(RotationEntry.student_id, RotationEntry.position).where(
+                RotationEntry.rotation_id == rotation.id,
+                RotationEntry.student_id.in_([student_id for student_id, _, _ in affected])
+            )
+        ).all())
+        removed, added, moved = [], [], []
+        for student_id, _, weight in affected:
+            key = {"rotation_id": rotation.id, "student_id": student_id}
+            position = positions.get(student_id)
+            if not weight or weight <= 0:
+                if position is not None:
+                    removed.append(student_id)
+            elif position is None:
+                added.append({**key, "position": rotation.cursor + _offset(weight)})
+            elif position > rotation.cursor:
+                moved.append({**key, "position": rotation.cursor + _offset(weight)})
+        if removed:
+            db.execute(delete(RotationEntry).where(
+                RotationEntry.rotation_id == rotation.id, RotationEntry.student_id.in_(removed)
+            ))
+        if added:
+            db.execute(insert(RotationEntry), added)
+        if moved:
+            db.execute(update(RotationEntry), moved)
+
+
+def sync_class(db: Session, class_id: int):
+    """批量导入后补齐：为各轮换加入缺少的学生，移除权重已为 0 的学生"""
+    for rotation in db.scalars(select(Rotation).where(Rotation.class_id == class_id)).all():
+        present = set(db.scalars(select(RotationEntry.student_id).where(RotationEntry.rotation_id == rotation.id)))
+        candidates = _candidates(db, class_id, rotation.selection)
+        missing = [
+            {"rotation_id": rotation.id, "student_id": row.id, "position": rotation.cursor + _offset(row.weight)}
+            for row in candidates if row.id not in present
+        ]
+        if missing:
+            db.execute(insert(RotationEntry), missing)
+        stale = present - {row.id for row in candidates}
+        if stale:
+            db.execute(delete(RotationEntry).where(
+                RotationEntry.rotation_id == rotation.id, RotationEntry.student_id.in_(stale)
+            ))
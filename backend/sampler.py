@@ -0,0 +1,152 @@
+import os
+import random
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+from models import Group, Student
+from shared_state import shared_state
+
+# 候选项: (学生主键, 分组ID, 权重)
+Candidate = Tuple[int, int, float]
+
+_rng = random.SystemRandom()
+
+SAMPLER_CACHE_SIZE = int(os.getenv("SAMPLER_CACHE_SIZE", "256"))
+
+
+class AliasTable:
+    """Walker/Vose 别名表，构建 O(n)，每次抽样 O(1)"""
+
+    def __init__(self, candidates: Sequence[Candidate]):
+        self.candidates = [c for c in candidates if c[2] and c[2] > 0]
+        self.total = sum(c[2] for c in self.candidates)
+        n = len(self.candidates)
+        self.prob: List[float] = [0.0] * n
+        self.alias: List[int] = [0] * n
+        if n == 0:
+            return
+
+        scaled = [c[2] * n / self.total for c in self.candidates]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+        # 浮点误差导致的剩余项概率均为 1
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def sample(self, rng: random.Random = _rng) -> Candidate:
+        i = rng.randrange(len(self.candidates))
+        if rng.random() < self.prob[i]:
+            return self.candidates[i]
+        return self.candidates[self.alias[i]]
+
+
+class WeightedSampler:
+    """按权重抽取学生，支持“不重复”排除而不必每次重建别名表
+
+    排除集合通过拒绝采样处理；当被排除的权重超过当前表的一半时，
+    针对剩余学生构建一张压缩表并缓存，之后的抽样优先使用它，
+    因此一轮点名中重建的总代价与学生数成线性关系。
+    """
+
+    def __init__(self, candidates: Sequence[Candidate]):
+        self.base = AliasTable(candidates)
+        self.weights: Dict[int, float] = {c[0]: c[2] for c in self.base.candidates}
+        self._compacted: Optional[Tuple[frozenset, AliasTable]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.base)
+
+    def draw(self, excluded: Iterable[int] = (), rng: random.Random = _rng) -> Optional[Candidate]:
+        """抽取一名学生，没有可抽取的学生时返回 None"""
+        excluded = set(excluded)
+        table, pending = self.base, excluded
+        with self._lock:
+            compacted = self._compacted
+        if compacted and compacted[0] <= excluded:
+            table, pending = compacted[1], excluded - compacted[0]
+
+        live_weight = table.total - sum(self.weights.get(i, 0.0) for i in pending)
+        if not len(table) or live_weight <= table.total * 1e-9:
+            return None
+
+        if live_weight < table.total / 2:
+            table = AliasTable([c for c in table.candidates if c[0] not in pending])
+            with self._lock:
+                self._compacted = (frozenset(excluded), table)
+
+        while True:
+            candidate = table.sample(rng)
+            if candidate[0] not in excluded:
+                return candidate
+
+
+class SamplerCache:
+    """按 (班级, 分组选择) 缓存抽样器，花名册变更时按班级失效
+
+    失效通过共享计数器中的班级版本号传播，其他 worker 取用时发现版本变化会重新构建。
+    条目数超过 maxsize 时淘汰最久未用的，已删除班级在其他 worker 中的条目也会因此被淘汰。
+    """
+
+    def __init__(self, store=shared_state, maxsize: int = SAMPLER_CACHE_SIZE):
+        self.store = store
+        self.maxsize = maxsize
+        self._samplers: "OrderedDict[Tuple[int, Optional[Tuple[int, ...]]], Tuple[int, WeightedSampler]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(class_id: int, group_ids: Optional[Iterable[int]]):
+        return (class_id, tuple(sorted(set(group_ids))) if group_ids else None)
+
+    def get(self, db: Session, class_id: int, group_ids: Optional[Iterable[int]] = None) -> WeightedSampler:
+        key = self._key(class_id, group_ids)
+        # 先读版本号再查询，查询期间发生的变更会在下次取用时重新构建
+        version = self.store.get(f"class:{class_id}")
+        with self._lock:
+            entry = self._samplers.get(key)
+            if entry is not None:
+                self._samplers.move_to_end(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        query = db.query(Student.id, Student.group_id, Student.weight).join(Group).filter(Group.class_id == class_id)
+        if key[1] is not None:
+            query = query.filter(Group.id.in_(key[1]))
+        sampler = WeightedSampler([(row.id, row.group_id, row.weight) for row in query])
+        if self.maxsize <= 0:
+            return sampler
+        with self._lock:
+            self._samplers[key] = (version, sampler)
+            self._samplers.move_to_end(key)
+            while len(self._samplers) > self.maxsize:
+                self._samplers.popitem(last=False)
+        return sampler
+
+    def invalidate(self, class_id: Optional[int] = None):
+        """使某个班级（或本进程全部）的抽样器失效"""
+        if class_id is not None:
+            self.store.incr(f"class:{class_id}")
+        with self._lock:
+            if class_id is None:
+                self._samplers.clear()
+                return
+            for key in [k for k in self._samplers if k[0] == class_id]:
+                del self._samplers[key]
+
+
+sampler_cache = SamplerCache()
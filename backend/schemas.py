@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Literal, Optional
+from datetime import date, datetime
 from pydantic.alias_generators import to_camel
 
 # 定义统一的 BaseSchema，启用 camelCase 别名
@@ -49,6 +49,10 @@ class Token(BaseSchema):
     token_type: str
     user: User
 
+class StreamTicket(BaseSchema):
+    ticket: str
+    expires_in: int  # 秒
+
 class TokenData(BaseSchema):
     username: Optional[str] = None
 
@@ -78,6 +82,60 @@ class Student(StudentBase):
     class Config:
         from_attributes = True
 
+class ImportRowError(BaseSchema):
+    row: int
+    message: str
+
+class StudentImportResult(BaseSchema):
+    created: int
+    updated: int
+    errors: List[ImportRowError] = []
+
+class StudentSearchHit(BaseSchema):
+    id: int
+    student_id: str
+    name: str
+    weight: float
+    group_id: int
+    group_name: str
+    class_id: int
+    class_name: str
+
+class StudentSearchPage(BaseSchema):
+    items: List[StudentSearchHit]
+    next_offset: Optional[int] = None
+
+class StudentBulkOperation(BaseSchema):
+    op: Literal["move", "weight", "rename", "delete"]
+    id: int  # 学生主键
+    group_id: Optional[int] = None  # move：目标分组
+    weight: Optional[float] = Field(None, ge=0)  # weight：新权重
+    student_id: Optional[str] = None  # rename：新学号
+    name: Optional[str] = None  # rename：新姓名
+
+class StudentBulkRequest(BaseSchema):
+    operations: List[StudentBulkOperation] = Field(..., min_length=1, max_length=1000)
+
+class StudentMove(BaseSchema):
+    id: int
+    group_id: int
+
+class StudentWeight(BaseSchema):
+    id: int
+    weight: float
+
+class StudentRename(BaseSchema):
+    id: int
+    student_id: str
+    name: str
+
+class StudentBulkResult(BaseSchema):
+    """只列出实际发生变化的学生"""
+    moved: List[StudentMove] = []
+    weights: List[StudentWeight] = []
+    renamed: List[StudentRename] = []
+    deleted: List[int] = []
+
 # 分组相关模式
 class GroupBase(BaseSchema):
     name: str
@@ -121,6 +179,46 @@ class RollCallRecordCreate(BaseSchema):
     student_id: int
     class_id: int
 
+class RollCallBatchItem(BaseSchema):
+    student_id: int
+    class_id: int
+    called_at: Optional[datetime] = None  # 客户端记录的点名时间，为空时使用服务器时间
+    idempotency_key: Optional[str] = Field(None, max_length=64)
+
+class RollCallBatchRequest(BaseSchema):
+    records: List[RollCallBatchItem] = Field(..., max_length=500)
+
+class RollCallBatchResult(BaseSchema):
+    index: int
+    status: str  # created, duplicate, invalid
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class RollCallBatchResponse(BaseSchema):
+    created: int
+    results: List[RollCallBatchResult]
+
+class RollCallDrawRequest(BaseSchema):
+    class_id: int
+    group_ids: Optional[List[int]] = None  # 为空表示整个班级
+    allow_repeat: bool = False
+    since: Optional[datetime] = None  # 不允许重复时，排除该时间之后已被点到的学生；为空时按公平轮换点名
+    mode: Literal["random", "rotation"] = "random"  # rotation：服务端公平轮换，本轮每人点到一次后才会重复
+
+class RotationStudent(BaseSchema):
+    id: int
+    student_id: str
+    name: str
+    group_id: int
+
+class RotationStatus(BaseSchema):
+    class_id: int
+    group_ids: Optional[List[int]] = None  # 为空表示整个班级
+    cycle: int
+    total: int
+    drawn: int
+    remaining: List[RotationStudent]
+
 class RollCallRecord(BaseSchema):
     id: int
     student_id: int
@@ -133,6 +231,45 @@ class RollCallRecord(BaseSchema):
     class Config:
         from_attributes = True
 
+class RollCallRecordSummary(BaseSchema):
+    """精简的点名记录，只包含 ID 和名称"""
+    id: int
+    student_id: int
+    group_id: int
+    class_id: int
+    called_at: datetime
+    student_name: str
+    student_number: str  # 学号
+    group_name: str
+    class_name: str
+
+class RollCallHistoryPage(BaseSchema):
+    items: List[RollCallRecordSummary]
+    next_cursor: Optional[str] = None
+
+# 统计相关模式
+class ClassStat(BaseSchema):
+    class_id: int
+    name: str
+    call_count: int
+
+class GroupStat(BaseSchema):
+    group_id: int
+    name: str
+    call_count: int
+
+class StudentStat(BaseSchema):
+    id: int
+    student_id: str  # 学号
+    name: str
+    group_id: int
+    call_count: int
+    last_called_at: Optional[datetime] = None
+
+class DailyStat(BaseSchema):
+    day: date
+    call_count: int
+
 # 响应模式
 class Message(BaseSchema):
     message: str
@@ -0,0 +1,121 @@
+"""学生搜索（姓名 / 学号）
+
+student_search 是以 students 为外部内容表的 FTS5 虚拟表，使用 trigram 分词，支持任意位置的子串匹配
+（不区分大小写）；students 上的触发器在插入、删除、修改姓名或学号时同步索引（见 migrate.py 版本 7）。
+
+两种查询方式，按代价选择：
+- 扫描：按 students.owner_id 索引只扫描当前教师的学生，代价与该教师的学生人数成正比
+  （2000 名学生约 0.5 ms）；trigram 索引要求至少 3 个字符，更短的查询（例如两个字的姓名）总是扫描
+- 全文索引：代价与全库匹配的学生数成正比，与教师的学生人数无关；只在教师的学生数超过
+  SEARCH_SCAN_MAX_STUDENTS 时使用，避免学号公共前缀（如入学年份）匹配全库学生时变慢
+
+两种方式排序相同：完全相同 > 前缀匹配 > 包含，同一档内姓名越短越靠前，再按姓名排序；按偏移分页。
+
+索引损坏或直接修改过数据库文件后重建：
+    python search.py rebuild
+"""
+import argparse
+import os
+
+from sqlalchemy import text
+
+# trigram 分词的最短查询长度
+MIN_INDEXED_LENGTH = 3
+# 教师的学生数不超过该值时直接扫描，不使用全文索引
+SEARCH_SCAN_MAX_STUDENTS = int(os.getenv("SEARCH_SCAN_MAX_STUDENTS", "5000"))
+
+_COLUMNS = """
+    SELECT s.id, s.student_id, s.name, s.weight, s.group_id, g.name AS group_name,
+           g.class_id, c.name AS class_name
+"""
+_JOINS = """
+    JOIN groups g ON g.id = s.group_id
+    JOIN classes c ON c.id = g.class_id
+"""
+_RANK = """
+    CASE
+        WHEN s.name LIKE :exact ESCAPE '\\' OR s.student_id LIKE :exact ESCAPE '\\' THEN 0
+        WHEN s.name LIKE :prefix ESCAPE '\\' OR s.student_id LIKE :prefix ESCAPE '\\' THEN 1
+        ELSE 2
+    END, length(s.name), s.name, s.id
+"""
+
+_INDEXED = text(f"""
+    {_COLUMNS}
+    FROM student_search f
+    JOIN students s ON s.id = f.rowid
+    {_JOINS}
+    WHERE student_search MATCH :match AND s.owner_id = :owner_id
+    ORDER BY {_RANK}
+    LIMIT :limit OFFSET :offset
+""")
+
+_SCAN = text(f"""
+    {_COLUMNS}
+    FROM students s
+    {_JOINS}
+    WHERE s.owner_id = :owner_id
+      AND (s.name LIKE :contains ESCAPE '\\' OR s.student_id LIKE :contains ESCAPE '\\')
+    ORDER BY {_RANK}
+    LIMIT :limit OFFSET :offset
+""")
+
+_ROSTER_SIZE = text("SELECT count(*) FROM students WHERE owner_id = :owner_id")
+
+
+def _like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_statement(owner_id: int, query: str, limit: int = 20, offset: int = 0, roster_size: int = 0):
+    """返回 (语句, 参数)，多取一行用于判断是否还有下一页；roster_size 为教师的学生数"""
+    query = query.strip()
+    escaped = _like(query)
+    params = {
+        "owner_id": owner_id, "limit": limit + 1, "offset": offset,
+        "exact": escaped, "prefix": f"{escaped}%", "contains": f"%{escaped}%",
+    }
+    if len(query) >= MIN_INDEXED_LENGTH and roster_size > SEARCH_SCAN_MAX_STUDENTS:
+        # 整个查询作为一个短语，双引号转义后不会被解析为 FTS5 语法
+        params["match"] = '"' + query.replace('"', '""') + '"'
+        return _INDEXED, params
+    return _SCAN, params
+
+
+def search_page(rows, limit: int, offset: int):
+    """把 search_statement 的结果转换为分页响应"""
+    next_offset = offset + limit if len(rows) > limit else None
+    return {"items": [row._asdict() for row in rows[:limit]], "next_offset": next_offset}
+
+
+def search_students(db, owner_id: int, query: str, limit: int = 20, offset: int = 0) -> dict:
+    """在教师的全部学生中搜索，返回分页响应"""
+    roster_size = 0
+    if len(query.strip()) >= MIN_INDEXED_LENGTH:
+        # 覆盖索引上的计数，约为扫描该教师学生代价的几十分之一
+        roster_size = db.execute(_ROSTER_SIZE, {"owner_id": owner_id}).scalar()
+    statement, params = search_statement(owner_id, query, limit, offset, roster_size)
+    return search_page(db.execute(statement, params).all(), limit, offset)
+
+
+def rebuild(engine):
+    """按 students 表重建全文索引并合并索引段"""
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO student_search (student_search) VALUES ('rebuild')")
+        conn.exec_driver_sql("INSERT INTO student_search (student_search) VALUES ('optimize')")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from database import engine
+    from migrate import check_schema
+    check_schema(engine)
+    rebuild(engine)
+    print("学生搜索索引已重建")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""多进程共享的计数器
+
+多个 uvicorn worker 各自有独立内存，认证缓存、花名册 ETag 版本、抽样器缓存和登录限流计数
+必须放在所有 worker 都能访问的地方才能保持一致。这里只提供两种操作：
+
+- 版本号：get / incr，数据变更时递增，各进程据此判断本地缓存是否过期
+- 固定窗口计数：hit，窗口结束后自动归零，用于限流
+
+后端由 SHARED_STATE_URL 选择：
+- memory://（默认）只在本进程内有效，适合单 worker
+- sqlite:///path/to/file.db 使用单独的 SQLite 文件（WAL），同一主机上的多个 worker 共享；
+  放在 /dev/shm 等内存文件系统上即为共享内存
+- redis://host:6379/0 多台主机共享（需要安装 redis 包）
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "memory://")
+# worker 进程数，uvicorn --workers 的默认值也取自该变量
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+class MemoryStore:
+    """进程内计数器"""
+    shared = False
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex
+        self._values = {}
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> int:
+        return self._values.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._values.get(key, 0) + 1
+            self._values[key] = value
+            return value
+
+    def hit(self, key: str, window: float) -> Tuple[int, float]:
+        """计数加一，返回 (本窗口内的次数, 距窗口结束的秒数)"""
+        now = time.monotonic()
+        with self._lock:
+            count, resets_at = self._windows.get(key, (0, 0.0))
+            if resets_at <= now:
+                count, resets_at = 0, now + window
+                if random.random() < 0.01:
+                    self._windows = {k: v for k, v in self._windows.items() if v[1] > now}
+            self._windows[key] = (count + 1, resets_at)
+            return count + 1, resets_at - now
+
+
+class SQLiteStore:
+    """单独 SQLite 文件中的计数器表，每个线程一个连接，自动提交"""
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS shared_counters (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL,
+                expires_at REAL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("INSERT OR IGNORE INTO shared_counters (key, value) VALUES ('epoch', ?)",
+                     (random.getrandbits(62),))
+        # 文件中的版本号可能跨越重启保留，ETag 以文件创建时的随机值作为前缀
+        self.epoch = format(self.get("epoch"), "x")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> int:
+        row = self._conn().execute("SELECT value FROM shared_counters WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key: str) -> int:
+        return self._conn().execute("""
+            INSERT INTO shared_counters (key, value) VALUES (?, 1)
+            ON CONFLICT (key) DO UPDATE SET value = value + 1
+            RETURNING value
+        """, (key,)).fetchone()[0]
+
+    def hit(self, key: str, window: float) -> Tuple[int, float]:
+        now = time.time()
+        conn = self._conn()
+        count, expires_at = conn.execute("""
+            INSERT INTO shared_counters (key, value, expires_at) VALUES (:key, 1, :expires_at)
+            ON CONFLICT (key) DO UPDATE SET
+                value = CASE WHEN expires_at <= :now THEN 1 ELSE value + 1 END,
+                expires_at = CASE WHEN expires_at <= :now THEN excluded.expires_at ELSE expires_at END
+            RETURNING value, expires_at
+        """, {"key": key, "expires_at": now + window, "now": now}).fetchone()
+        if count == 1 and random.random() < 0.01:
+            # 偶尔顺带清理过期的窗口，防止表无限增长
+            conn.execute("DELETE FROM shared_counters WHERE expires_at <= ?", (now,))
+        return count, expires_at - now
+
+
+class RedisStore:
+    """Redis 计数器，键统一加 rolling: 前缀"""
+    shared = True
+    prefix = "rolling:"
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SHARED_STATE_URL 使用 Redis 时需要安装 redis 包")
+        self._redis = redis.from_url(url)
+        self._redis.set(f"{self.prefix}epoch", uuid.uuid4().hex, nx=True)
+        self.epoch = self._redis.get(f"{self.prefix}epoch").decode()
+
+    def get(self, key: str) -> int:
+        value = self._redis.get(f"{self.prefix}{key}")
+        return int(value) if value is not None else 0
+
+    def incr(self, key: str) -> int:
+        return self._redis.incr(f"{self.prefix}{key}")
+
+    def hit(self, key: str, window: float) -> Tuple[int, float]:
+        key = f"{self.prefix}{key}"
+        pipe = self._redis.pipeline()
+        pipe.set(key, 0, px=int(window * 1000), nx=True)
+        pipe.incr(key)
+        pipe.pttl(key)
+        _, count, remaining_ms = pipe.execute()
+        return count, max(remaining_ms, 0) / 1000
+
+
+def create_store(url: str):
+    if url.startswith("memory://"):
+        return MemoryStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://")):
+        return RedisStore(url)
+    raise RuntimeError(f"不支持的 SHARED_STATE_URL: {url}")
+
+
+async def store_call(store, method: str, *args):
+    """在 async 函数中调用计数器；SQLite / Redis 后端是阻塞 IO，放到线程池中执行"""
+    if not store.shared:
+        return getattr(store, method)(*args)
+    return await run_in_threadpool(getattr(store, method), *args)
+
+
+shared_state = create_store(SHARED_STATE_URL)
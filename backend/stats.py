@@ -0,0 +1,135 @@
+"""点名统计
+
+student_call_stats / daily_call_stats 两张汇总表由 SQLite 触发器在 roll_call_records
+插入和删除时增量维护，统计接口只读汇总表，不扫描完整历史。
+
+汇总表同时包含已归档的记录（见 archive.py）：归档批次执行期间 archive_in_progress 表中有一行，
+删除触发器据此跳过扣减；删除归档记录时由 roll_call_archive 上的触发器扣减。
+
+回填或修改 STATS_UTC_OFFSET_HOURS 后重建：
+    python stats.py rebuild
+"""
+import argparse
+import os
+
+from sqlalchemy import text
+
+# 按天统计时使用的时区偏移（小时），默认北京时间
+STATS_UTC_OFFSET_HOURS = int(os.getenv("STATS_UTC_OFFSET_HOURS", "8"))
+
+STAT_TRIGGER_NAMES = ("trg_roll_call_stats_insert", "trg_roll_call_stats_delete", "trg_roll_call_archive_stats_delete")
+
+
+def _trigger_statements():
+    day = f"date({{row}}.called_at, '{STATS_UTC_OFFSET_HOURS:+d} hours')"
+    # 删除一条在线或归档记录时的扣减，最近点名时间取在线记录和归档汇总中的最大值
+    decrement = f"""
+            UPDATE student_call_stats SET
+                call_count = call_count - 1,
+                last_called_at = (
+                    SELECT max(called_at) FROM (
+                        SELECT max(called_at) AS called_at FROM roll_call_records WHERE student_id = OLD.student_id
+                        UNION ALL
+                        SELECT last_called_at FROM archived_student_stats WHERE student_id = OLD.student_id
+                    )
+                )
+            WHERE student_id = OLD.student_id;
+            DELETE FROM student_call_stats WHERE student_id = OLD.student_id AND call_count <= 0;
+            UPDATE daily_call_stats SET call_count = call_count - 1
+            WHERE class_id = OLD.class_id AND group_id = OLD.group_id AND day = {day.format(row="OLD")};
+            DELETE FROM daily_call_stats
+            WHERE class_id = OLD.class_id AND group_id = OLD.group_id AND day = {day.format(row="OLD")}
+                AND call_count <= 0;"""
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_roll_call_stats_insert
+        AFTER INSERT ON roll_call_records
+        BEGIN
+            INSERT INTO student_call_stats (student_id, call_count, last_called_at)
+            VALUES (NEW.student_id, 1, NEW.called_at)
+            ON CONFLICT (student_id) DO UPDATE SET
+                call_count = call_count + 1,
+                last_called_at = max(coalesce(last_called_at, excluded.last_called_at), excluded.last_called_at);
+            INSERT INTO daily_call_stats (class_id, group_id, day, call_count)
+            VALUES (NEW.class_id, NEW.group_id, {day.format(row="NEW")}, 1)
+            ON CONFLICT (class_id, group_id, day) DO UPDATE SET call_count = call_count + 1;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_roll_call_stats_delete
+        AFTER DELETE ON roll_call_records
+        WHEN NOT EXISTS (SELECT 1 FROM archive_in_progress)
+        BEGIN
+            {decrement}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_roll_call_archive_stats_delete
+        AFTER DELETE ON roll_call_archive
+        BEGIN
+            UPDATE archived_student_stats SET
+                call_count = call_count - 1,
+                last_called_at = (
+                    SELECT max(called_at) FROM roll_call_archive WHERE student_id = OLD.student_id
+                )
+            WHERE student_id = OLD.student_id;
+            DELETE FROM archived_student_stats WHERE student_id = OLD.student_id AND call_count <= 0;
+            {decrement}
+        END
+        """,
+    ]
+
+
+def rebuild(engine):
+    """从完整历史（含归档）重建汇总表，并按当前配置重建触发器"""
+    with engine.begin() as conn:
+        rebuild_on(conn)
+
+
+def rebuild_on(conn):
+    """在调用方的事务中重建汇总表和触发器（迁移时使用）"""
+    offset = f"{STATS_UTC_OFFSET_HOURS:+d} hours"
+    for name in STAT_TRIGGER_NAMES:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    conn.exec_driver_sql("DELETE FROM student_call_stats")
+    conn.exec_driver_sql("DELETE FROM daily_call_stats")
+    conn.exec_driver_sql("DELETE FROM archived_student_stats")
+    conn.exec_driver_sql("""
+        INSERT INTO archived_student_stats (student_id, call_count, last_called_at)
+        SELECT student_id, count(*), max(called_at) FROM roll_call_archive GROUP BY student_id
+    """)
+    conn.exec_driver_sql("""
+        INSERT INTO student_call_stats (student_id, call_count, last_called_at)
+        SELECT student_id, sum(call_count), max(last_called_at) FROM (
+            SELECT student_id, count(*) AS call_count, max(called_at) AS last_called_at
+            FROM roll_call_records GROUP BY student_id
+            UNION ALL
+            SELECT student_id, call_count, last_called_at FROM archived_student_stats
+        ) GROUP BY student_id
+    """)
+    conn.execute(text("""
+        INSERT INTO daily_call_stats (class_id, group_id, day, call_count)
+        SELECT class_id, group_id, date(called_at, :offset), count(*) FROM (
+            SELECT class_id, group_id, called_at FROM roll_call_records
+            UNION ALL
+            SELECT class_id, group_id, called_at FROM roll_call_archive
+        ) GROUP BY class_id, group_id, date(called_at, :offset)
+    """), {"offset": offset})
+    for statement in _trigger_statements():
+        conn.exec_driver_sql(statement)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from database import engine
+    from migrate import check_schema
+    check_schema(engine)
+    rebuild(engine)
+    print("统计汇总表已重建")
+
+
+if __name__ == "__main__":
+    main()
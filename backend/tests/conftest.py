@@ -0,0 +1,88 @@
+"""测试公共夹具：临时数据库、测试客户端和教师账号
+
+数据库配置在导入应用模块时读取，因此必须在导入前设置环境变量。
+"""
+import itertools
+import os
+import tempfile
+from contextlib import contextmanager
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DB_FILE"] = os.path.join(_tmp.name, "test.db")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+import migrate
+from auth import create_access_token
+from database import SessionLocal, engine
+from models import Class, Group, Student, User
+
+_usernames = itertools.count(1)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    migrate.upgrade(engine, log=lambda message: None)
+    migrate.ensure_admin(engine, log=lambda message: None)
+    yield engine
+    engine.dispose()
+    _tmp.cleanup()
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def teacher():
+    """新建一个教师，返回 (用户 ID, 请求头)"""
+    return make_teacher()
+
+
+def make_teacher():
+    username = f"teacher_{next(_usernames)}"
+    with SessionLocal() as db:
+        user = User(username=username, email=f"{username}@example.com", hashed_password="x", user_type="teacher")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    return user_id, {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+def create_class(owner_id: int, groups: int, students: int):
+    """为教师生成一个班级，返回 (班级 ID, 分组 ID 列表, 学生 ID 列表)"""
+    with SessionLocal() as db:
+        cls = Class(name="测试班级", owner_id=owner_id)
+        for g in range(groups):
+            group = Group(name=f"第{g + 1}组", owner_id=owner_id)
+            group.students = [
+                Student(student_id=f"{g:02d}{s:03d}", name=f"学生{g}-{s}", owner_id=owner_id)
+                for s in range(students)
+            ]
+            cls.groups.append(group)
+        db.add(cls)
+        db.commit()
+        # 直接写库时与接口一样使树形接口的缓存失效
+        main.roster_changed(owner_id, cls.id)
+        return cls.id, [group.id for group in cls.groups], [s.id for group in cls.groups for s in group.students]
+
+
+@contextmanager
+def count_queries():
+    """统计代码块内执行的 SQL 语句数"""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
@@ -0,0 +1,120 @@
+"""删除班级、分组、学生时不留下孤立行，删除的 SQL 语句数不随数据量增长"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+import archive
+from database import SessionLocal, engine
+from models import (
+    Group, Student, RollCallRecord, RollCallArchive, StudentCallStat, ArchivedStudentStat, DailyCallStat,
+    Rotation, RotationEntry,
+)
+from tests.conftest import count_queries, create_class
+
+# 早于其他测试写入的全部记录，归档时只会移走本文件写入的旧记录
+ARCHIVED_AT = datetime(2000, 1, 1)
+ARCHIVE_CUTOFF = datetime(2001, 1, 1)
+# 删除语句数的上限：认证、所有权校验和固定条数的 DELETE
+MAX_DELETE_STATEMENTS = 16
+
+
+def populate(client, headers, owner_id: int, groups: int, students: int):
+    """生成带在线记录、归档记录、统计汇总和轮换状态的班级"""
+    class_id, group_ids, student_ids = create_class(owner_id, groups=groups, students=students)
+    with SessionLocal() as db:
+        group_of = dict(db.execute(select(Student.id, Student.group_id).where(Student.id.in_(student_ids))).all())
+        now = datetime.utcnow()
+        db.add_all(
+            RollCallRecord(student_id=student_id, group_id=group_of[student_id], class_id=class_id, called_at=called_at)
+            for student_id in student_ids
+            for called_at in (ARCHIVED_AT + timedelta(minutes=student_id), now)
+        )
+        db.commit()
+    archive.run(engine, ARCHIVE_CUTOFF, pause=0, log=lambda message: None)
+    for selection in ([], group_ids[:1]):
+        response = client.post("/roll-call/draw", headers=headers,
+                               json={"classId": class_id, "groupIds": selection, "mode": "rotation"})
+        assert response.status_code == 200, response.text
+    return class_id, group_ids, student_ids
+
+
+def remaining(student_ids=(), group_ids=(), class_ids=()):
+    """按表统计仍引用这些学生、分组、班级的行数"""
+    counts = {
+        "students": select(Student.id).where(Student.id.in_(student_ids)),
+        "groups": select(Group.id).where(Group.id.in_(group_ids)),
+        "roll_call_records": select(RollCallRecord.id).where(
+            RollCallRecord.student_id.in_(student_ids) | RollCallRecord.group_id.in_(group_ids)
+            | RollCallRecord.class_id.in_(class_ids)),
+        "roll_call_archive": select(RollCallArchive.id).where(
+            RollCallArchive.student_id.in_(student_ids) | RollCallArchive.group_id.in_(group_ids)
+            | RollCallArchive.class_id.in_(class_ids)),
+        "student_call_stats": select(StudentCallStat.student_id).where(StudentCallStat.student_id.in_(student_ids)),
+        "archived_student_stats": select(ArchivedStudentStat.student_id).where(
+            ArchivedStudentStat.student_id.in_(student_ids)),
+        "daily_call_stats": select(DailyCallStat.class_id).where(
+            DailyCallStat.group_id.in_(group_ids) | DailyCallStat.class_id.in_(class_ids)),
+        "rotation_entries": select(RotationEntry.student_id).where(RotationEntry.student_id.in_(student_ids)),
+        "rotations": select(Rotation.id).where(Rotation.class_id.in_(class_ids)),
+    }
+    with SessionLocal() as db:
+        return {table: db.scalar(select(func.count()).select_from(stmt.subquery())) for table, stmt in counts.items()}
+
+
+def delete_queries(client, url, headers) -> int:
+    with count_queries() as statements:
+        response = client.delete(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_populated_rows_exist(client, teacher):
+    owner_id, headers = teacher
+    class_id, group_ids, student_ids = populate(client, headers, owner_id, groups=2, students=3)
+    counts = remaining(student_ids, group_ids, [class_id])
+    # 否则下面的测试即使没有删除也会通过
+    assert all(counts.values()), counts
+
+
+def test_delete_student(client, teacher):
+    owner_id, headers = teacher
+    class_id, group_ids, student_ids = populate(client, headers, owner_id, groups=2, students=3)
+    deleted, kept = student_ids[0], student_ids[1:]
+
+    assert client.delete(f"/students/{deleted}", headers=headers).status_code == 200
+    assert not any(remaining(student_ids=[deleted]).values())
+    assert all(remaining(kept, group_ids, [class_id]).values())
+
+
+def test_delete_group(client, teacher):
+    owner_id, headers = teacher
+    class_id, group_ids, student_ids = populate(client, headers, owner_id, groups=2, students=3)
+    with SessionLocal() as db:
+        members = db.scalars(select(Student.id).where(Student.group_id == group_ids[0])).all()
+
+    assert client.delete(f"/groups/{group_ids[0]}", headers=headers).status_code == 200
+    assert not any(remaining(student_ids=members, group_ids=group_ids[:1]).values())
+    others = [student_id for student_id in student_ids if student_id not in members]
+    assert all(remaining(others, group_ids[1:], [class_id]).values())
+
+
+def test_delete_class(client, teacher):
+    owner_id, headers = teacher
+    class_id, group_ids, student_ids = populate(client, headers, owner_id, groups=2, students=3)
+
+    assert client.delete(f"/classes/{class_id}", headers=headers).status_code == 200
+    assert not any(remaining(student_ids, group_ids, [class_id]).values())
+
+
+@pytest.mark.parametrize("kind", ["students", "groups", "classes"])
+def test_delete_query_count(client, teacher, kind):
+    owner_id, headers = teacher
+    client.get("/auth/me", headers=headers)
+    counts = []
+    for groups, students in ((1, 2), (6, 20)):
+        class_id, group_ids, student_ids = populate(client, headers, owner_id, groups=groups, students=students)
+        target = {"students": student_ids[0], "groups": group_ids[0], "classes": class_id}[kind]
+        counts.append(delete_queries(client, f"/{kind}/{target}", headers))
+    assert counts[0] == counts[1]
+    assert counts[1] <= MAX_DELETE_STATEMENTS
@@ -0,0 +1,31 @@
+"""响应压缩保留已有的 Vary 头"""
+from compression import _compressed_headers, _with_vary
+from tests.conftest import create_class
+
+
+def test_vary_merged_with_existing_value():
+    headers = [(b"content-type", b"application/json"), (b"vary", b"Origin"), (b"content-length", b"10")]
+    compressed = dict(_compressed_headers(headers, "gzip", 5))
+    assert compressed[b"vary"] == b"Origin, Accept-Encoding"
+    assert compressed[b"content-length"] == b"5"
+    assert compressed[b"content-encoding"] == b"gzip"
+
+
+def test_vary_deduplicated():
+    headers = [(b"vary", b"origin, accept-encoding"), (b"vary", b"Cookie")]
+    assert [v for n, v in _with_vary(headers) if n == b"vary"] == [b"origin, accept-encoding, Cookie"]
+    assert _with_vary([(b"vary", b"*")]) == [(b"vary", b"*")]
+
+
+def test_cors_vary_kept_on_responses(client, teacher):
+    owner_id, headers = teacher
+    headers = {**headers, "Origin": "http://localhost:3000", "Accept-Encoding": "gzip"}
+    # 空列表不压缩，建班后的花名册超过压缩阈值
+    for compressed in (False, True):
+        if compressed:
+            create_class(owner_id, groups=2, students=20)
+        response = client.get("/classes", headers=headers)
+        assert response.status_code == 200
+        assert ("content-encoding" in response.headers) == compressed
+        vary = [item.strip().lower() for item in response.headers["vary"].split(",")]
+        assert "origin" in vary and "accept-encoding" in vary
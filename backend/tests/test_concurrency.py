@@ -0,0 +1,55 @@
+"""多个线程同时写入点名记录时不出现 database is locked"""
+import threading
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+
+import main
+from database import SessionLocal, engine
+from models import RollCallRecord, User
+from projection import Projection
+from schemas import RollCallRecordCreate
+from tests.conftest import create_class
+
+WRITERS = 16
+RECORDS_PER_WRITER = 25
+
+
+def test_wal_profile():
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+
+
+def test_concurrent_roll_call_writers(teacher):
+    owner_id, _ = teacher
+    class_id, _, student_ids = create_class(owner_id, groups=4, students=10)
+    errors = []
+    barrier = threading.Barrier(WRITERS)
+
+    def writer(index: int):
+        try:
+            barrier.wait()
+            for i in range(RECORDS_PER_WRITER):
+                # 每个请求一个会话，与 get_db 相同
+                with SessionLocal() as db:
+                    user = db.get(User, owner_id)
+                    record = RollCallRecordCreate(
+                        student_id=student_ids[(index * RECORDS_PER_WRITER + i) % len(student_ids)],
+                        class_id=class_id,
+                    )
+                    main.create_roll_call_record(record, projection=Projection(), current_user=user, db=db)
+        except Exception as exc:  # 记录后由主线程断言
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer, args=(index,)) for index in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not [exc for exc in errors if isinstance(exc, OperationalError)]
+    assert not errors
+    with SessionLocal() as db:
+        count = db.scalar(select(func.count()).select_from(RollCallRecord).where(RollCallRecord.class_id == class_id))
+    assert count == WRITERS * RECORDS_PER_WRITER
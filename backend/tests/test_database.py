@@ -0,0 +1,18 @@
+"""异步引擎与同步引擎使用同一个数据库文件"""
+import os
+
+import pytest
+
+import database
+
+
+def test_async_url_derived_from_db_file():
+    assert database.ASYNC_DATABASE_URL.drivername == "sqlite+aiosqlite"
+    assert os.path.abspath(database.ASYNC_DATABASE_URL.database) == os.path.abspath(database.DB_FILE)
+
+
+def test_mismatched_async_url_rejected():
+    database._check_async_url(f"sqlite+aiosqlite:///{database.DB_FILE}")
+    for url in ("sqlite+aiosqlite:///other.db", "postgresql+asyncpg://db/rollcall"):
+        with pytest.raises(RuntimeError):
+            database._check_async_url(url)
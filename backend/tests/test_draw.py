@@ -0,0 +1,56 @@
+"""随机点名：不重复的排除范围"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from database import SessionLocal, engine
+from models import RollCallRecord
+from queries import called_since_statement
+from tests.conftest import count_queries, create_class
+
+
+def draw(client, headers, body):
+    return client.post("/roll-call/draw?expand=student", headers=headers, json=body)
+
+
+def test_no_repeat_without_since_never_runs_out(client, teacher):
+    owner_id, headers = teacher
+    class_id, _, student_ids = create_class(owner_id, groups=1, students=3)
+    drawn = []
+    for _ in range(9):
+        response = draw(client, headers, {"classId": class_id})
+        assert response.status_code == 200, response.text
+        drawn.append(response.json()["studentId"])
+    # 每三次为一轮，每轮每人一次
+    for start in range(0, 9, 3):
+        assert sorted(drawn[start:start + 3]) == sorted(student_ids)
+
+
+def test_no_repeat_since_window(client, teacher):
+    owner_id, headers = teacher
+    class_id, group_ids, student_ids = create_class(owner_id, groups=1, students=3)
+    # 窗口之前的大量历史不影响排除范围，也不增加查询数
+    with SessionLocal() as db:
+        long_ago = datetime.utcnow() - timedelta(days=30)
+        db.add_all(RollCallRecord(student_id=student_ids[i % 3], group_id=group_ids[0], class_id=class_id,
+                                  called_at=long_ago + timedelta(minutes=i)) for i in range(300))
+        db.commit()
+    body = {"classId": class_id, "since": datetime.utcnow().isoformat()}
+    drawn = []
+    for _ in range(3):
+        with count_queries() as statements:
+            response = draw(client, headers, body)
+        assert response.status_code == 200, response.text
+        drawn.append(response.json()["studentId"])
+    assert sorted(drawn) == sorted(student_ids)
+    assert draw(client, headers, body).status_code == 400
+    assert draw(client, headers, {**body, "allowRepeat": True}).status_code == 200
+    assert sum("roll_call_records" in statement and "DISTINCT" in statement for statement in statements) == 1
+
+
+def test_called_since_uses_class_time_index():
+    statement = called_since_statement(1, datetime(2024, 1, 1))
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        plan = " ".join(row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert "ix_roll_call_records_class_called_at" in plan
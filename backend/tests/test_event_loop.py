@@ -0,0 +1,52 @@
+"""async 接口中的数据库访问不在事件循环线程中执行"""
+import asyncio
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from database import engine
+
+
+@contextmanager
+def statements_on_event_loop():
+    """记录在事件循环线程中执行的 SQL 语句"""
+    blocking = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        blocking.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        yield blocking
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+
+def test_user_endpoints_keep_database_off_the_loop(client):
+    with statements_on_event_loop() as blocking:
+        response = client.post("/auth/login", json={"username": "admin", "password": "123456"})
+        assert response.status_code == 200, response.text
+        admin = {"Authorization": f"Bearer {response.json()['accessToken']}"}
+        assert client.get("/auth/me", headers=admin).status_code == 200
+
+        response = client.post("/users", headers=admin, json={
+            "username": "loop_teacher", "email": "loop_teacher@example.com", "password": "pw123456",
+        })
+        assert response.status_code == 200, response.text
+        user_id = response.json()["id"]
+        response = client.put(f"/users/{user_id}", headers=admin, json={"email": "loop2@example.com", "password": "pw654321"})
+        assert response.status_code == 200, response.text
+        assert client.put(f"/users/{user_id}/reset-password", headers=admin,
+                          json={"new_password": "pw111111"}).status_code == 200
+
+        response = client.post("/auth/login", json={"username": "loop_teacher", "password": "pw111111"})
+        teacher = {"Authorization": f"Bearer {response.json()['accessToken']}"}
+        assert client.put("/auth/profile", headers=teacher, json={"email": "loop3@example.com"}).status_code == 200
+        assert client.put("/auth/change-password", headers=teacher,
+                          json={"old_password": "pw111111", "new_password": "pw222222"}).status_code == 200
+        assert client.put("/auth/profile", headers=teacher, json={"email": "admin@example.com"}).status_code == 400
+    assert blocking == []
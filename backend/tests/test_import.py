@@ -0,0 +1,46 @@
+"""批量导入学生"""
+from database import SessionLocal
+from models import Group, Student
+from tests.conftest import create_class
+
+
+def upload(client, url, headers, text: str):
+    return client.post(url, headers=headers, files={"file": ("students.csv", text.encode(), "text/csv")})
+
+
+def test_reimport_without_weight_keeps_weights(client, teacher):
+    owner_id, headers = teacher
+    _, (group_id,), _ = create_class(owner_id, groups=1, students=0)
+    url = f"/groups/{group_id}/students/import"
+    response = upload(client, url, headers, "学号,姓名,权重\n001,张三,2\n002,李四,0.5\n")
+    assert response.json() == {"created": 2, "updated": 0, "errors": []}
+
+    response = upload(client, url, headers, "学号,姓名\n001,张三丰\n002,李四\n003,王五\n")
+    assert response.json() == {"created": 1, "updated": 2, "errors": []}
+    students = {s["studentId"]: s for s in client.get(f"/groups/{group_id}/students", headers=headers).json()}
+    assert {k: (s["name"], s["weight"]) for k, s in students.items()} == {
+        "001": ("张三丰", 2.0), "002": ("李四", 0.5), "003": ("王五", 1.0),
+    }
+
+
+def test_class_import_skips_groups_of_invalid_rows(client, teacher):
+    owner_id, headers = teacher
+    class_id, _, _ = create_class(owner_id, groups=0, students=0)
+    response = upload(client, f"/classes/{class_id}/students/import", headers,
+                      "分组,学号,姓名,权重\n第一组,001,张三,1\n空组,002,,1\n坏权重,003,王五,abc\n")
+    result = response.json()
+    assert result["created"] == 1
+    assert [error["row"] for error in result["errors"]] == [3, 4]
+    with SessionLocal() as db:
+        assert [name for (name,) in db.query(Group.name).filter(Group.class_id == class_id)] == ["第一组"]
+
+
+def test_malformed_csv_is_rejected(client, teacher):
+    owner_id, headers = teacher
+    _, (group_id,), _ = create_class(owner_id, groups=1, students=0)
+    response = upload(client, f"/groups/{group_id}/students/import", headers,
+                      "学号,姓名\n001,张三\n002," + "x" * 200000 + "\n")
+    assert response.status_code == 400
+    assert "CSV" in response.json()["detail"]
+    with SessionLocal() as db:
+        assert db.query(Student).filter(Student.group_id == group_id).count() == 0
@@ -0,0 +1,74 @@
+"""迁移：新建数据库与从旧版本升级的结果一致，且与 stats.py 当前的触发器一致"""
+import re
+
+import pytest
+from sqlalchemy import create_engine
+
+import migrate
+import stats
+
+
+def triggers(engine) -> dict:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").all()
+    return {name: re.sub(r"\s+", " ", sql).strip() for name, sql in rows}
+
+
+def stat_totals(engine):
+    with engine.connect() as conn:
+        return (
+            conn.exec_driver_sql("SELECT count(*) FROM roll_call_records").scalar(),
+            conn.exec_driver_sql("SELECT sum(call_count) FROM student_call_stats").scalar(),
+            conn.exec_driver_sql("SELECT sum(call_count) FROM daily_call_stats").scalar(),
+        )
+
+
+@pytest.fixture
+def new_engine(tmp_path):
+    engines = []
+
+    def factory(name):
+        engine = create_engine(f"sqlite:///{tmp_path / name}")
+        engines.append(engine)
+        return engine
+
+    yield factory
+    for engine in engines:
+        engine.dispose()
+
+
+def test_upgrade_from_every_version_matches_fresh(new_engine, monkeypatch):
+    fresh = new_engine("fresh.db")
+    migrate.upgrade(fresh, log=lambda message: None)
+    expected = triggers(fresh)
+    all_migrations = migrate.MIGRATIONS
+
+    for stop in range(1, migrate.LATEST_VERSION):
+        engine = new_engine(f"from_{stop}.db")
+        monkeypatch.setattr(migrate, "MIGRATIONS", all_migrations[:stop])
+        migrate.upgrade(engine, log=lambda message: None)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'u', 'u@x', 'x')")
+            conn.exec_driver_sql("INSERT INTO classes (id, name, owner_id) VALUES (1, 'c', 1)")
+            conn.exec_driver_sql("INSERT INTO groups (id, name, class_id) VALUES (1, 'g', 1)")
+            conn.exec_driver_sql("INSERT INTO students (id, student_id, name, group_id) VALUES (1, '001', 's', 1)")
+            for day in range(1, 6):
+                conn.exec_driver_sql(
+                    "INSERT INTO roll_call_records (student_id, group_id, class_id, called_at) "
+                    f"VALUES (1, 1, 1, '2024-03-0{day} 20:00:00')"
+                )
+        monkeypatch.setattr(migrate, "MIGRATIONS", all_migrations)
+        migrate.upgrade(engine, log=lambda message: None)
+        assert triggers(engine) == expected, f"从版本 {stop} 升级"
+        assert stat_totals(engine) == (5, 5, 5), f"从版本 {stop} 升级"
+
+
+def test_migrated_stat_triggers_match_stats_module(new_engine):
+    """修改 stats.py 中的触发器时必须追加迁移"""
+    engine = new_engine("stats.db")
+    migrate.upgrade(engine, log=lambda message: None)
+    migrated = triggers(engine)
+    stats.rebuild(engine)
+    rebuilt = triggers(engine)
+    for name in stats.STAT_TRIGGER_NAMES:
+        assert migrated[name] == rebuilt[name], name
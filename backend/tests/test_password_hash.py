@@ -0,0 +1,31 @@
+"""事件循环中的密码哈希不等待排队空位"""
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import auth
+
+
+def test_async_hash_fails_fast_when_queue_full(monkeypatch):
+    monkeypatch.setattr(auth, "_hash_slots", auth.threading.BoundedSemaphore(1))
+    auth._hash_slots.acquire()
+    started = time.perf_counter()
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(auth.get_password_hash_async("secret"))
+    assert exc_info.value.status_code == 503
+    assert time.perf_counter() - started < auth.PASSWORD_HASH_QUEUE_TIMEOUT
+
+
+def test_login_and_create_user(client):
+    response = client.post("/auth/login", json={"username": "admin", "password": "123456"})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['accessToken']}"}
+    response = client.post("/users", headers=headers, json={
+        "username": "hash_teacher", "email": "hash_teacher@example.com", "password": "pw123456",
+    })
+    assert response.status_code == 200, response.text
+    response = client.post("/auth/login", json={"username": "hash_teacher", "password": "pw123456"})
+    assert response.status_code == 200
+    assert client.post("/auth/login", json={"username": "hash_teacher", "password": "wrong"}).status_code == 401
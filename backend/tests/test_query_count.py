@@ -0,0 +1,61 @@
+"""列表接口的 SQL 语句数不随数据量增长（无 N+1 查询）"""
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from models import RollCallRecord
+from tests.conftest import count_queries, create_class
+
+
+def request_queries(client, url, headers) -> int:
+    with count_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_group_students_query_count(client, teacher):
+    owner_id, headers = teacher
+    _, (small,), _ = create_class(owner_id, groups=1, students=5)
+    _, (large,), _ = create_class(owner_id, groups=1, students=50)
+    client.get("/auth/me", headers=headers)
+
+    small_count = request_queries(client, f"/groups/{small}/students", headers)
+    large_count = request_queries(client, f"/groups/{large}/students", headers)
+    assert len(client.get(f"/groups/{large}/students", headers=headers).json()) == 50
+    assert small_count == large_count
+
+
+def test_class_tree_query_count(client, teacher):
+    owner_id, headers = teacher
+    small_class, _, _ = create_class(owner_id, groups=1, students=5)
+    client.get("/auth/me", headers=headers)
+    small_count = request_queries(client, "/classes", headers)
+    small_groups = request_queries(client, f"/classes/{small_class}/groups", headers)
+
+    large_class, _, _ = create_class(owner_id, groups=10, students=50)
+    large_count = request_queries(client, "/classes", headers)
+    large_groups = request_queries(client, f"/classes/{large_class}/groups", headers)
+    assert small_count == large_count
+    assert small_groups == large_groups
+
+
+def test_history_query_count(client, teacher):
+    owner_id, headers = teacher
+    class_id, group_ids, student_ids = create_class(owner_id, groups=5, students=10)
+    client.get("/auth/me", headers=headers)
+    started = datetime.utcnow() - timedelta(days=1)
+
+    def add_records(count):
+        with SessionLocal() as db:
+            db.add_all(
+                RollCallRecord(student_id=student_ids[i % len(student_ids)], group_id=group_ids[i % len(group_ids)],
+                               class_id=class_id, called_at=started + timedelta(seconds=i))
+                for i in range(count)
+            )
+            db.commit()
+
+    add_records(5)
+    small_count = request_queries(client, "/roll-call/history?limit=200", headers)
+    add_records(195)
+    large_count = request_queries(client, "/roll-call/history?limit=200", headers)
+    assert small_count == large_count
@@ -0,0 +1,33 @@
+"""抽样器缓存有上限，删除班级后不再保留其抽样器"""
+import main
+from database import SessionLocal
+from sampler import SamplerCache
+from tests.conftest import create_class
+
+
+def test_cache_evicts_least_recently_used(teacher):
+    owner_id, _ = teacher
+    class_ids = [create_class(owner_id, groups=1, students=2)[0] for _ in range(4)]
+    cache = SamplerCache(maxsize=2)
+    with SessionLocal() as db:
+        first = cache.get(db, class_ids[0])
+        cache.get(db, class_ids[1])
+        # 再次取用后第一个班级成为最近使用的，淘汰第二个
+        assert cache.get(db, class_ids[0]) is first
+        cache.get(db, class_ids[2])
+        cache.get(db, class_ids[3])
+    assert len(cache._samplers) == 2
+    assert {key[0] for key in cache._samplers} == {class_ids[2], class_ids[3]}
+
+
+def test_deleted_class_is_dropped(client, teacher):
+    owner_id, headers = teacher
+    class_id, group_ids, _ = create_class(owner_id, groups=2, students=2)
+    cache = main.sampler_cache
+    with SessionLocal() as db:
+        cache.get(db, class_id)
+        cache.get(db, class_id, group_ids[:1])
+    assert any(key[0] == class_id for key in cache._samplers)
+
+    assert client.delete(f"/classes/{class_id}", headers=headers).status_code == 200
+    assert not any(key[0] == class_id for key in cache._samplers)
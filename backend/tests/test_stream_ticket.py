@@ -0,0 +1,39 @@
+"""实时推送的一次性票据"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from auth import get_current_active_user_sse
+from database import SessionLocal
+from tests.conftest import create_class, make_teacher
+
+
+def authenticate(class_id: int, ticket: str):
+    with SessionLocal() as db:
+        return asyncio.run(get_current_active_user_sse(class_id, ticket, None, db)).id
+
+
+def test_ticket_is_single_use_and_scoped(client, teacher):
+    owner_id, headers = teacher
+    class_id, _, _ = create_class(owner_id, groups=1, students=1)
+    other_class, _, _ = create_class(owner_id, groups=1, students=1)
+    ticket = client.post(f"/classes/{class_id}/events/ticket", headers=headers).json()["ticket"]
+
+    # 不能当作访问令牌，也不能订阅其他班级
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
+    with pytest.raises(HTTPException):
+        authenticate(other_class, ticket)
+
+    assert authenticate(class_id, ticket) == owner_id
+    with pytest.raises(HTTPException) as exc_info:
+        authenticate(class_id, ticket)
+    assert exc_info.value.status_code == 401
+
+
+def test_ticket_requires_class_owner(client, teacher):
+    owner_id, _ = teacher
+    class_id, _, _ = create_class(owner_id, groups=1, students=1)
+    _, intruder = make_teacher()
+    assert client.post(f"/classes/{class_id}/events/ticket", headers=intruder).status_code == 404
+    assert client.get(f"/classes/{class_id}/events", params={"token": intruder["Authorization"][7:]}).status_code == 401
@@ -0,0 +1,21 @@
+"""树形接口的条件请求"""
+from tests.conftest import create_class, make_teacher
+
+
+def test_etag_revalidation(client, teacher):
+    owner_id, headers = teacher
+    _, (group_id,), _ = create_class(owner_id, groups=1, students=3)
+    response = client.get(f"/groups/{group_id}/students", headers=headers)
+    etag = response.headers["etag"]
+    response = client.get(f"/groups/{group_id}/students", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_wildcard_does_not_bypass_ownership(client, teacher):
+    owner_id, _ = teacher
+    class_id, (group_id,), _ = create_class(owner_id, groups=1, students=3)
+    _, intruder = make_teacher()
+    intruder = {**intruder, "If-None-Match": "*"}
+    assert client.get(f"/groups/{group_id}/students", headers=intruder).status_code == 404
+    assert client.get(f"/classes/{class_id}/groups", headers=intruder).status_code == 404
+    assert client.get("/groups/999999/students", headers=intruder).status_code == 404
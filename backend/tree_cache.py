@@ -0,0 +1,107 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import Request, Response
+
+from fast_json import dump_json
+from shared_state import shared_state, store_call
+
+# 树形接口（班级 -> 分组 -> 学生）的条件请求与响应体缓存
+
+TREE_CACHE_SIZE = int(os.getenv("TREE_CACHE_SIZE", "256"))
+
+
+class RosterVersions:
+    """每个教师的花名册版本号，班级、分组、学生发生任何变更时递增
+
+    版本号保存在共享计数器中（见 shared_state.py），多个 worker 看到的 ETag 一致；
+    ETag 中附带计数器的启动标识，计数器重建后旧的 ETag 自然失效。
+    """
+
+    def __init__(self, store=shared_state):
+        self.store = store
+
+    @property
+    def epoch(self) -> str:
+        return self.store.epoch
+
+    def get(self, owner_id: int) -> int:
+        return self.store.get(f"roster:{owner_id}")
+
+    async def get_async(self, owner_id: int) -> int:
+        return await store_call(self.store, "get", f"roster:{owner_id}")
+
+    def bump(self, owner_id: int) -> int:
+        return self.store.incr(f"roster:{owner_id}")
+
+
+class TreeCache:
+    """按 (教师, 版本, 路径, 查询参数) 缓存序列化后的响应体"""
+
+    def __init__(self, maxsize: int = TREE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body: bytes):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+roster_versions = RosterVersions()
+tree_cache = TreeCache()
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # 不支持 *：304 在所有权校验之前返回，* 会对其他教师的或不存在的班级、分组也返回 304
+    candidates = [value.strip() for value in header.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def lookup_tree(request: Request, owner_id: int) -> Tuple[tuple, str, Optional[Response]]:
+    """计算 ETag；客户端已有最新版本时返回 304，服务端已缓存时直接返回缓存的响应体"""
+    return _lookup(request, owner_id, roster_versions.get(owner_id))
+
+
+async def lookup_tree_async(request: Request, owner_id: int) -> Tuple[tuple, str, Optional[Response]]:
+    """同 lookup_tree，供 async 接口使用"""
+    return _lookup(request, owner_id, await roster_versions.get_async(owner_id))
+
+
+def _lookup(request: Request, owner_id: int, version: int) -> Tuple[tuple, str, Optional[Response]]:
+    # 查询参数（字段投影）不同，响应体也不同
+    key = (owner_id, version, request.url.path, request.url.query)
+    digest = hashlib.sha1(f"{roster_versions.epoch}:{key}".encode()).hexdigest()
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        return key, etag, Response(status_code=304, headers=headers)
+    body = tree_cache.get(key)
+    if body is not None:
+        return key, etag, Response(body, media_type="application/json", headers=headers)
+    return key, etag, None
+
+
+def store_tree(key: tuple, etag: str, schema, data) -> Response:
+    """序列化查询结果（camelCase），缓存后返回"""
+    body = dump_json(schema, data)
+    tree_cache.put(key, body)
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "private, no-cache"})
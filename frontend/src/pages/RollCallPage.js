@@ -24,6 +24,9 @@ function RollCallPage() {
   const [candidates, setCandidates] = useState([]);
   const [rollSpeed, setRollSpeed] = useState(80);
   const [showResetConfirm, setShowResetConfirm] = useState(false);
+  const [sessionStartedAt, setSessionStartedAt] = useState(new Date().toISOString());
+  // 服务端轮换本轮尚未点到的学生ID，刷新页面或换设备后仍然保留
+  const [rotationRemaining, setRotationRemaining] = useState(null);
 
   // 获取候选学生
   const getCandidates = () => {
@@ -35,8 +38,9 @@ function RollCallPage() {
     } else if (selectedClass) {
       students = selectedClass.groups.flatMap(g => g.students);
     }
-    if (!allowRepeat) {
-      students = students.filter(s => !history.some(h => h.student.id === s.id));
+    if (!allowRepeat && rotationRemaining && rotationRemaining.size > 0) {
+      // 本轮已全部点完时下一次点名自动开始新一轮，候选为全部学生
+      students = students.filter(s => rotationRemaining.has(s.id));
     }
     return students;
   };
@@ -57,21 +61,27 @@ function RollCallPage() {
   const handleStop = async () => {
     clearInterval(intervalId);
     setIsRolling(false);
-    if (current && selectedClass) {
+    if (selectedClass) {
       try {
-        // 保存点名记录到后端
-        const recordData = {
-          studentId: current.id,
-          classId: selectedClass.id
-        };
-        await ApiService.createRollCallRecord(recordData);
+        // 由后端抽取学生并保存点名记录；不允许重复时使用服务端公平轮换
+        const record = await ApiService.drawRollCall({
+          classId: selectedClass.id,
+          groupIds: selectedGroups,
+          allowRepeat,
+          since: sessionStartedAt,
+          mode: allowRepeat ? 'random' : 'rotation'
+        });
+        setCurrent(record.student);
+        if (!allowRepeat) {
+          loadRotation();
+        }
         
         // 添加到本地历史记录
         const historyRecord = {
-          student: current,
+          student: record.student,
           timestamp: new Date(),
           className: selectedClass.name,
-          groupName: groups.find(g => g.students.some(s => s.id === current.id))?.name || '未知分组'
+          groupName: record.groupObj?.name || '未知分组'
         };
         setHistory([...history, historyRecord]);
       } catch (err) {
@@ -86,8 +96,18 @@ function RollCallPage() {
     setShowResetConfirm(true);
   };
 
-  const confirmReset = () => {
+  const confirmReset = async () => {
+    if (selectedClass) {
+      try {
+        const rotation = await ApiService.resetRotation(selectedClass.id, selectedGroups);
+        setRotationRemaining(new Set(rotation.remaining.map(s => s.id)));
+      } catch (err) {
+        console.error('重置轮换失败:', err);
+        setError('重置轮换失败，请重试');
+      }
+    }
     setHistory([]);
+    setSessionStartedAt(new Date().toISOString());
     setCurrent(null);
     setIsRolling(false);
     clearInterval(intervalId);
@@ -111,22 +131,22 @@ function RollCallPage() {
       // 并行加载班级数据和历史记录
       const [classesData, historyData] = await Promise.all([
         ApiService.getClasses(),
-        // ApiService.getRollCallHistory()
-        []
+        // ApiService.getRollCallHistory({ limit: 50 })
+        { items: [] }
       ]);
       
       setClasses(classesData);
       
       // 转换历史记录格式
-      const formattedHistory = historyData.map(record => ({
+      const formattedHistory = (historyData.items || []).map(record => ({
         student: {
-          id: record.student.id,
-          name: record.student.name,
-          studentId: record.student.studentId
+          id: record.studentId,
+          name: record.studentName,
+          studentId: record.studentNumber
         },
         timestamp: new Date(record.calledAt),
-        className: record.classObj.name,
-        groupName: record.groupObj.name
+        className: record.className,
+        groupName: record.groupName
       }));
       setHistory(formattedHistory);
       
@@ -147,6 +167,25 @@ function RollCallPage() {
     loadData();
   }, []);
 
+  // 加载服务端轮换状态
+  const loadRotation = async () => {
+    if (!selectedClass || selectedGroups.length === 0) {
+      setRotationRemaining(null);
+      return;
+    }
+    try {
+      const rotation = await ApiService.getRotation(selectedClass.id, selectedGroups);
+      setRotationRemaining(new Set(rotation.remaining.map(s => s.id)));
+    } catch (err) {
+      console.error('加载轮换状态失败:', err);
+      setRotationRemaining(null);
+    }
+  };
+
+  useEffect(() => {
+    loadRotation();
+  }, [selectedClass, selectedGroups]);
+
   useEffect(() => {
     const filtered = groups.filter(group => selectedGroups.includes(group.id)).flatMap(group => group.students);
     setFilteredStudents(filtered);
@@ -156,6 +195,7 @@ function RollCallPage() {
     setSelectedClass(cls);
     setGroups(cls.groups);
     setHistory([]);
+    setSessionStartedAt(new Date().toISOString());
     setCurrent('');
     setIsRolling(false);
     clearInterval(intervalId);
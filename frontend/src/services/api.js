@@ -45,6 +45,18 @@ class ApiService {
     }
   }
 
+  async upload(endpoint, file) {
+    const formData = new FormData();
+    formData.append('file', file);
+    // 由浏览器自动设置 multipart 边界，不能带 JSON 的 Content-Type
+    const headers = this.token ? { 'Authorization': `Bearer ${this.token}` } : {};
+    return await this.request(endpoint, {
+      method: 'POST',
+      headers,
+      body: formData
+    });
+  }
+
   // 认证相关
   async login(username, password) {
     const response = await this.request('/auth/login', {
@@ -175,6 +187,14 @@ class ApiService {
     });
   }
 
+  async importGroupStudents(groupId, file) {
+    return await this.upload(`/groups/${groupId}/students/import`, file);
+  }
+
+  async importClassStudents(classId, file) {
+    return await this.upload(`/classes/${classId}/students/import`, file);
+  }
+
   async updateStudent(studentId, studentData) {
     return await this.request(`/students/${studentId}`, {
       method: 'PUT',
@@ -182,6 +202,20 @@ class ApiService {
     });
   }
 
+  // 按姓名或学号搜索当前教师的学生，分页时传入上一页返回的 nextOffset
+  async searchStudents(q, { limit = 20, offset = 0 } = {}) {
+    const query = new URLSearchParams({ q, limit, offset }).toString();
+    return await this.request(`/students/search?${query}`);
+  }
+
+  // 批量编辑学生：operations 形如 { op: 'move' | 'weight' | 'rename' | 'delete', id, groupId?, weight?, studentId?, name? }
+  async bulkUpdateStudents(operations) {
+    return await this.request('/students/bulk', {
+      method: 'POST',
+      body: JSON.stringify({ operations })
+    });
+  }
+
   async deleteStudent(studentId) {
     return await this.request(`/students/${studentId}`, {
       method: 'DELETE'
@@ -196,8 +230,115 @@ class ApiService {
     });
   }
 
-  async getRollCallHistory() {
-    return await this.request('/roll-call/history');
+  async createRollCallRecords(records) {
+    return await this.request('/roll-call/batch', {
+      method: 'POST',
+      body: JSON.stringify({ records })
+    });
+  }
+
+  // 页面只用到抽中的学生和分组名，不需要响应中默认展开的整个班级树
+  async drawRollCall(drawData) {
+    return await this.request('/roll-call/draw?expand=student,groupObj', {
+      method: 'POST',
+      body: JSON.stringify(drawData)
+    });
+  }
+
+  // 服务端公平轮换：查看本轮剩余学生、重新洗牌开始新一轮
+  rotationQuery(groupIds = []) {
+    const query = new URLSearchParams(groupIds.map(id => ['groupIds', id])).toString();
+    return query ? `?${query}` : '';
+  }
+
+  async getRotation(classId, groupIds = []) {
+    return await this.request(`/classes/${classId}/rotation${this.rotationQuery(groupIds)}`);
+  }
+
+  async resetRotation(classId, groupIds = []) {
+    return await this.request(`/classes/${classId}/rotation/reset${this.rotationQuery(groupIds)}`, {
+      method: 'POST'
+    });
+  }
+
+  async getRollCallHistory(params = {}) {
+    const query = new URLSearchParams(
+      Object.entries(params).filter(([, value]) => value !== undefined && value !== null)
+    ).toString();
+    return await this.request(`/roll-call/history${query ? `?${query}` : ''}`);
+  }
+
+  // 点名统计
+  async getClassStats() {
+    return await this.request('/stats/classes');
+  }
+
+  async getGroupStats(classId) {
+    return await this.request(`/stats/classes/${classId}/groups`);
+  }
+
+  async getStudentStats(classId) {
+    return await this.request(`/stats/classes/${classId}/students`);
+  }
+
+  async getDailyStats(classId) {
+    return await this.request(`/stats/classes/${classId}/daily`);
+  }
+
+  // 导出（返回文件 Blob）
+  async download(endpoint) {
+    const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+      headers: this.getAuthHeaders()
+    });
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({ detail: '导出失败' }));
+      throw new Error(errorData.detail || `HTTP ${response.status}`);
+    }
+    return await response.blob();
+  }
+
+  async exportRollCallHistory(params = {}) {
+    const query = new URLSearchParams(
+      Object.entries(params).filter(([, value]) => value !== undefined && value !== null)
+    ).toString();
+    return await this.download(`/export/roll-call${query ? `?${query}` : ''}`);
+  }
+
+  async exportClassRoster(classId, format = 'csv') {
+    return await this.download(`/export/classes/${classId}/roster?format=${format}`);
+  }
+
+  // 实时订阅班级的点名事件（投影、手机等），返回带 close() 的订阅对象
+  // EventSource 无法设置请求头，URL 中只传一次性的短期票据，不传访问令牌
+  async subscribeClassEvents(classId, { onRollCall, onLagged } = {}) {
+    let source = null;
+    let closed = false;
+    const connect = async () => {
+      const { ticket } = await this.request(`/classes/${classId}/events/ticket`, { method: 'POST' });
+      if (closed) return;
+      source = new EventSource(`${API_BASE_URL}/classes/${classId}/events?ticket=${encodeURIComponent(ticket)}`);
+      if (onRollCall) {
+        source.addEventListener('roll-call', event => onRollCall(JSON.parse(event.data)));
+      }
+      if (onLagged) {
+        // 消费过慢丢失了部分事件，应重新拉取历史
+        source.addEventListener('lagged', () => onLagged());
+      }
+      source.onerror = () => {
+        // 票据已用过，浏览器自动重连会被拒绝；换新票据重连，断线期间的事件需重新拉取历史
+        source.close();
+        if (closed) return;
+        if (onLagged) onLagged();
+        setTimeout(() => connect().catch(() => {}), 3000);
+      };
+    };
+    await connect();
+    return {
+      close() {
+        closed = true;
+        if (source) source.close();
+      }
+    };
   }
 }
 